@@ -0,0 +1,414 @@
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from config import Config
+from database import DatabaseManager
+
+
+class AIMessageService:
+    """Generates AI restock messages and caches them per product"""
+
+    # Seconds to wait before retrying a failed precompute for the same URL
+    FAILURE_BACKOFF = 300
+
+    def __init__(self, db: DatabaseManager, openai_client=None):
+        self.db = db
+        self.openai_client = openai_client
+        self.ttl = Config.AI_MESSAGE_TTL
+        self.refresh_enabled = Config.AI_MESSAGE_REFRESH
+
+        # url -> cached row (fingerprint, message, expires_at); None = not cached.
+        # Only the most recently used rows stay in memory, the rest are
+        # read back from the database
+        self.max_entries = Config.AI_MESSAGE_MEMORY_ENTRIES
+        self._entries: "OrderedDict[str, Optional[Dict]]" = OrderedDict()
+        self._in_flight: Set[str] = set()
+        self._failed_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.batcher = (
+            AIMessageBatcher(self, Config.AI_BATCH_WINDOW, Config.AI_BATCH_MAX_SIZE)
+            if Config.AI_BATCH_WINDOW > 0
+            else None
+        )
+
+    @property
+    def client(self):
+        """OpenAI client, created on first use (importing openai is slow)"""
+        if self.openai_client is None:
+            from openai import OpenAI
+
+            self.openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        return self.openai_client
+
+    @staticmethod
+    def fingerprint(product_info) -> str:
+        """Identify the product details a cached message was written for"""
+        key = f"{product_info.name or ''}|{product_info.price or ''}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def fallback_message(product_info) -> str:
+        """Template message used when the AI message is unavailable"""
+        return f"🎉 Great news! {product_info.name or 'Your monitored item'} is back in stock! Get it now before it sells out again! 🛒✨"
+
+    def generate(self, url: str, product_info) -> str:
+        """Ask the model for a restock message (raises on failure)"""
+        if not Config.OPENAI_API_KEY:
+            raise RuntimeError("OPENAI_API_KEY is not configured")
+
+        product_name = product_info.name or "Labubu product"
+        price = product_info.price or "Unknown price"
+
+        prompt = f"""
+        A PopMart {product_name} (price: {price}) just came back in stock!
+        Create an exciting, urgent notification message that will motivate someone
+        to buy it immediately. Keep it under 100 words and include emojis.
+        URL: {url}
+        """
+
+        response = self.client.chat.completions.create(
+            model=Config.OPENAI_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are an enthusiastic shopping assistant who helps people get limited edition collectibles.",
+                },
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=150,
+            temperature=0.8,
+        )
+
+        ai_message = response.choices[0].message.content.strip()
+        logging.info(f"Generated AI message: {ai_message}")
+        return ai_message
+
+    def generate_batch(self, items: List[Tuple[str, object]]) -> Dict[str, str]:
+        """Ask the model for several restock messages in one request
+
+        Returns a dict keyed by URL; URLs missing from the model's answer are
+        left out so callers can generate them individually.
+        """
+        if len(items) == 1:
+            url, product_info = items[0]
+            return {url: self.generate(url, product_info)}
+
+        if not Config.OPENAI_API_KEY:
+            raise RuntimeError("OPENAI_API_KEY is not configured")
+
+        products = "\n".join(
+            f"- URL: {url} | Product: {product_info.name or 'Labubu product'} "
+            f"| Price: {product_info.price or 'Unknown price'}"
+            for url, product_info in items
+        )
+
+        prompt = f"""
+        These PopMart products just came back in stock:
+        {products}
+
+        For each product, create an exciting, urgent notification message that
+        will motivate someone to buy it immediately. Keep each message under
+        100 words and include emojis.
+
+        Respond only with a JSON object that maps each URL, exactly as given,
+        to its message.
+        """
+
+        response = self.client.chat.completions.create(
+            model=Config.OPENAI_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are an enthusiastic shopping assistant who helps people get limited edition collectibles.",
+                },
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=min(4096, 150 * len(items)),
+            temperature=0.8,
+        )
+
+        text = response.choices[0].message.content.strip()
+
+        # Extract JSON from response (the model sometimes adds extra text)
+        start = text.find("{")
+        end = text.rfind("}") + 1
+        if start < 0 or end <= start:
+            raise ValueError("No JSON found in batch response")
+        data = json.loads(text[start:end])
+
+        messages = {}
+        for url, _ in items:
+            message = data.get(url)
+            if isinstance(message, str) and message.strip():
+                messages[url] = message.strip()
+
+        logging.info(f"Generated {len(messages)}/{len(items)} AI messages in one call")
+        return messages
+
+    def generate_with_fallback(self, url: str, product_info) -> str:
+        """Generate a message, falling back to the template on any error"""
+        try:
+            return self.generate(url, product_info)
+        except Exception as e:
+            logging.error(f"Failed to generate AI message: {e}")
+            return self.fallback_message(product_info)
+
+    def _remember(self, url: str, entry: Optional[Dict]):
+        """Keep a row in memory, dropping the least recently used (hold _lock)"""
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_entry(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            if url in self._entries:
+                self._entries.move_to_end(url)
+                return self._entries[url]
+
+        entry = self.db.get_ai_message(url)
+        with self._lock:
+            self._remember(url, entry)
+        return entry
+
+    def _store(self, url: str, fingerprint: str, message: str):
+        expires_at = time.time() + self.ttl
+        self.db.save_ai_message(url, fingerprint, message, expires_at)
+        with self._lock:
+            self._remember(
+                url,
+                {
+                    "url": url,
+                    "fingerprint": fingerprint,
+                    "message": message,
+                    "expires_at": expires_at,
+                },
+            )
+
+    def get_cached(
+        self, url: str, product_info, allow_stale: bool = False
+    ) -> Optional[str]:
+        """Get the cached message if it matches the current product details"""
+        entry = self._get_entry(url)
+        if not entry or entry["fingerprint"] != self.fingerprint(product_info):
+            return None
+        if not allow_stale and entry["expires_at"] < time.time():
+            return None
+        return entry["message"]
+
+    def invalidate(self, url: str):
+        """Forget the cached message for a URL"""
+        self.db.delete_ai_message(url)
+        with self._lock:
+            self._remember(url, None)
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=Config.AI_PRECOMPUTE_WORKERS,
+                    thread_name_prefix="ai-precompute",
+                )
+        return self._executor.submit(fn, *args)
+
+    def _generate_async(self, url: str, product_info) -> Future:
+        """Generate a message off the calling thread, batched when enabled"""
+        if self.batcher:
+            return self.batcher.submit(url, product_info)
+        return self._submit(self.generate, url, product_info)
+
+    def _on_refreshed(self, url: str, product_info, future: Future):
+        try:
+            message = future.result()
+            self._store(url, self.fingerprint(product_info), message)
+            logging.debug(f"Precomputed AI message for {url}")
+        except Exception as e:
+            logging.warning(f"AI message precompute failed for {url}: {e}")
+            # Don't hammer the API every cycle while it is failing
+            now = time.time()
+            with self._lock:
+                # Forget backoffs that have run out so this can't grow per URL
+                for failed_url, until in list(self._failed_until.items()):
+                    if until <= now:
+                        del self._failed_until[failed_url]
+                self._failed_until[url] = now + self.FAILURE_BACKOFF
+        finally:
+            with self._lock:
+                self._in_flight.discard(url)
+
+    def _on_enriched(
+        self,
+        url: str,
+        product_info,
+        on_ready: Callable[[str], None],
+        on_failed: Optional[Callable[[], None]],
+        future: Future,
+    ):
+        try:
+            message = future.result()
+            if not message:
+                raise ValueError("empty message")
+        except Exception as e:
+            logging.error(f"Failed to generate AI follow-up message for {url}: {e}")
+            if on_failed:
+                on_failed()
+            return
+
+        self._store(url, self.fingerprint(product_info), message)
+        try:
+            on_ready(message)
+        except Exception as e:
+            logging.error(f"Failed to deliver AI follow-up for {url}: {e}")
+
+    def enrich_in_background(
+        self,
+        url: str,
+        product_info,
+        on_ready: Callable[[str], None],
+        on_failed: Optional[Callable[[], None]] = None,
+    ):
+        """Generate the AI message off the alert path and hand it to on_ready
+
+        ``on_failed`` is called instead when no message could be generated.
+        """
+        future = self._generate_async(url, product_info)
+        future.add_done_callback(
+            functools.partial(self._on_enriched, url, product_info, on_ready, on_failed)
+        )
+
+    def refresh_in_background(self, url: str, product_info) -> bool:
+        """Schedule a background (re)generation unless one is already running"""
+        with self._lock:
+            if url in self._in_flight:
+                return False
+            self._in_flight.add(url)
+        future = self._generate_async(url, product_info)
+        future.add_done_callback(
+            functools.partial(self._on_refreshed, url, product_info)
+        )
+        return True
+
+    def warm(self, url: str, product_info) -> bool:
+        """Precompute a message when a product is new, changed or expired"""
+        if not Config.OPENAI_API_KEY or not product_info.name:
+            return False
+        if self._failed_until.get(url, 0) > time.time():
+            return False
+        if self.get_cached(url, product_info) is not None:
+            return False
+        return self.refresh_in_background(url, product_info)
+
+    def get_message(self, url: str, product_info) -> str:
+        """Get a restock message, preferring the cache over a live model call"""
+        cached = self.get_cached(url, product_info, allow_stale=True)
+        if cached is not None:
+            entry = self._get_entry(url)
+            if self.refresh_enabled and entry["expires_at"] < time.time():
+                self.refresh_in_background(url, product_info)
+            logging.info(f"Using cached AI message for {url}")
+            return cached
+
+        try:
+            if self.batcher:
+                message = self.batcher.submit(url, product_info).result()
+            else:
+                message = self.generate(url, product_info)
+        except Exception as e:
+            logging.error(f"Failed to generate AI message: {e}")
+            return self.fallback_message(product_info)
+
+        self._store(url, self.fingerprint(product_info), message)
+        return message
+
+    def shutdown(self):
+        """Stop background generation workers"""
+        if self.batcher:
+            self.batcher.flush()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class AIMessageBatcher:
+    """Collects message requests for a short window and generates them together"""
+
+    def __init__(self, service: AIMessageService, window: float, max_size: int):
+        self.service = service
+        self.window = window
+        self.max_size = max_size
+        self._pending: List[Tuple[str, object, Future]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def submit(self, url: str, product_info) -> Future:
+        """Queue a message request; the future resolves to the message text"""
+        future = Future()
+        batch = None
+
+        with self._lock:
+            self._pending.append((url, product_info, future))
+            if len(self._pending) >= self.max_size:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if batch:
+            threading.Thread(
+                target=self._run_batch, args=(batch,), name="ai-batch", daemon=True
+            ).start()
+        return future
+
+    def _take(self) -> List[Tuple[str, object, Future]]:
+        batch, self._pending = self._pending, []
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def flush(self):
+        """Generate everything collected so far"""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[Tuple[str, object, Future]]):
+        items = {url: product_info for url, product_info, _ in batch}
+
+        errors: Dict[str, Exception] = {}
+        try:
+            messages = self.service.generate_batch(list(items.items()))
+        except Exception as e:
+            messages = {}
+            if len(items) == 1:
+                # That already was the per-item call; don't send it twice
+                errors = dict.fromkeys(items, e)
+            else:
+                logging.warning(
+                    f"Batched AI generation failed for {len(items)} products, "
+                    f"falling back to per-item calls: {e}"
+                )
+
+        for url, product_info in items.items():
+            if url in messages or url in errors:
+                continue
+            try:
+                messages[url] = self.service.generate(url, product_info)
+            except Exception as e:
+                errors[url] = e
+
+        for url, _, future in batch:
+            if url in messages:
+                future.set_result(messages[url])
+            else:
+                future.set_exception(errors[url])
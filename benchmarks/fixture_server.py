@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the PopMart site that serves saved product pages
+
+    python benchmarks/fixture_server.py --port 8900 --latency 0.2 --jitter 0.1
+
+Pages are served at ``/us/products/<id>/<fixture>``, e.g.
+``/us/products/7/sold_out``. The ``not_found`` fixture is served with a 404
+and ``huge`` is the in-stock page padded with a large recommendation grid.
+A ``delay`` query parameter overrides the latency for one request.
+
+The catalogue pages under ``fixtures/site`` (sitemaps, collection and
+search pages) are served at their own paths for discovery crawls, with an
+ETag and Last-Modified and a 304 for conditional requests. In file names
+``~`` stands for ``?``, so ``us/collection/11~page=2.html`` is
+``/us/collection/11?page=2``, and ``{base_url}`` is replaced with the
+server's address.
+
+With ``--http2`` the pages are served over cleartext HTTP/2 (prior
+knowledge, no upgrade), which needs the ``h2`` package.
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import socket
+import socketserver
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SITE_DIR = os.path.join(FIXTURES_DIR, "site")
+
+# Statuses other than 200, by fixture
+FIXTURE_STATUS = {"not_found": 404}
+
+HUGE_CARDS = 4000
+
+RECOMMENDATION_CARD = """      <div class="product_card">
+        <a href="/us/products/{id}/recommended-{id}">
+          <img src="https://prod-global-static.popmart.com/globalAdmin/card_{id}.jpg" alt="Recommended {id}">
+          <h3 class="card_title">Recommended Figure {id}</h3>
+          <span class="card_price">$18.99</span>
+        </a>
+      </div>
+"""
+
+
+def load_fixtures() -> Dict[str, bytes]:
+    """Read the saved pages, plus the generated ``huge`` page"""
+    fixtures = {}
+    for filename in sorted(os.listdir(FIXTURES_DIR)):
+        name, ext = os.path.splitext(filename)
+        if ext == ".html":
+            with open(os.path.join(FIXTURES_DIR, filename), "rb") as f:
+                fixtures[name] = f.read()
+
+    cards = "".join(RECOMMENDATION_CARD.format(id=i) for i in range(HUGE_CARDS))
+    grid = f'    <section class="recommendations">\n{cards}    </section>\n'
+    fixtures["huge"] = fixtures["in_stock"].replace(
+        b"  </main>", grid.encode("utf-8") + b"  </main>"
+    )
+    return fixtures
+
+
+def load_site(base_url: str) -> Dict[str, bytes]:
+    """Catalogue pages by request path, with ``{base_url}`` filled in"""
+    site = {}
+    for directory, _, filenames in os.walk(SITE_DIR):
+        for filename in sorted(filenames):
+            full = os.path.join(directory, filename)
+            path = "/" + os.path.relpath(full, SITE_DIR).replace(os.sep, "/")
+            if path.endswith(".html"):
+                path = path[: -len(".html")]
+            with open(full, "rb") as f:
+                body = f.read().replace(b"{base_url}", base_url.encode("utf-8"))
+            site[path.replace("~", "?")] = body
+    return site
+
+
+def fixture_urls(base_url: str, count: int, mix: List[str]) -> List[str]:
+    """``count`` product URLs cycling through the fixtures in ``mix``"""
+    return [f"{base_url}/us/products/{i}/{mix[i % len(mix)]}" for i in range(count)]
+
+
+class FixtureServer:
+    """Threaded HTTP server for the fixtures with configurable latency
+
+    ``requests`` and ``connections`` count what clients sent, so transports
+    can be compared by how many connections they needed. ``publish``
+    changes or adds a catalogue page, e.g. to list a new product.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        http2: bool = False,
+    ):
+        self.fixtures = load_fixtures()
+        self.latency = latency
+        self.jitter = jitter
+        self.http2 = http2
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        if http2:
+            self._server = socketserver.ThreadingTCPServer(
+                (host, port), self._make_h2_handler()
+            )
+        else:
+            self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self.site: Dict[str, Tuple[bytes, str, str]] = {}
+        for path, body in load_site(self.base_url).items():
+            self.publish(path, body)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def publish(self, path: str, body: bytes):
+        """Serve ``body`` at a catalogue path with a fresh ETag and Last-Modified"""
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        with self._lock:
+            self.site[path] = (body, etag, formatdate(usegmt=True))
+
+    def page(
+        self, path: str, headers: Dict[str, str] = None
+    ) -> Tuple[int, bytes, Dict[str, str]]:
+        """Status, body and headers for a request, after the simulated latency"""
+        if path in self.site:
+            return self.site_page(path, headers)
+
+        parsed = urlparse(path)
+        fixture = parsed.path.rstrip("/").rsplit("/", 1)[-1]
+        body = self.fixtures.get(fixture)
+        status = FIXTURE_STATUS.get(fixture, 200)
+        if body is None:
+            body, status = self.fixtures["not_found"], 404
+
+        delay = parse_qs(parsed.query).get("delay")
+        self.wait(float(delay[0]) if delay else None)
+        return status, body, {"Content-Type": "text/html; charset=utf-8"}
+
+    def site_page(
+        self, path: str, headers: Dict[str, str] = None
+    ) -> Tuple[int, bytes, Dict[str, str]]:
+        with self._lock:
+            body, etag, last_modified = self.site[path]
+        self.wait()
+
+        content_type = "application/xml" if path.endswith(".xml") else "text/html"
+        response_headers = {
+            "Content-Type": f"{content_type}; charset=utf-8",
+            "ETag": etag,
+            "Last-Modified": last_modified,
+        }
+        request = {name.lower(): value for name, value in (headers or {}).items()}
+        if "if-none-match" in request:
+            not_modified = etag in request["if-none-match"].split(", ")
+        elif "if-modified-since" in request:
+            try:
+                not_modified = parsedate_to_datetime(
+                    request["if-modified-since"]
+                ) >= parsedate_to_datetime(last_modified)
+            except (TypeError, ValueError):
+                not_modified = False
+        else:
+            not_modified = False
+        if not_modified:
+            return 304, b"", response_headers
+        return 200, body, response_headers
+
+    def connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this the
+            # client's delayed ACK adds ~40ms to every keep-alive response
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                server.connected()
+
+            def do_GET(self):
+                status, body, headers = server.page(self.path, self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _make_h2_handler(self):
+        import h2.config
+        import h2.connection
+        import h2.events
+
+        server = self
+
+        class H2Handler(socketserver.BaseRequestHandler):
+            """One HTTP/2 connection; each stream is answered on its own thread"""
+
+            def setup(self):
+                server.connected()
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self.conn = h2.connection.H2Connection(
+                    h2.config.H2Configuration(
+                        client_side=False, header_encoding="utf-8"
+                    )
+                )
+                # Guards the connection state; waited on for flow control
+                self.window = threading.Condition()
+                self.closed = False
+
+            def flush(self):
+                data = self.conn.data_to_send()
+                if data:
+                    self.request.sendall(data)
+
+            def handle(self):
+                with self.window:
+                    self.conn.initiate_connection()
+                    self.flush()
+                while True:
+                    try:
+                        data = self.request.recv(65536)
+                    except OSError:
+                        data = b""
+                    with self.window:
+                        if not data:
+                            self.closed = True
+                            self.window.notify_all()
+                            return
+                        for event in self.conn.receive_data(data):
+                            if isinstance(event, h2.events.RequestReceived):
+                                threading.Thread(
+                                    target=self.respond,
+                                    args=(event.stream_id, dict(event.headers)),
+                                    daemon=True,
+                                ).start()
+                            elif isinstance(event, h2.events.ConnectionTerminated):
+                                self.closed = True
+                        self.flush()
+                        self.window.notify_all()
+
+            def respond(self, stream_id: int, headers: Dict[str, str]):
+                status, body, extra = server.page(headers.get(":path", "/"), headers)
+                with self.window:
+                    self.conn.send_headers(
+                        stream_id,
+                        [(":status", str(status))]
+                        + [(name.lower(), value) for name, value in extra.items()]
+                        + [("content-length", str(len(body)))],
+                    )
+                    while body:
+                        size = min(
+                            self.conn.local_flow_control_window(stream_id),
+                            self.conn.max_outbound_frame_size,
+                            len(body),
+                        )
+                        if size <= 0:
+                            self.flush()
+                            self.window.wait(1)
+                            if self.closed:
+                                return
+                            continue
+                        self.conn.send_data(stream_id, body[:size])
+                        body = body[size:]
+                    self.conn.end_stream(stream_id)
+                    self.flush()
+
+        return H2Handler
+
+    def wait(self, delay: float = None):
+        with self._lock:
+            self.requests += 1
+        if delay is None:
+            delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fixture-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve saved PopMart pages")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument(
+        "--http2", action="store_true", help="serve cleartext HTTP/2 (needs h2)"
+    )
+    args = parser.parse_args()
+
+    server = FixtureServer(args.host, args.port, args.latency, args.jitter, args.http2)
+    protocol = "HTTP/2" if args.http2 else "HTTP/1.1"
+    print(
+        f"🧪 Serving {', '.join(sorted(server.fixtures))} "
+        f"at {server.base_url} over {protocol}"
+    )
+    print(f"   e.g. {server.base_url}/us/products/1/in_stock")
+    print(f"   catalogue from {server.base_url}/sitemap.xml")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
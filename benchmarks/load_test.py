@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Simple load test for a running web dashboard
+
+    python main.py web &                 # development server
+    python benchmarks/load_test.py
+
+    python main.py web --workers 4 &     # gunicorn / waitress
+    python benchmarks/load_test.py --clients 32 --duration 20
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from typing import Dict, List
+
+import requests
+
+DEFAULT_PATHS = ["/api/status", "/api/events?limit=100", "/"]
+
+
+def run_client(base_url: str, paths: List[str], deadline: float, results: Dict):
+    """Request the paths round-robin until the deadline"""
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = "gzip"
+    latencies, errors, sent = [], 0, 0
+    i = 0
+
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = session.get(base_url + path, timeout=30)
+            sent += len(response.content)
+            if response.status_code >= 400:
+                errors += 1
+        except requests.RequestException:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+
+    with results["lock"]:
+        results["latencies"].extend(latencies)
+        results["errors"] += errors
+        results["bytes"] += sent
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the web dashboard")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument(
+        "--path",
+        action="append",
+        dest="paths",
+        help="Path to request (repeatable, default: status, events, dashboard)",
+    )
+    args = parser.parse_args()
+    paths = args.paths or DEFAULT_PATHS
+
+    results = {"latencies": [], "errors": 0, "bytes": 0, "lock": threading.Lock()}
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(
+            target=run_client, args=(args.url.rstrip("/"), paths, deadline, results)
+        )
+        for _ in range(args.clients)
+    ]
+
+    print(f"🚀 {args.clients} clients for {args.duration:.0f}s against {args.url}")
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    latencies = results["latencies"]
+    if not latencies:
+        print("❌ No requests completed")
+        return
+
+    print(f"📊 Requests:   {len(latencies)} ({results['errors']} errors)")
+    print(f"⚡ Throughput: {len(latencies) / elapsed:.1f} req/s")
+    print(f"📦 Received:   {results['bytes'] / 1024:.0f} KiB")
+    print(
+        f"⏱️  Latency:    p50 {percentile(latencies, 50) * 1000:.1f}ms, "
+        f"p95 {percentile(latencies, 95) * 1000:.1f}ms, "
+        f"p99 {percentile(latencies, 99) * 1000:.1f}ms, "
+        f"mean {statistics.mean(latencies) * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
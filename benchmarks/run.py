@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks against saved PopMart pages, no live site needed
+
+    python benchmarks/run.py                          # all scenarios
+    python benchmarks/run.py parse db                 # just some of them
+    python benchmarks/run.py cycle --sizes 10 100 --latency 0.05
+    python benchmarks/run.py detection --engines heuristic strict
+    python benchmarks/run.py transport --fetches 500 --latency 0.05
+    python benchmarks/run.py state --state-urls 50000
+    python benchmarks/run.py discovery --latency 0.05
+    python benchmarks/run.py --compare benchmarks/results/old.json
+
+Scenarios:
+    parse      BeautifulSoup, extract_product_info and detect_stock per fixture
+    cycle      run_monitoring_cycle over 10/100/1000 URLs on the fixture server
+    db         stock event inserts per second and a 5,000-URL catalogue import
+    dashboard  dashboard request latency, cold and warm
+    detection  precision/recall and time per page of each stock detector
+               over the labelled fixtures (fixtures/labels.json)
+    transport  page fetches per second and connections opened by the
+               requests (HTTP/1.1) and httpx (HTTP/2) transports, with and
+               without the DNS cache; HTTP/2 needs httpx[http2] installed
+    state      memory, GC-tracked objects and update time of the monitor's
+               per-URL state table and check records for --state-urls URLs,
+               and the latency tracer's memory and snapshot size for them
+    discovery  catalogue crawls of the fixture site (fixtures/site): a cold
+               crawl, a repeat with nothing changed, and one after a new
+               product is listed, with the pages each one requested
+
+Results are written as JSON (to benchmarks/results/ by default) so runs of
+different versions can be compared with ``--compare``. Comparing exits with
+status 1 if any detector lost precision or recall or gained a false restock,
+however much faster it got.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from config import Config  # noqa: E402
+from detection import DETECTORS, get_detector  # noqa: E402
+from fixture_server import (  # noqa: E402
+    FIXTURES_DIR,
+    FixtureServer,
+    fixture_urls,
+    load_fixtures,
+)
+from tracing import percentile  # noqa: E402
+
+SCENARIOS = [
+    "parse",
+    "cycle",
+    "db",
+    "dashboard",
+    "detection",
+    "transport",
+    "state",
+    "discovery",
+]
+
+# Fixture mix for cycle runs, roughly what a watch list looks like
+CYCLE_MIX = [
+    "sold_out",
+    "in_stock",
+    "sold_out",
+    "blind_box",
+    "coming_soon",
+    "not_found",
+]
+
+DASHBOARD_PATHS = ["/", "/api/status", "/api/events?limit=100", "/history"]
+
+# Fixtures fetched by the transport scenario (no huge page, it dwarfs the rest)
+TRANSPORT_MIX = ["in_stock", "sold_out", "blind_box", "coming_soon"]
+
+
+def summarize(samples: List[float]) -> Dict:
+    """Milliseconds summary of a list of durations in seconds"""
+    ordered = sorted(s * 1000 for s in samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+def timed(fn: Callable, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def make_monitor(db_path: str):
+    from database import DatabaseManager
+    from monitor import StockMonitor
+
+    return StockMonitor(DatabaseManager(db_path), seed_urls=False)
+
+
+def bench_parse(args, workdir: str) -> Dict:
+    monitor = make_monitor(os.path.join(workdir, "parse.db"))
+    results = {}
+
+    for name, body in load_fixtures().items():
+        html = body.decode("utf-8")
+        repeat = max(1, args.repeat // 10) if name == "huge" else args.repeat
+        url = f"https://www.popmart.com/us/products/1/{name}"
+
+        soups = []
+        parse = timed(lambda: soups.append(BeautifulSoup(html, "html.parser")), repeat)
+        soup = soups[-1]
+        infos = []
+        extract = timed(
+            lambda: infos.append(monitor.extract_product_info(soup, url)), repeat
+        )
+        detect = timed(lambda: monitor.detect_stock(soup, infos[-1]), repeat)
+
+        results[name] = {
+            "bytes": len(body),
+            "in_stock": monitor.detect_stock(soup, infos[-1]),
+            "parse": summarize(parse),
+            "extract": summarize(extract),
+            "detect": summarize(detect),
+        }
+    return results
+
+
+def bench_cycle(args, workdir: str) -> Dict:
+    from database import DatabaseManager
+
+    results = {}
+    with FixtureServer(latency=args.latency, jitter=args.jitter) as server:
+        for size in args.sizes:
+            db = DatabaseManager(os.path.join(workdir, f"cycle-{size}.db"))
+            for url in fixture_urls(server.base_url, size, CYCLE_MIX):
+                db.add_monitor_url(url)
+            monitor = make_monitor(db.db_path)
+
+            cycles = []
+            for _ in range(args.cycles):
+                requests_before = server.requests
+                start = time.perf_counter()
+                monitor.run_monitoring_cycle()
+                elapsed = time.perf_counter() - start
+                cycles.append(
+                    {
+                        "seconds": round(elapsed, 3),
+                        "per_url_ms": round(elapsed / size * 1000, 3),
+                        "requests": server.requests - requests_before,
+                    }
+                )
+
+            results[str(size)] = {
+                # The first cycle sees every in-stock page as a restock
+                "first_cycle": cycles[0],
+                "steady_cycles": cycles[1:],
+                "stages": monitor.tracer.summary()["stages"],
+            }
+            monitor.fetcher.close()
+    return results
+
+
+def bench_db(args, workdir: str) -> Dict:
+    from database import DatabaseManager
+
+    db = DatabaseManager(os.path.join(workdir, "db.db"))
+    urls = [f"https://www.popmart.com/us/products/{i}/bench" for i in range(50)]
+    for url in urls:
+        db.add_monitor_url(url)
+
+    inserts = timed(
+        lambda: db.log_stock_event(urls[0], False, "Bench Product", "$27.99"),
+        args.db_rows,
+    )
+    last_checked = timed(lambda: db.update_last_checked(urls[0]), args.db_rows)
+    total = sum(inserts)
+
+    # Onboarding a catalogue, then re-importing it unchanged
+    import url_import
+
+    catalogue = "url,product_name,tags\n" + "".join(
+        f"https://www.popmart.com/us/products/{i}/catalogue,Figure {i},labubu\n"
+        for i in range(5000)
+    )
+    url_import_runs = timed(lambda: url_import.import_urls(db, catalogue, "csv"), 2)
+    return {
+        "rows": args.db_rows,
+        "inserts_per_second": round(args.db_rows / total, 1),
+        "log_stock_event": summarize(inserts),
+        "update_last_checked": summarize(last_checked),
+        "import_5000_urls_seconds": round(url_import_runs[0], 3),
+        "reimport_5000_urls_seconds": round(url_import_runs[1], 3),
+    }
+
+
+def bench_dashboard(args, workdir: str) -> Dict:
+    from database import DatabaseManager
+
+    Config.DB_PATH = os.path.join(workdir, "dashboard.db")
+    db = DatabaseManager(Config.DB_PATH)
+    urls = [f"https://www.popmart.com/us/products/{i}/bench" for i in range(20)]
+    for url in urls:
+        db.add_monitor_url(url, f"Bench Product {url.rsplit('/', 2)[-2]}")
+    for i in range(args.db_rows):
+        db.log_stock_event(urls[i % len(urls)], i % 7 == 0, "Bench Product", "$27.99")
+
+    from web_dashboard import app
+
+    client = app.test_client()
+    results = {}
+    for path in DASHBOARD_PATHS:
+        cold = timed(lambda: client.get(path), 1)
+        warm = timed(lambda: client.get(path), args.repeat)
+        response = client.get(path)
+        results[path] = {
+            "status": response.status_code,
+            "bytes": len(response.get_data()),
+            "cold_ms": round(cold[0] * 1000, 3),
+            "warm": summarize(warm),
+        }
+    return results
+
+
+def load_labels() -> Dict[str, bool]:
+    """Expected verdict (in stock or not) per fixture"""
+    with open(os.path.join(FIXTURES_DIR, "labels.json")) as f:
+        return json.load(f)
+
+
+def bench_detection(args, workdir: str) -> Dict:
+    monitor = make_monitor(os.path.join(workdir, "detection.db"))
+    labels = load_labels()
+    fixtures = load_fixtures()
+
+    pages = {}
+    for name in labels:
+        soup = BeautifulSoup(fixtures[name].decode("utf-8"), "html.parser")
+        url = f"https://www.popmart.com/us/products/1/{name}"
+        pages[name] = (soup, monitor.extract_product_info(soup, url))
+
+    results = {}
+    for engine in args.engines:
+        detector = get_detector(engine)
+        outcomes = {"tp": 0, "fp": 0, "fn": 0, "tn": 0}
+        false_restocks, missed_restocks = [], []
+        per_page, all_samples = {}, []
+
+        for name, expected in labels.items():
+            soup, info = pages[name]
+            repeat = max(1, args.repeat // 10) if name == "huge" else args.repeat
+            samples = timed(lambda: detector.detect(soup, info), repeat)
+            verdict = detector.detect(soup, info)
+
+            if verdict and expected:
+                outcomes["tp"] += 1
+            elif verdict:
+                outcomes["fp"] += 1
+                false_restocks.append(name)
+            elif expected:
+                outcomes["fn"] += 1
+                missed_restocks.append(name)
+            else:
+                outcomes["tn"] += 1
+
+            per_page[name] = {
+                "expected": expected,
+                "verdict": verdict,
+                "detect": summarize(samples),
+            }
+            if name != "huge":
+                all_samples.extend(samples)
+
+        predicted = outcomes["tp"] + outcomes["fp"]
+        actual = outcomes["tp"] + outcomes["fn"]
+        results[engine] = {
+            "precision": round(outcomes["tp"] / predicted, 4) if predicted else 1.0,
+            "recall": round(outcomes["tp"] / actual, 4) if actual else 1.0,
+            "false_restock_count": outcomes["fp"],
+            "false_restocks": false_restocks,
+            "missed_restocks": missed_restocks,
+            # Typical pages only; the huge page is reported on its own
+            "detect": summarize(all_samples),
+            "pages": per_page,
+        }
+        print(
+            f"   {engine:<10} precision {results[engine]['precision']:.2f}  "
+            f"recall {results[engine]['recall']:.2f}  "
+            f"p50 {results[engine]['detect']['p50_ms']:.3f}ms  "
+            f"false restocks: {', '.join(false_restocks) or 'none'}"
+        )
+    return results
+
+
+def fetch_all(fetcher, urls: List[str], concurrency: int) -> Dict:
+    """Fetch every URL from ``concurrency`` threads, timing each fetch"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def fetch(url: str) -> float:
+        start = time.perf_counter()
+        fetcher.fetch(url)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(fetch, urls))
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": round(elapsed, 3),
+        "fetches_per_second": round(len(urls) / elapsed, 1),
+        "fetch": summarize(samples),
+    }
+
+
+def bench_transport(args, workdir: str) -> Dict:
+    from dns_cache import DnsCache
+    from fetch import Http2Transport, PageFetcher, RequestsTransport
+
+    # Every variant resolves through the cache; a zero TTL makes each lookup
+    # a miss, which counts lookups without caching them
+    cache = DnsCache(0)
+    results = {}
+    for name, transport in (("requests", RequestsTransport), ("http2", Http2Transport)):
+        http2 = transport is Http2Transport
+        try:
+            server = FixtureServer(
+                latency=args.latency, jitter=args.jitter, http2=http2
+            )
+        except ImportError as e:
+            results[name] = {"skipped": f"needs httpx[http2] ({e})"}
+            print(f"   {name:<10} skipped: {e}")
+            continue
+
+        with server:
+            # Resolve by name so DNS lookups are part of every new connection
+            base_url = server.base_url.replace("127.0.0.1", "localhost")
+            urls = fixture_urls(base_url, args.fetches, TRANSPORT_MIX)
+            for ttl in (0, 300):
+                fetcher = PageFetcher(pool_size=args.concurrency)
+                # Cleartext HTTP/2 has no ALPN, so skip the HTTP/1.1 attempt
+                fetcher._transport = (
+                    Http2Transport(args.concurrency, http1=False)
+                    if http2
+                    else RequestsTransport(args.concurrency)
+                )
+                fetcher.dns_cache = cache
+                cache.ttl = ttl
+                cache.clear()
+                cache.hits = cache.misses = 0
+                connections_before = server.connections
+
+                result = fetch_all(fetcher, urls, args.concurrency)
+                result["connections"] = server.connections - connections_before
+                result["dns_lookups"] = cache.misses
+                fetcher.close()
+
+                variant = f"{name}_dns_cache" if ttl else name
+                results[variant] = result
+                print(
+                    f"   {variant:<22} {result['fetches_per_second']:8.1f} fetches/s  "
+                    f"p95 {result['fetch']['p95_ms']:.1f}ms  "
+                    f"{result['connections']} connections  "
+                    f"{result['dns_lookups']} DNS lookups"
+                )
+    return results
+
+
+def bench_state(args, workdir: str) -> Dict:
+    import gc
+    import tracemalloc
+
+    from records import CheckResult, ProductInfo, UrlStateTable
+    from tracing import Trace, Tracer
+
+    regions = ["us", "gb", "de", "fr", "jp", "sg", "au", "ca"]
+    urls = [
+        f"https://www.popmart.com/{regions[i % len(regions)]}/products/{i}/bench"
+        for i in range(args.state_urls)
+    ]
+    info = ProductInfo("Bench Product", "$27.99")
+
+    gc.collect()
+    objects_before = len(gc.get_objects())
+    tracemalloc.start()
+    table = UrlStateTable()
+    start = time.perf_counter()
+    for i, url in enumerate(urls):
+        table.record(CheckResult(url, i % 7 == 0, info))
+    first_pass = time.perf_counter() - start
+    traced, _ = tracemalloc.get_traced_memory()
+
+    # Steady state: every URL already has a row, nothing should grow
+    start = time.perf_counter()
+    for i, url in enumerate(urls):
+        table.record(CheckResult(url, i % 5 == 0, info))
+    steady = time.perf_counter() - start
+    growth = tracemalloc.get_traced_memory()[0] - traced
+    tracemalloc.stop()
+    gc.collect()
+    objects_added = len(gc.get_objects()) - objects_before
+
+    # The tracer sees every check too; two cycles' worth of traces
+    tracemalloc.start()
+    tracer = Tracer(trace_file="")
+    for cycle in range(2):
+        for i, url in enumerate(urls):
+            trace = Trace(url)
+            trace.stages = {"fetch.ttfb": 80 + i % 50, "parse": 3.5, "db": 0.4}
+            trace.total_ms = 84 + i % 50 + cycle
+            tracer.record(trace)
+    tracer_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    snapshot = json.dumps(tracer.summary())
+    summary_seconds = time.perf_counter() - start
+
+    return {
+        "urls": len(urls),
+        "table_bytes_per_url": round(table.nbytes() / len(urls), 1),
+        "traced_bytes_per_url": round(traced / len(urls), 1),
+        "steady_growth_bytes": growth,
+        "gc_objects_added": objects_added,
+        "record_first_pass_seconds": round(first_pass, 3),
+        "record_steady_seconds": round(steady, 3),
+        "product_info_bytes": sys.getsizeof(info),
+        "check_result_bytes": sys.getsizeof(CheckResult(urls[0], True, info)),
+        "tracer_bytes": tracer_bytes,
+        "tracer_summary_seconds": round(summary_seconds, 4),
+        "tracer_snapshot_bytes": len(snapshot),
+    }
+
+
+# Card added to the second collection page between discovery crawls
+NEW_LISTING = b"""      <div class="product_card">
+        <a href="/us/products/2200/THE-MONSTERS-Tasty-Macarons-Vinyl-Face-Blind-Box">
+          <h3 class="card_title">THE MONSTERS Tasty Macarons Vinyl Face Blind Box</h3>
+        </a>
+      </div>
+    </div>
+    <nav class="pagination">"""
+
+
+def bench_discovery(args, workdir: str) -> Dict:
+    from database import DatabaseManager
+    from discovery import DiscoveryCrawler
+    from fetch import PageFetcher
+
+    db = DatabaseManager(os.path.join(workdir, "discovery.db"))
+    results = {}
+    with FixtureServer(latency=args.latency, jitter=args.jitter) as server:
+        crawler = DiscoveryCrawler(
+            db,
+            fetcher=PageFetcher(),
+            seeds=[
+                f"{server.base_url}/sitemap.xml",
+                f"{server.base_url}/us/search?keyword=labubu",
+            ],
+        )
+        for run in ("cold", "unchanged", "new_listing"):
+            if run == "new_listing":
+                path = "/us/collection/11?page=2"
+                body = server.site[path][0].replace(
+                    b'    </div>\n    <nav class="pagination">', NEW_LISTING
+                )
+                server.publish(path, body)
+
+            requests_before = server.requests
+            report = crawler.run()
+            results[run] = {
+                "seconds": report["seconds"],
+                "pages": report["pages"],
+                "requests": server.requests - requests_before,
+                "downloaded": report["fetched"],
+                "not_modified": report["not_modified"],
+                "skipped_unchanged": report["unchanged"],
+                "added": len(report["added"]),
+            }
+            print(
+                f"   {run:<12} {report['seconds'] * 1000:7.1f}ms  "
+                f"{results[run]['requests']} requests, "
+                f"{report['fetched']} pages parsed, {len(report['added'])} new"
+            )
+        crawler.fetcher.close()
+    return results
+
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "cycle": bench_cycle,
+    "db": bench_db,
+    "dashboard": bench_dashboard,
+    "detection": bench_detection,
+    "transport": bench_transport,
+    "state": bench_state,
+    "discovery": bench_discovery,
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(data, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of a result tree keyed by dotted path"""
+    values = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            values.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, list):
+        for i, value in enumerate(data):
+            values.update(flatten(value, f"{prefix}{i}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        values[prefix.rstrip(".")] = data
+    return values
+
+
+def compare(previous: Dict, current: Dict, threshold: float) -> int:
+    """Print timings that moved by more than ``threshold`` (a fraction)
+
+    Returns the number of detection accuracy regressions, which are reported
+    whatever their size.
+    """
+    old = flatten(previous["results"])
+    new = flatten(current["results"])
+    print(
+        f"\n📊 Compared with {previous['meta']['commit']} "
+        f"({previous['meta']['timestamp']}):"
+    )
+
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        if not key.endswith(("precision", "recall", "false_restock_count")):
+            continue
+        lower_is_worse = not key.endswith("false_restock_count")
+        if (new[key] < old[key]) if lower_is_worse else (new[key] > old[key]):
+            regressions += 1
+            print(f"  ❌ {key}: {old[key]} → {new[key]}")
+
+    changed = 0
+    for key in sorted(old.keys() & new.keys()):
+        if not key.endswith(("_ms", "seconds", "per_second")) or not old[key]:
+            continue
+        change = (new[key] - old[key]) / old[key]
+        if abs(change) >= threshold:
+            changed += 1
+            # Throughput going down is the regression, for timings it's up
+            worse = change < 0 if key.endswith("per_second") else change > 0
+            marker = "🔺" if worse else "🔻"
+            print(f"  {marker} {key}: {old[key]} → {new[key]} ({change:+.0%})")
+
+    if not changed:
+        print(f"  ✅ No changes over {threshold:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks")
+    parser.add_argument(
+        "scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)"
+    )
+    parser.add_argument("--repeat", type=int, default=50, help="iterations per timing")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--cycles", type=int, default=2, help="cycles per size")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="fixture server latency (s)"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="extra random latency (s)"
+    )
+    parser.add_argument("--db-rows", type=int, default=2000)
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=list(DETECTORS),
+        default=list(DETECTORS),
+        help="stock detectors to compare",
+    )
+    parser.add_argument(
+        "--fetches", type=int, default=200, help="pages per transport run"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="parallel transport fetches"
+    )
+    parser.add_argument(
+        "--state-urls", type=int, default=50000, help="URLs in the state table"
+    )
+    parser.add_argument("--output", help="results file (default: benchmarks/results/)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="change to report when comparing"
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    args.scenarios = args.scenarios or SCENARIOS
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+
+    # Never reach real services, and don't rate limit the fixture server
+    Config.OPENAI_API_KEY = ""
+    Config.HOST_RATE = Config.HOST_BURST = 1e6
+    # No model is called, so don't wait to batch requests for one
+    Config.AI_BATCH_WINDOW = 0
+    for setting in ("ENABLE_EMAIL", "ENABLE_DISCORD", "ENABLE_WEBHOOK", "ENABLE_SLACK"):
+        setattr(Config, setting, False)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="labubu-bench-") as workdir:
+        for scenario in args.scenarios:
+            print(f"⏱️  Running {scenario}...")
+            start = time.perf_counter()
+            report["results"][scenario] = BENCHMARKS[scenario](args, workdir)
+            print(f"   done in {time.perf_counter() - start:.1f}s")
+
+    output = args.output or os.path.join(
+        ROOT,
+        "benchmarks",
+        "results",
+        f"{datetime.now():%Y%m%d-%H%M%S}-{report['meta']['commit']}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"❌ {regressions} detection accuracy regression(s)")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from config import Config
+from database import DatabaseManager
+
+
+class CheckJobManager:
+    """Runs ad-hoc stock checks on a bounded worker pool
+
+    Jobs are recorded in SQLite so any dashboard process can report on them,
+    and a request for a URL that already has a queued or running job of the
+    same kind gets that job back instead of starting another one.
+    """
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        on_finished: Optional[Callable[[Dict], None]] = None,
+    ):
+        self.db = db
+        self.on_finished = on_finished
+        self.max_workers = Config.CHECK_JOB_WORKERS
+        self.timeout = Config.CHECK_JOB_TIMEOUT
+        self.retention = Config.CHECK_JOB_RETENTION
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="check-job"
+                )
+        self._executor.submit(fn, *args)
+
+    def submit(self, kind: str, url: str, fn: Callable[[], Dict]) -> Tuple[Dict, bool]:
+        """Queue fn as a job, returning (job, created)
+
+        When an identical job is already active, fn is not run and the
+        existing job is returned with created=False.
+        """
+        expired = self.db.expire_check_jobs(self.timeout, self.retention)
+        if expired:
+            logging.warning(f"⏰ Expired {expired} stuck check job(s)")
+
+        job, created = self.db.create_check_job(uuid.uuid4().hex, kind, url)
+        if created:
+            logging.info(f"🧪 Queued {kind} job {job['id']} for {url}")
+            self._submit(self._run, job["id"], kind, url, fn)
+        else:
+            logging.info(f"🧪 Reusing active {kind} job {job['id']} for {url}")
+        return job, created
+
+    def _run(self, job_id: str, kind: str, url: str, fn: Callable[[], Dict]):
+        self.db.start_check_job(job_id)
+        try:
+            result = fn()
+            self.db.finish_check_job(job_id, result=result)
+            logging.info(f"✅ {kind} job {job_id} finished for {url}")
+        except Exception as e:
+            logging.error(f"❌ {kind} job {job_id} failed for {url}: {e}")
+            self.db.finish_check_job(job_id, error=str(e))
+
+        if self.on_finished:
+            try:
+                self.on_finished(self.db.get_check_job(job_id))
+            except Exception as e:
+                logging.error(f"Check job callback error: {e}")
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Get a job's status and result"""
+        return self.db.get_check_job(job_id)
+
+    def shutdown(self):
+        """Stop accepting work; running jobs are left to finish"""
+        with self._lock:
+            if self._executor:
+                self._executor.shutdown(wait=False)
+                self._executor = None
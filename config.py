@@ -7,10 +7,44 @@ class Config:
 
     # Database settings
     DB_PATH = os.getenv("DB_PATH", "labubu_monitor.db")
+    DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "10"))  # seconds
 
     # Monitoring settings
     CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "30"))  # seconds
-    REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "10"))  # seconds
+    REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "10"))  # read timeout, seconds
+    CONNECT_TIMEOUT = float(os.getenv("CONNECT_TIMEOUT", "5"))  # seconds
+    CHECK_DEADLINE = float(os.getenv("CHECK_DEADLINE", "20"))  # whole fetch, seconds
+    ENABLE_HEDGED_REQUESTS = (
+        os.getenv("ENABLE_HEDGED_REQUESTS", "false").lower() == "true"
+    )
+    HEDGE_DELAY = float(os.getenv("HEDGE_DELAY", "0"))  # seconds, 0 = host's p95
+    CHECK_CONCURRENCY = int(os.getenv("CHECK_CONCURRENCY", "4"))  # URLs at once
+    HTTP_TRANSPORT = os.getenv("HTTP_TRANSPORT", "requests")  # requests or http2
+    DNS_CACHE_TTL = float(os.getenv("DNS_CACHE_TTL", "0"))  # seconds, 0 = off
+    # Entries can't see record TTLs, so keep them short enough for failovers
+    DNS_CACHE_MAX_TTL = float(os.getenv("DNS_CACHE_MAX_TTL", "60"))
+
+    # Per-host politeness: token bucket with AIMD backoff and circuit breakers
+    HOST_RATE = float(os.getenv("HOST_RATE", "1"))  # requests per second per host
+    HOST_BURST = float(os.getenv("HOST_BURST", "1"))
+    HOST_MIN_RATE = float(os.getenv("HOST_MIN_RATE", "0.05"))  # floor when backing off
+    HOST_MAX_WAIT = float(os.getenv("HOST_MAX_WAIT", "60"))  # longer waits skip the URL
+    BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "5"))  # failures in a row
+    BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "60"))  # seconds
+    BREAKER_MAX_COOLDOWN = float(os.getenv("BREAKER_MAX_COOLDOWN", "900"))  # seconds
+    STOCK_DETECTOR = os.getenv("STOCK_DETECTOR", "heuristic")  # heuristic or strict
+
+    # Catalogue discovery: crawl sitemaps and collection pages for new products
+    ENABLE_DISCOVERY = os.getenv("ENABLE_DISCOVERY", "false").lower() == "true"
+    DISCOVERY_SEEDS = os.getenv(
+        "DISCOVERY_SEEDS",
+        "https://www.popmart.com/sitemap.xml,https://www.popmart.com/us/collection/11",
+    )
+    DISCOVERY_INTERVAL = int(os.getenv("DISCOVERY_INTERVAL", "300"))  # seconds
+    DISCOVERY_MAX_DEPTH = int(os.getenv("DISCOVERY_MAX_DEPTH", "2"))  # links from seeds
+    DISCOVERY_MAX_PAGES = int(os.getenv("DISCOVERY_MAX_PAGES", "200"))  # per run
+    DISCOVERY_CONCURRENCY = int(os.getenv("DISCOVERY_CONCURRENCY", "2"))
+    DISCOVERY_KEYWORDS = os.getenv("DISCOVERY_KEYWORDS", "labubu,the monsters")
 
     # URLs to monitor
     DEFAULT_URLS = [
@@ -21,6 +55,21 @@ class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
 
+    # AI message cache settings
+    ENABLE_AI_MESSAGE_CACHE = (
+        os.getenv("ENABLE_AI_MESSAGE_CACHE", "true").lower() == "true"
+    )
+    AI_MESSAGE_TTL = int(os.getenv("AI_MESSAGE_TTL", "21600"))  # seconds
+    AI_MESSAGE_REFRESH = os.getenv("AI_MESSAGE_REFRESH", "true").lower() == "true"
+    AI_PRECOMPUTE_WORKERS = int(os.getenv("AI_PRECOMPUTE_WORKERS", "2"))
+    # Cached messages kept in memory; the rest are read from the database
+    AI_MESSAGE_MEMORY_ENTRIES = int(os.getenv("AI_MESSAGE_MEMORY_ENTRIES", "2000"))
+    AI_BATCH_WINDOW = float(os.getenv("AI_BATCH_WINDOW", "0.5"))  # 0 disables
+    AI_BATCH_MAX_SIZE = int(os.getenv("AI_BATCH_MAX_SIZE", "20"))
+
+    # Send the template alert first and follow up with the AI message
+    SEND_FIRST_ALERTS = os.getenv("SEND_FIRST_ALERTS", "false").lower() == "true"
+
     # Notification settings
     ENABLE_EMAIL = os.getenv("ENABLE_EMAIL", "false").lower() == "true"
     EMAIL_SMTP_SERVER = os.getenv("EMAIL_SMTP_SERVER", "smtp.gmail.com")
@@ -38,15 +87,66 @@ class Config:
     ENABLE_SLACK = os.getenv("ENABLE_SLACK", "false").lower() == "true"
     SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL", "")
 
+    # Notification outbox settings
+    ENABLE_OUTBOX = os.getenv("ENABLE_OUTBOX", "true").lower() == "true"
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    OUTBOX_BASE_BACKOFF = float(os.getenv("OUTBOX_BASE_BACKOFF", "2"))  # seconds
+    OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "300"))  # seconds
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))  # seconds
+
+    # Webhook delivery settings (Discord, Slack, generic webhook)
+    WEBHOOK_DEFAULT_RATE = float(os.getenv("WEBHOOK_DEFAULT_RATE", "1"))  # per second
+    WEBHOOK_DEFAULT_BURST = float(os.getenv("WEBHOOK_DEFAULT_BURST", "5"))
+    WEBHOOK_MAX_WAIT = float(os.getenv("WEBHOOK_MAX_WAIT", "2"))  # seconds
+    WEBHOOK_TIMEOUT = int(os.getenv("WEBHOOK_TIMEOUT", "10"))  # seconds
+    NOTIFY_BATCH_WINDOW = float(os.getenv("NOTIFY_BATCH_WINDOW", "0"))  # seconds
+
     # Web dashboard settings
     WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
     WEB_PORT = int(os.getenv("WEB_PORT", "8080"))
     SECRET_KEY = os.getenv("SECRET_KEY", "labubu-monitor-secret-key")
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", "0"))  # 0 = development server
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))  # per worker
+    GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "500"))  # bytes
+
+    # API response cache (memory, or sqlite to share entries between workers)
+    ENABLE_RESPONSE_CACHE = os.getenv("ENABLE_RESPONSE_CACHE", "true").lower() == "true"
+    RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))  # seconds
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+    # How often a worker re-reads the generation the monitor bumps
+    RESPONSE_CACHE_CHECK_INTERVAL = float(
+        os.getenv("RESPONSE_CACHE_CHECK_INTERVAL", "1")
+    )  # seconds
+    STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", "1"))  # seconds
+    CHECK_JOB_WORKERS = int(os.getenv("CHECK_JOB_WORKERS", "2"))
+    CHECK_JOB_TIMEOUT = int(os.getenv("CHECK_JOB_TIMEOUT", "300"))  # seconds
+    CHECK_JOB_RETENTION = int(os.getenv("CHECK_JOB_RETENTION", "86400"))  # seconds
+
+    # Per-stage check latency tracing
+    TRACE_WINDOW = int(os.getenv("TRACE_WINDOW", "500"))  # samples per host/stage
+    TRACE_SLOWEST_URLS = int(os.getenv("TRACE_SLOWEST_URLS", "20"))  # per-URL detail
+    TRACE_FILE = os.getenv("TRACE_FILE", "")  # JSONL file, empty disables
+
+    # Prometheus metrics (the monitor serves them on this port, 0 disables)
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
 
     # Logging settings
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE = os.getenv("LOG_FILE", "labubu_monitor.log")
 
+    @classmethod
+    def get_discovery_seeds(cls) -> List[str]:
+        return [url.strip() for url in cls.DISCOVERY_SEEDS.split(",") if url.strip()]
+
+    @classmethod
+    def get_discovery_keywords(cls) -> List[str]:
+        return [
+            word.strip().lower()
+            for word in cls.DISCOVERY_KEYWORDS.split(",")
+            if word.strip()
+        ]
+
     @classmethod
     def get_urls(cls) -> List[str]:
         """Get URLs from environment or default"""
@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from database import DatabaseManager
+from response_cache import ResponseCache
+
+
+def calculate_notification_success_rate(notification_stats: Dict) -> float:
+    """Calculate overall notification success rate"""
+    total_success = 0
+    total_attempts = 0
+
+    for notifier_type, stats in notification_stats.items():
+        total_success += stats.get("success", 0)
+        total_attempts += sum(stats.values())
+
+    if total_attempts == 0:
+        return 0.0
+
+    return (total_success / total_attempts) * 100
+
+
+class DashboardSnapshot:
+    """Precomputed dashboard data, refreshed by the monitor after each cycle
+
+    Given a response cache, ``get()`` only looks for a new snapshot when the
+    cache generation moves on. The monitor refreshes the snapshot before
+    bumping the generation, so page views in between never touch SQLite.
+    """
+
+    NAME = "dashboard"
+    RECENT_EVENTS = 20
+
+    def __init__(self, db: DatabaseManager, response_cache: ResponseCache = None):
+        self.db = db
+        self.response_cache = response_cache
+        self._payload: Optional[Dict] = None
+        self._version: Optional[float] = None
+        self._generation: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def build(self, cycle: Dict = None) -> Dict:
+        """Compute the dashboard data from the database"""
+        monitored_urls = self.db.get_monitor_urls()
+        notification_stats = self.db.get_notification_stats(24)
+
+        stats = {
+            "total_urls": len(monitored_urls),
+            "total_events_24h": self.db.count_events_since(24),
+            "in_stock_now": self.db.count_in_stock_now(),
+            "notification_success_rate": calculate_notification_success_rate(
+                notification_stats
+            ),
+        }
+
+        return {
+            "stats": stats,
+            "monitored_urls": monitored_urls,
+            "recent_events": self.db.get_recent_events(self.RECENT_EVENTS),
+            "notification_stats": notification_stats,
+            "cycle": cycle,
+            "generated_at": time.time(),
+        }
+
+    def refresh(self, cycle: Dict = None) -> Dict:
+        """Rebuild and store the snapshot"""
+        if cycle is None and self._payload:
+            cycle = self._payload.get("cycle")
+
+        payload = self.build(cycle)
+        version = self.db.save_snapshot(self.NAME, payload)
+        with self._lock:
+            self._payload = payload
+            self._version = version
+
+        logging.debug("Dashboard snapshot refreshed")
+        return payload
+
+    def get(self) -> Dict:
+        """Get the latest snapshot, re-reading it only when it has changed"""
+        # Read before the snapshot so a bump in between forces another look
+        generation = self.response_cache.generation() if self.response_cache else None
+        with self._lock:
+            if (
+                generation is not None
+                and generation == self._generation
+                and self._payload is not None
+            ):
+                return self._payload
+
+        payload = self.load()
+        with self._lock:
+            self._generation = generation
+        return payload
+
+    def load(self) -> Dict:
+        """Get the latest stored snapshot, whatever the cache generation"""
+        version = self.db.get_snapshot_version(self.NAME)
+        if version is None:
+            return self.refresh()
+
+        with self._lock:
+            if version == self._version and self._payload is not None:
+                return self._payload
+
+        stored = self.db.get_snapshot(self.NAME)
+        if stored is None:
+            return self.refresh()
+
+        payload, version = stored
+        with self._lock:
+            self._payload = payload
+            self._version = version
+        return payload
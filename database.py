@@ -1,9 +1,12 @@
 import sqlite3
+import json
 import logging
+import time
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple
 from contextlib import contextmanager
 from config import Config
+import metrics
 
 
 class DatabaseManager:
@@ -18,6 +21,10 @@ class DatabaseManager:
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
+            # WAL lets the dashboard workers read while the monitor writes;
+            # the journal mode is persistent, so this only needs doing once
+            cursor.execute("PRAGMA journal_mode=WAL")
+
             # Stock events table
             cursor.execute(
                 """
@@ -64,18 +71,175 @@ class DatabaseManager:
             """
             )
 
+            # Notification outbox table (durable delivery queue)
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS notification_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idempotency_key TEXT UNIQUE NOT NULL,
+                    url TEXT NOT NULL,
+                    notification_type TEXT NOT NULL,
+                    message TEXT,
+                    product_info TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    detected_at REAL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_outbox_due
+                ON notification_outbox (status, next_attempt_at)
+            """
+            )
+
+            # Dashboard snapshot table (precomputed by the monitor)
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS dashboard_snapshot (
+                    name TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """
+            )
+
+            # Response cache generation, bumped whenever dashboard data changes
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_state (
+                    name TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL DEFAULT 0
+                )
+            """
+            )
+
+            # Cached API responses shared between dashboard workers
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL,
+                    body BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """
+            )
+
+            # Ad-hoc check jobs started from the dashboard
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS check_jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """
+            )
+            # At most one active job per check kind and URL
+            cursor.execute(
+                """
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_check_jobs_active
+                ON check_jobs (kind, url) WHERE status IN ('queued', 'running')
+            """
+            )
+
+            # Indexes for latest-per-URL and time-window queries
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_stock_events_url
+                ON stock_events (url, id)
+            """
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_stock_events_timestamp
+                ON stock_events (timestamp)
+            """
+            )
+            # Keyset pagination of a single URL's history
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_stock_events_url_timestamp
+                ON stock_events (url, timestamp)
+            """
+            )
+
+            # Columns added after the original schema
+            self._ensure_column(cursor, "notifications", "stage", "TEXT")
+            self._ensure_column(cursor, "notifications", "latency_ms", "REAL")
+            self._ensure_column(
+                cursor, "notification_outbox", "stage", "TEXT DEFAULT 'alert'"
+            )
+            self._ensure_column(cursor, "notification_outbox", "parent_key", "TEXT")
+            self._ensure_column(cursor, "notification_outbox", "message_ref", "TEXT")
+            self._ensure_column(cursor, "monitor_settings", "tags", "TEXT")
+            self._ensure_column(cursor, "monitor_settings", "settings", "TEXT")
+
+            # Discovery crawl state, for conditional and incremental crawls
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS crawl_state (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT,
+                    links TEXT,
+                    status_code INTEGER,
+                    crawled_at REAL NOT NULL,
+                    changed_at REAL
+                )
+            """
+            )
+
+            # Cached AI restock messages
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ai_messages (
+                    url TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """
+            )
+
             conn.commit()
             logging.info("Database initialized successfully")
 
+    @staticmethod
+    def _ensure_column(cursor, table: str, column: str, definition: str):
+        """Add a column to an existing table if it is missing"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
     @contextmanager
     def get_connection(self):
         """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
+        # Wait for locks held by other processes instead of failing at once
+        start = time.perf_counter()
+        conn = sqlite3.connect(self.db_path, timeout=Config.DB_BUSY_TIMEOUT)
         conn.row_factory = sqlite3.Row  # Enable dict-like access
+        conn.execute("PRAGMA synchronous=NORMAL")
         try:
             yield conn
         finally:
             conn.close()
+            metrics.DB_CONNECTIONS.inc()
+            metrics.DB_CONNECTION_SECONDS.observe(time.perf_counter() - start)
 
     def log_stock_event(
         self, url: str, has_stock: bool, product_name: str = None, price: str = None
@@ -101,7 +265,13 @@ class DatabaseManager:
             return event_id
 
     def log_notification(
-        self, url: str, notification_type: str, status: str, message: str = None
+        self,
+        url: str,
+        notification_type: str,
+        status: str,
+        message: str = None,
+        stage: str = None,
+        latency_ms: float = None,
     ) -> int:
         """Log a notification attempt"""
         with self.get_connection() as conn:
@@ -109,21 +279,30 @@ class DatabaseManager:
             cursor.execute(
                 """
                 INSERT INTO notifications 
-                (url, notification_type, status, message, timestamp)
-                VALUES (?, ?, ?, ?, ?)
+                (url, notification_type, status, message, timestamp, stage, latency_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-                (url, notification_type, status, message, datetime.utcnow()),
+                (
+                    url,
+                    notification_type,
+                    status,
+                    message,
+                    datetime.utcnow(),
+                    stage,
+                    latency_ms,
+                ),
             )
             conn.commit()
             return cursor.lastrowid
 
     def get_recent_events(self, limit: int = 100) -> List[Dict]:
-        """Get recent stock events"""
+        """Get recent stock events (``ts`` is the timestamp in epoch seconds)"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
-                SELECT * FROM stock_events 
+                SELECT *, CAST(strftime('%s', timestamp) AS INTEGER) AS ts
+                FROM stock_events
                 ORDER BY timestamp DESC 
                 LIMIT ?
             """,
@@ -131,6 +310,208 @@ class DatabaseManager:
             )
             return [dict(row) for row in cursor.fetchall()]
 
+    def count_events_since(self, hours: int = 24) -> int:
+        """Count stock events in the last N hours"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT COUNT(*) FROM stock_events
+                WHERE timestamp > datetime('now', '-{} hours')
+            """.format(
+                    hours
+                )
+            )
+            return cursor.fetchone()[0]
+
+    def count_in_stock_now(self) -> int:
+        """Count active URLs whose most recent check found stock"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT COUNT(*) FROM monitor_settings m
+                JOIN stock_events e ON e.id = (
+                    SELECT MAX(id) FROM stock_events WHERE url = m.url
+                )
+                WHERE m.is_active = 1 AND e.has_stock = 1
+            """
+            )
+            return cursor.fetchone()[0]
+
+    def get_events_after(self, event_id: int, limit: int = 500) -> List[Dict]:
+        """Get stock events newer than the given id, oldest first"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT * FROM stock_events
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            """,
+                (event_id, limit),
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_max_event_id(self) -> int:
+        """Get the id of the newest stock event (0 when there are none)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM stock_events")
+            return cursor.fetchone()[0]
+
+    def get_latest_events(self) -> Dict[str, Dict]:
+        """Get the newest stock event for every URL in one query"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT e.* FROM stock_events e
+                JOIN (
+                    SELECT url, MAX(id) AS max_id FROM stock_events GROUP BY url
+                ) latest ON e.id = latest.max_id
+            """
+            )
+            return {row["url"]: dict(row) for row in cursor.fetchall()}
+
+    def get_url_statuses(self) -> List[Dict]:
+        """Get every active monitor URL with its newest stock event"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT
+                    m.url,
+                    m.product_name,
+                    e.has_stock,
+                    e.timestamp,
+                    e.price
+                FROM monitor_settings m
+                LEFT JOIN stock_events e ON e.id = (
+                    SELECT MAX(id) FROM stock_events WHERE url = m.url
+                )
+                WHERE m.is_active = 1
+                ORDER BY m.created_at
+            """
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _event_filters(
+        url: str = None,
+        has_stock: bool = None,
+        since: str = None,
+        until: str = None,
+    ) -> Tuple[List[str], List]:
+        """Build WHERE clauses for stock event filters"""
+        clauses, params = [], []
+        if url:
+            clauses.append("url = ?")
+            params.append(url)
+        if has_stock is not None:
+            clauses.append("has_stock = ?")
+            params.append(1 if has_stock else 0)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        return clauses, params
+
+    def query_events(
+        self,
+        url: str = None,
+        has_stock: bool = None,
+        since: str = None,
+        until: str = None,
+        before: Tuple[str, int] = None,
+        limit: int = 100,
+    ) -> List[Dict]:
+        """Get one page of stock events, newest first, using a keyset cursor
+
+        ``before`` is the (timestamp, id) of the last row of the previous
+        page, so each page is an index seek regardless of how deep it is.
+        """
+        clauses, params = self._event_filters(url, has_stock, since, until)
+        if before:
+            clauses.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+            params.extend([before[0], before[0], before[1]])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT *, CAST(strftime('%s', timestamp) AS INTEGER) AS ts
+                FROM stock_events
+                {where}
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            """,
+                params + [limit],
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def iter_events(
+        self,
+        url: str = None,
+        has_stock: bool = None,
+        since: str = None,
+        until: str = None,
+        batch_size: int = 500,
+    ) -> Iterator[Dict]:
+        """Stream matching stock events, newest first, without loading them all"""
+        clauses, params = self._event_filters(url, has_stock, since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT *, CAST(strftime('%s', timestamp) AS INTEGER) AS ts
+                FROM stock_events
+                {where}
+                ORDER BY timestamp DESC, id DESC
+            """,
+                params,
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+
+    def count_events(
+        self,
+        url: str = None,
+        has_stock: bool = None,
+        since: str = None,
+        until: str = None,
+    ) -> Dict[str, int]:
+        """Count matching stock events, split by stock state"""
+        clauses, params = self._event_filters(url, has_stock, since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT
+                    COUNT(*) AS total,
+                    COALESCE(SUM(has_stock), 0) AS in_stock
+                FROM stock_events
+                {where}
+            """,
+                params,
+            )
+            row = cursor.fetchone()
+            return {
+                "total": row["total"],
+                "in_stock": row["in_stock"],
+                "out_of_stock": row["total"] - row["in_stock"],
+            }
+
     def get_stock_history(self, url: str, hours: int = 24) -> List[Dict]:
         """Get stock history for a specific URL"""
         with self.get_connection() as conn:
@@ -175,32 +556,283 @@ class DatabaseManager:
             return stats
 
     def add_monitor_url(self, url: str, product_name: str = None) -> bool:
-        """Add or update a URL to monitor"""
+        """Add a URL to monitor, keeping the metadata of one already known"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
-                INSERT OR REPLACE INTO monitor_settings 
-                (url, product_name, updated_at)
+                INSERT INTO monitor_settings (url, product_name, updated_at)
                 VALUES (?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    product_name = excluded.product_name,
+                    updated_at = excluded.updated_at
+                WHERE excluded.product_name IS NOT NULL
             """,
                 (url, product_name, datetime.utcnow()),
             )
             conn.commit()
             return True
 
-    def get_monitor_urls(self) -> List[Dict]:
-        """Get all active monitor URLs"""
+    def upsert_monitor_urls(
+        self, entries: List[Dict], deactivate_missing: bool = False
+    ) -> Dict[str, int]:
+        """Insert or update many URLs in one transaction
+
+        Each entry has a ``url`` and optionally ``product_name``,
+        ``target_price``, ``tags`` (list), ``settings`` (dict of opaque
+        metadata) and ``is_active``. Fields an entry leaves out keep their stored values.
+        With ``deactivate_missing``, active URLs not in ``entries`` are
+        deactivated, for syncing against a full catalogue.
+        """
+        now = datetime.utcnow()
+        rows = [
+            (
+                entry["url"],
+                entry.get("product_name"),
+                entry.get("target_price"),
+                json.dumps(entry["tags"]) if "tags" in entry else None,
+                json.dumps(entry["settings"]) if "settings" in entry else None,
+                int(entry["is_active"]) if "is_active" in entry else None,
+                now,
+            )
+            for entry in entries
+        ]
+        urls = [entry["url"] for entry in entries]
+
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            existing = self._existing_monitor_urls(cursor, urls)
+
+            cursor.executemany(
+                """
+                INSERT INTO monitor_settings
+                (url, product_name, target_price, tags, settings, is_active, updated_at)
+                VALUES (?1, ?2, ?3, ?4, ?5, COALESCE(?6, 1), ?7)
+                ON CONFLICT(url) DO UPDATE SET
+                    product_name = COALESCE(?2, product_name),
+                    target_price = COALESCE(?3, target_price),
+                    tags = COALESCE(?4, tags),
+                    settings = COALESCE(?5, settings),
+                    is_active = COALESCE(?6, is_active),
+                    updated_at = ?7
+            """,
+                rows,
+            )
+
+            deactivated = 0
+            if deactivate_missing:
+                cursor.execute(
+                    "CREATE TEMP TABLE import_urls (url TEXT PRIMARY KEY) WITHOUT ROWID"
+                )
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO import_urls (url) VALUES (?)",
+                    [(url,) for url in urls],
+                )
+                cursor.execute(
+                    """
+                    UPDATE monitor_settings SET is_active = 0, updated_at = ?
+                    WHERE is_active = 1
+                    AND url NOT IN (SELECT url FROM temp.import_urls)
+                """,
+                    (now,),
+                )
+                deactivated = cursor.rowcount
+                cursor.execute("DROP TABLE temp.import_urls")
+            conn.commit()
+
+        return {
+            "inserted": len(set(urls) - existing),
+            "updated": len(existing),
+            "deactivated": deactivated,
+        }
+
+    @staticmethod
+    def _existing_monitor_urls(cursor, urls: List[str]) -> set:
+        """Which of ``urls`` are already in monitor_settings"""
+        existing = set()
+        for i in range(0, len(urls), 500):
+            chunk = urls[i : i + 500]
             cursor.execute(
+                f"""
+                SELECT url FROM monitor_settings
+                WHERE url IN ({",".join("?" * len(chunk))})
+            """,
+                chunk,
+            )
+            existing.update(row[0] for row in cursor.fetchall())
+        return existing
+
+    def add_new_monitor_urls(self, entries: List[Dict]) -> List[str]:
+        """Insert only the URLs not known yet, returning those added
+
+        URLs already in monitor_settings are left alone, including ones
+        that were deactivated on purpose.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            existing = self._existing_monitor_urls(
+                cursor, [entry["url"] for entry in entries]
+            )
+            new = [entry for entry in entries if entry["url"] not in existing]
+            cursor.executemany(
                 """
-                SELECT * FROM monitor_settings 
-                WHERE is_active = 1
-                ORDER BY created_at
-            """
+                INSERT OR IGNORE INTO monitor_settings
+                (url, product_name, tags, updated_at)
+                VALUES (?, ?, ?, ?)
+            """,
+                [
+                    (
+                        entry["url"],
+                        entry.get("product_name"),
+                        json.dumps(entry["tags"]) if entry.get("tags") else None,
+                        datetime.utcnow(),
+                    )
+                    for entry in new
+                ],
             )
-            return [dict(row) for row in cursor.fetchall()]
+            conn.commit()
+            return [entry["url"] for entry in new]
+
+    def get_crawl_state(self, url: str) -> Optional[Dict]:
+        with self.get_connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM crawl_state WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            state = dict(row)
+            state["links"] = json.loads(state["links"]) if state["links"] else []
+            return state
+
+    def save_crawl_state(
+        self,
+        url: str,
+        status_code: int,
+        etag: str = None,
+        last_modified: str = None,
+        content_hash: str = None,
+        links: List = None,
+        changed: bool = False,
+        crawled_at: float = None,
+    ):
+        """Record a crawl of ``url``; validators and links are kept unless given"""
+        now = crawled_at or time.time()
+        with self.get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO crawl_state
+                (url, etag, last_modified, content_hash, links, status_code,
+                 crawled_at, changed_at)
+                VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, CASE WHEN ?8 THEN ?7 END)
+                ON CONFLICT(url) DO UPDATE SET
+                    etag = COALESCE(?2, etag),
+                    last_modified = COALESCE(?3, last_modified),
+                    content_hash = COALESCE(?4, content_hash),
+                    links = COALESCE(?5, links),
+                    status_code = ?6,
+                    crawled_at = ?7,
+                    changed_at = CASE WHEN ?8 THEN ?7 ELSE changed_at END
+            """,
+                (
+                    url,
+                    etag,
+                    last_modified,
+                    content_hash,
+                    json.dumps(links) if links is not None else None,
+                    status_code,
+                    now,
+                    int(changed),
+                ),
+            )
+            conn.commit()
+
+    def update_monitor_url(self, url_id: int, **fields) -> Optional[Dict]:
+        """Change a monitored URL's settings, returning the updated row
+
+        Accepts ``product_name``, ``target_price``, ``tags``, ``settings``
+        and ``is_active``; returns None if there is no URL with that id.
+        """
+        columns = {
+            key: value
+            for key, value in fields.items()
+            if key in ("product_name", "target_price", "tags", "settings", "is_active")
+        }
+        for key in ("tags", "settings"):
+            if key in columns:
+                columns[key] = json.dumps(columns[key])
+        if "is_active" in columns:
+            columns["is_active"] = int(columns["is_active"])
+        columns["updated_at"] = datetime.utcnow()
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                UPDATE monitor_settings
+                SET {", ".join(f"{key} = ?" for key in columns)}
+                WHERE id = ?
+            """,
+                (*columns.values(), url_id),
+            )
+            conn.commit()
+        return self.get_monitor_url(url_id)
+
+    def set_monitor_urls_active(self, urls: List[str], active: bool) -> int:
+        """Activate or deactivate URLs, returning how many changed"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                UPDATE monitor_settings SET is_active = ?, updated_at = ?
+                WHERE url = ? AND is_active != ?
+            """,
+                [(int(active), datetime.utcnow(), url, int(active)) for url in urls],
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    @staticmethod
+    def _monitor_url_from_row(row) -> Dict:
+        url = dict(row)
+        url["tags"] = json.loads(url["tags"]) if url.get("tags") else []
+        url["settings"] = json.loads(url["settings"]) if url.get("settings") else {}
+        return url
+
+    def get_monitor_url(self, url_id: int) -> Optional[Dict]:
+        with self.get_connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM monitor_settings WHERE id = ?", (url_id,)
+            ).fetchone()
+            return self._monitor_url_from_row(row) if row else None
+
+    def get_monitor_urls(
+        self, include_inactive: bool = False, tag: str = None
+    ) -> List[Dict]:
+        """Get all active monitor URLs (optionally inactive ones, or one tag)"""
+        conditions, params = [], []
+        if not include_inactive:
+            conditions.append("is_active = 1")
+        if tag:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM json_each(monitor_settings.tags) WHERE value = ?)"
+            )
+            params.append(tag)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT *, CAST(strftime('%s', last_checked) AS INTEGER) AS last_checked_ts
+                FROM monitor_settings
+                {where}
+                ORDER BY created_at, id
+            """,
+                params,
+            )
+            return [self._monitor_url_from_row(row) for row in cursor.fetchall()]
 
     def update_last_checked(self, url: str):
         """Update last checked timestamp for a URL"""
@@ -215,3 +847,413 @@ class DatabaseManager:
                 (datetime.utcnow(), datetime.utcnow(), url),
             )
             conn.commit()
+
+    def enqueue_notification(
+        self,
+        idempotency_key: str,
+        url: str,
+        notification_type: str,
+        message: str,
+        product_info: Dict = None,
+        detected_at: float = None,
+        stage: str = "alert",
+        parent_key: str = None,
+    ) -> Optional[int]:
+        """Queue a notification for delivery, ignoring duplicate keys"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO notification_outbox
+                (idempotency_key, url, notification_type, message, product_info,
+                 next_attempt_at, detected_at, stage, parent_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    idempotency_key,
+                    url,
+                    notification_type,
+                    message,
+                    json.dumps(product_info or {}),
+                    time.time(),
+                    detected_at or time.time(),
+                    stage,
+                    parent_key,
+                ),
+            )
+            conn.commit()
+            if cursor.rowcount == 0:
+                logging.debug(f"Duplicate notification ignored: {idempotency_key}")
+                return None
+            return cursor.lastrowid
+
+    def get_notification_job(self, idempotency_key: str) -> Optional[Dict]:
+        """Get an outbox job by its idempotency key"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT * FROM notification_outbox WHERE idempotency_key = ?",
+                (idempotency_key,),
+            )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def get_due_notifications(self, limit: int = 50) -> List[Dict]:
+        """Get pending outbox jobs whose next attempt is due"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT * FROM notification_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+            """,
+                (time.time(), limit),
+            )
+            jobs = []
+            for row in cursor.fetchall():
+                job = dict(row)
+                job["product_info"] = json.loads(job["product_info"] or "{}")
+                jobs.append(job)
+            return jobs
+
+    def get_next_notification_due(self) -> Optional[float]:
+        """Get the earliest next_attempt_at of any pending outbox job"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT MIN(next_attempt_at) FROM notification_outbox
+                WHERE status = 'pending'
+            """
+            )
+            return cursor.fetchone()[0]
+
+    def mark_notification_delivered(self, job_id: int, message_ref: str = None):
+        """Mark an outbox job as delivered"""
+        with self.get_connection() as conn:
+            conn.execute(
+                """
+                UPDATE notification_outbox
+                SET status = 'delivered', attempts = attempts + 1,
+                    last_error = NULL, message_ref = ?, updated_at = ?
+                WHERE id = ?
+            """,
+                (message_ref, datetime.utcnow(), job_id),
+            )
+            conn.commit()
+
+    def schedule_notification_retry(
+        self, job_id: int, next_attempt_at: float, error: str = None
+    ):
+        """Record a failed attempt and schedule the next one"""
+        with self.get_connection() as conn:
+            conn.execute(
+                """
+                UPDATE notification_outbox
+                SET attempts = attempts + 1, next_attempt_at = ?,
+                    last_error = ?, updated_at = ?
+                WHERE id = ?
+            """,
+                (next_attempt_at, error, datetime.utcnow(), job_id),
+            )
+            conn.commit()
+
+    def defer_notification(self, job_id: int, next_attempt_at: float):
+        """Push back an outbox job without counting it as an attempt"""
+        with self.get_connection() as conn:
+            conn.execute(
+                """
+                UPDATE notification_outbox
+                SET next_attempt_at = ?, updated_at = ?
+                WHERE id = ?
+            """,
+                (next_attempt_at, datetime.utcnow(), job_id),
+            )
+            conn.commit()
+
+    def dead_letter_notification(self, job_id: int, error: str = None):
+        """Move an outbox job to the dead-letter state"""
+        with self.get_connection() as conn:
+            conn.execute(
+                """
+                UPDATE notification_outbox
+                SET status = 'dead', attempts = attempts + 1,
+                    last_error = ?, updated_at = ?
+                WHERE id = ?
+            """,
+                (error, datetime.utcnow(), job_id),
+            )
+            conn.commit()
+
+    def get_outbox_stats(self) -> Dict[str, int]:
+        """Get outbox job counts by status"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT status, COUNT(*) as count
+                FROM notification_outbox
+                GROUP BY status
+            """
+            )
+            return {row["status"]: row["count"] for row in cursor.fetchall()}
+
+    def get_dead_notifications(self, limit: int = 100) -> List[Dict]:
+        """Get dead-lettered outbox jobs"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, idempotency_key, url, notification_type, attempts,
+                       last_error, created_at, updated_at
+                FROM notification_outbox
+                WHERE status = 'dead'
+                ORDER BY updated_at DESC
+                LIMIT ?
+            """,
+                (limit,),
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_ai_message(self, url: str) -> Optional[Dict]:
+        """Get the cached AI message for a URL"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM ai_messages WHERE url = ?", (url,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def save_ai_message(
+        self, url: str, fingerprint: str, message: str, expires_at: float
+    ):
+        """Store or replace the cached AI message for a URL"""
+        with self.get_connection() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO ai_messages
+                (url, fingerprint, message, created_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (url, fingerprint, message, time.time(), expires_at),
+            )
+            conn.commit()
+
+    def delete_ai_message(self, url: str):
+        """Drop the cached AI message for a URL"""
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM ai_messages WHERE url = ?", (url,))
+            conn.commit()
+
+    def get_alert_latency_stats(self, hours: int = 24) -> Dict:
+        """Get average and worst delivery latency per notification stage"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT
+                    COALESCE(stage, 'alert') as stage,
+                    COUNT(*) as count,
+                    AVG(latency_ms) as avg_ms,
+                    MAX(latency_ms) as max_ms
+                FROM notifications
+                WHERE latency_ms IS NOT NULL
+                  AND status = 'success'
+                  AND timestamp > datetime('now', '-{} hours')
+                GROUP BY COALESCE(stage, 'alert')
+            """.format(
+                    hours
+                )
+            )
+            return {row["stage"]: dict(row) for row in cursor.fetchall()}
+
+    def save_snapshot(self, name: str, payload: Dict) -> float:
+        """Store a precomputed snapshot and return its version"""
+        updated_at = time.time()
+        with self.get_connection() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO dashboard_snapshot (name, payload, updated_at)
+                VALUES (?, ?, ?)
+            """,
+                (name, json.dumps(payload), updated_at),
+            )
+            conn.commit()
+        return updated_at
+
+    def get_snapshot_version(self, name: str) -> Optional[float]:
+        """Get when a snapshot was last updated"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT updated_at FROM dashboard_snapshot WHERE name = ?", (name,)
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    def get_snapshot(self, name: str) -> Optional[Tuple[Dict, float]]:
+        """Get a snapshot payload and its version"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT payload, updated_at FROM dashboard_snapshot WHERE name = ?",
+                (name,),
+            )
+            row = cursor.fetchone()
+            return (json.loads(row["payload"]), row["updated_at"]) if row else None
+
+    @staticmethod
+    def _job_from_row(row) -> Dict:
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def create_check_job(self, job_id: str, kind: str, url: str) -> Tuple[Dict, bool]:
+        """Create a check job, or return the active one for the same kind and URL
+
+        Returns the job and whether it was newly created.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO check_jobs (id, kind, url, status, created_at)
+                VALUES (?, ?, ?, 'queued', ?)
+            """,
+                (job_id, kind, url, time.time()),
+            )
+            created = cursor.rowcount == 1
+            conn.commit()
+
+            cursor.execute(
+                """
+                SELECT * FROM check_jobs
+                WHERE kind = ? AND url = ? AND status IN ('queued', 'running')
+            """,
+                (kind, url),
+            )
+            row = cursor.fetchone()
+            if row is None:
+                # The active job finished between the insert and the select
+                return self.create_check_job(job_id, kind, url)
+            return self._job_from_row(row), created
+
+    def get_check_job(self, job_id: str) -> Optional[Dict]:
+        """Get a check job by id"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM check_jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            return self._job_from_row(row) if row else None
+
+    def start_check_job(self, job_id: str):
+        """Mark a check job as running"""
+        with self.get_connection() as conn:
+            conn.execute(
+                """
+                UPDATE check_jobs SET status = 'running', started_at = ?
+                WHERE id = ? AND status = 'queued'
+            """,
+                (time.time(), job_id),
+            )
+            conn.commit()
+
+    def finish_check_job(self, job_id: str, result: Dict = None, error: str = None):
+        """Record the outcome of a check job"""
+        with self.get_connection() as conn:
+            conn.execute(
+                """
+                UPDATE check_jobs
+                SET status = ?, result = ?, error = ?, finished_at = ?
+                WHERE id = ?
+            """,
+                (
+                    "failed" if error else "done",
+                    json.dumps(result) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+            conn.commit()
+
+    def expire_check_jobs(self, timeout: float, retention: float) -> int:
+        """Fail jobs stuck past the timeout and delete old finished jobs"""
+        now = time.time()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE check_jobs
+                SET status = 'failed', error = 'Job timed out', finished_at = ?
+                WHERE status IN ('queued', 'running') AND created_at < ?
+            """,
+                (now, now - timeout),
+            )
+            expired = cursor.rowcount
+            cursor.execute(
+                """
+                DELETE FROM check_jobs
+                WHERE status IN ('done', 'failed') AND finished_at < ?
+            """,
+                (now - retention,),
+            )
+            conn.commit()
+            return expired
+
+    def get_cache_generation(self, name: str) -> int:
+        """Get the current generation of a response cache"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT generation FROM cache_state WHERE name = ?", (name,))
+            row = cursor.fetchone()
+            return row[0] if row else 0
+
+    def bump_cache_generation(self, name: str) -> int:
+        """Invalidate a response cache and drop its shared entries"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO cache_state (name, generation) VALUES (?, 1)
+                ON CONFLICT(name) DO UPDATE SET generation = generation + 1
+            """,
+                (name,),
+            )
+            cursor.execute("SELECT generation FROM cache_state WHERE name = ?", (name,))
+            generation = cursor.fetchone()[0]
+            cursor.execute(
+                "DELETE FROM response_cache WHERE generation < ?", (generation,)
+            )
+            conn.commit()
+            return generation
+
+    def get_cached_response(
+        self, key: str, generation: int, max_age: float
+    ) -> Optional[bytes]:
+        """Get a shared cached response body for the given generation"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT body FROM response_cache
+                WHERE key = ? AND generation = ? AND created_at >= ?
+            """,
+                (key, generation, time.time() - max_age),
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    def save_cached_response(self, key: str, generation: int, body: bytes):
+        """Store a response body for other dashboard workers"""
+        with self.get_connection() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO response_cache
+                (key, generation, body, created_at)
+                VALUES (?, ?, ?, ?)
+            """,
+                (key, generation, body, time.time()),
+            )
+            conn.commit()
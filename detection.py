@@ -0,0 +1,204 @@
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Type
+
+from bs4 import BeautifulSoup
+
+from config import Config
+
+
+class StockDetector(ABC):
+    """Decides from a parsed product page whether it can be bought
+
+    ``product_info`` is the ProductInfo already extracted from the page.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def detect(self, soup: BeautifulSoup, product_info) -> bool:
+        pass
+
+
+class HeuristicDetector(StockDetector):
+    """The original phrase-matching rules, tuned for recall
+
+    Any button, link or div whose text mentions buying counts, so header
+    cart links and "notify me" pages can read as in stock.
+    """
+
+    name = "heuristic"
+
+    def detect(self, soup: BeautifulSoup, product_info) -> bool:
+        # Check for stock indicators
+        in_stock = False
+
+        # Method 1: Check for any button with stock-related text
+        all_buttons = soup.find_all(["button", "a", "div"])
+        stock_button_phrases = [
+            "add to cart",
+            "buy now",
+            "purchase",
+            "pick one to shake",
+            "buy multiple boxes",
+            "add to bag",
+            "shop now",
+            "get it now",
+            "buy",
+            "cart",
+            "shake",
+            "pick one",
+        ]
+
+        for btn in all_buttons:
+            btn_text = btn.get_text().strip().lower()
+            if btn_text and any(phrase in btn_text for phrase in stock_button_phrases):
+                # Check if button is not disabled
+                if not btn.get("disabled") and "disabled" not in btn.get("class", []):
+                    logging.debug(f"Found stock button: '{btn_text.strip()}'")
+                    in_stock = True
+                    break
+
+        # Method 2: Check for specific PopMart stock indicators in page text
+        if not in_stock:
+            page_text = soup.get_text().lower()
+            popmart_stock_indicators = [
+                "pick one to shake",
+                "buy multiple boxes",
+                "add to cart",
+                "in stock",
+                "available now",
+                "buy now",
+            ]
+
+            for indicator in popmart_stock_indicators:
+                if indicator in page_text:
+                    logging.debug(f"Found stock indicator in text: '{indicator}'")
+                    in_stock = True
+                    break
+
+        # Method 3: Check availability text
+        if not in_stock:
+            availability_texts = (
+                [product_info.availability] if product_info.availability else []
+            )
+
+            # Add more availability indicators
+            stock_indicators = soup.select(
+                ".stock-status, .availability, .product-status"
+            )
+            for indicator in stock_indicators:
+                availability_texts.append(indicator.get_text().strip().lower())
+
+            for text in availability_texts:
+                if text and any(
+                    phrase in text
+                    for phrase in ["in stock", "available", "add to cart"]
+                ):
+                    in_stock = True
+                    break
+                elif any(
+                    phrase in text
+                    for phrase in ["out of stock", "sold out", "unavailable"]
+                ):
+                    in_stock = False
+                    break
+
+        # Method 4: Check if page exists and doesn't show 404/error
+        if soup.select("h1"):  # Basic check if page loaded properly
+            page_text = soup.get_text().lower()
+            if "page not found" in page_text or "404" in page_text:
+                in_stock = False
+
+        return in_stock
+
+
+class StrictDetector(StockDetector):
+    """Only an enabled purchase control in the product area counts
+
+    Navigation, footers and recommendation grids are ignored, and controls
+    that are disabled or say "sold out"/"notify me" never count. Tuned so a
+    false restock (an alert and a model call for nothing) is rare.
+    """
+
+    name = "strict"
+
+    BUY_PHRASES = (
+        "add to bag",
+        "add to cart",
+        "buy now",
+        "pick one to shake",
+        "buy multiple boxes",
+    )
+    UNAVAILABLE_PHRASES = (
+        "sold out",
+        "out of stock",
+        "coming soon",
+        "notify me",
+        "unavailable",
+    )
+    PRODUCT_SCOPES = (
+        ".product_detail",
+        ".product-detail",
+        '[data-testid="product-detail"]',
+        "main",
+    )
+    CONTROLS = (
+        'button, a, input[type="submit"], [role="button"], '
+        '[class*="btn"], [class*="button"]'
+    )
+    # Longer text means a container was matched, not a control
+    MAX_CONTROL_TEXT = 40
+
+    def _is_error_page(self, soup: BeautifulSoup) -> bool:
+        heading = soup.select_one("h1")
+        title = soup.title.get_text() if soup.title else ""
+        text = f"{title} {heading.get_text() if heading else ''}".lower()
+        return "404" in text or "page not found" in text
+
+    def _product_scope(self, soup: BeautifulSoup):
+        for selector in self.PRODUCT_SCOPES:
+            scope = soup.select_one(selector)
+            if scope is not None:
+                return scope
+        return soup.body or soup
+
+    def _is_disabled(self, control, text: str) -> bool:
+        return (
+            control.has_attr("disabled")
+            or "disabled" in control.get("class", [])
+            or control.get("aria-disabled") == "true"
+            or any(phrase in text for phrase in self.UNAVAILABLE_PHRASES)
+        )
+
+    def detect(self, soup: BeautifulSoup, product_info) -> bool:
+        if self._is_error_page(soup):
+            return False
+
+        for control in self._product_scope(soup).select(self.CONTROLS):
+            text = " ".join(control.get_text(" ").split()).lower()
+            text = text or str(control.get("value", "")).lower()
+            if not text or len(text) > self.MAX_CONTROL_TEXT:
+                continue
+            if any(phrase in text for phrase in self.BUY_PHRASES):
+                if not self._is_disabled(control, text):
+                    logging.debug(f"Found purchase control: '{text}'")
+                    return True
+        return False
+
+
+DETECTORS: Dict[str, Type[StockDetector]] = {
+    HeuristicDetector.name: HeuristicDetector,
+    StrictDetector.name: StrictDetector,
+}
+
+
+def get_detector(name: Optional[str] = None) -> StockDetector:
+    """Instantiate a detector by name (STOCK_DETECTOR by default)"""
+    name = name or Config.STOCK_DETECTOR
+    try:
+        return DETECTORS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown stock detector '{name}', choose from {', '.join(DETECTORS)}"
+        ) from None
@@ -0,0 +1,348 @@
+"""
+Catalogue discovery: finds new product pages and adds them to monitoring
+
+Starting from DISCOVERY_SEEDS (sitemaps, collection and search pages) the
+crawler follows listing links breadth-first, up to DISCOVERY_MAX_DEPTH
+links away (pagination doesn't count) and DISCOVERY_MAX_PAGES pages per
+run, DISCOVERY_CONCURRENCY pages at a time. Product links matching
+DISCOVERY_KEYWORDS are inserted into monitor_settings, tagged
+``discovered`` plus their series.
+
+Crawls are incremental. Every page is requested conditionally
+(If-None-Match / If-Modified-Since) and its links are remembered in
+crawl_state, so a page that hasn't changed is neither downloaded again
+nor parsed; the crawl just continues with its stored links. Sitemap
+entries with a ``lastmod`` older than the last crawl aren't requested at
+all. A changed page's state is only saved after its products are, so a
+run that fails part way finds them again next time.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from bs4 import BeautifulSoup
+
+import metrics
+from config import Config
+from database import DatabaseManager
+from fetch import PageFetcher
+from url_import import normalize_url
+
+# /us/products/1898/THE-MONSTERS-... and /us/pop-now/set/228
+PRODUCT_PATH = re.compile(r"^/[a-z]{2}(?:-[a-z]{2})?/(?:products|pop-now/set)/\d+")
+
+# Pages worth crawling for product links
+LISTING_PATH = re.compile(r"/(?:collection|search|new-arrivals)(?:/|$)|\.xml$")
+
+DISCOVERED_TAG = "discovered"
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds of a sitemap ``lastmod`` (W3C datetime), if parseable"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def series_tag(name: str) -> Optional[str]:
+    """Tag for a series or collection name, e.g. "THE MONSTERS" -> "the monsters" """
+    tag = " ".join(name.split()).lower()
+    return tag or None
+
+
+class DiscoveryCrawler:
+    """Crawls listing pages for product URLs and upserts the new ones"""
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        fetcher: PageFetcher = None,
+        seeds: List[str] = None,
+        max_depth: int = None,
+        max_pages: int = None,
+        concurrency: int = None,
+        keywords: List[str] = None,
+    ):
+        self.db = db
+        self.fetcher = fetcher or PageFetcher()
+        self.seeds = [
+            normalize_url(url) for url in (seeds or Config.get_discovery_seeds())
+        ]
+        self.max_depth = Config.DISCOVERY_MAX_DEPTH if max_depth is None else max_depth
+        self.max_pages = max_pages or Config.DISCOVERY_MAX_PAGES
+        self.concurrency = concurrency or Config.DISCOVERY_CONCURRENCY
+        self.keywords = (
+            Config.get_discovery_keywords() if keywords is None else keywords
+        )
+        self.hosts = {urlsplit(url).netloc for url in self.seeds}
+        self.last_report: Optional[Dict] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def classify(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        """("product" or "listing", normalized URL) or (None, None) to ignore"""
+        try:
+            url = normalize_url(url)
+        except ValueError:
+            return None, None
+        parts = urlsplit(url)
+        if parts.netloc not in self.hosts:
+            return None, None
+        if PRODUCT_PATH.match(parts.path):
+            # Product pages don't need tracking or variant query strings
+            return "product", urlunsplit(
+                (parts.scheme, parts.netloc, parts.path, "", "")
+            )
+        if LISTING_PATH.search(parts.path):
+            return "listing", url
+        return None, None
+
+    def matches(self, url: str, text: str = "", series: str = None) -> List[str]:
+        """Keywords found in a product's URL slug, link text or series"""
+        haystack = " ".join(
+            (urlsplit(url).path.replace("-", " "), text, series or "")
+        ).lower()
+        return [keyword for keyword in self.keywords if keyword in haystack]
+
+    def _product(self, url: str, text: str = "", series: str = None) -> Optional[Dict]:
+        """Monitor entry for a product link, or None if no keyword matches"""
+        matched = self.matches(url, text, series)
+        if self.keywords and not matched:
+            return None
+        tags = [DISCOVERED_TAG]
+        for tag in [series_tag(series or "")] + matched:
+            if tag and tag not in tags:
+                tags.append(tag)
+        entry = {"url": url, "tags": tags}
+        name = " ".join(text.split())
+        if name:
+            entry["product_name"] = name
+        return entry
+
+    def parse_sitemap(self, body: bytes) -> Tuple[Dict[str, Dict], List]:
+        """Products and (listing URL, lastmod) links from a sitemap or index"""
+        products, links = {}, []
+        root = ElementTree.fromstring(body)
+        for element in root:
+            if element.tag.rsplit("}", 1)[-1] not in ("url", "sitemap"):
+                continue
+            loc = lastmod = None
+            for child in element:
+                name = child.tag.rsplit("}", 1)[-1]
+                if name == "loc":
+                    loc = (child.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = parse_lastmod(child.text)
+            if not loc:
+                continue
+            kind, url = self.classify(loc)
+            if kind == "product":
+                entry = self._product(url)
+                if entry:
+                    products[url] = entry
+            elif kind == "listing":
+                links.append([url, lastmod])
+        return products, links
+
+    def parse_listing(self, url: str, body: bytes) -> Tuple[Dict[str, Dict], List]:
+        """Products and listing links (pagination, other collections) on a page"""
+        soup = BeautifulSoup(body, "html.parser")
+        heading = soup.select_one("h1")
+        # Only collection pages name a series; search results don't
+        series = (
+            heading.get_text()
+            if heading and "/collection/" in urlsplit(url).path
+            else None
+        )
+
+        products, links, seen = {}, [], set()
+        for anchor in soup.find_all("a", href=True):
+            kind, link = self.classify(urljoin(url, anchor["href"]))
+            if kind == "product":
+                entry = self._product(link, anchor.get_text(" "), series)
+                if entry and (
+                    link not in products or "product_name" not in products[link]
+                ):
+                    products[link] = entry
+            elif kind == "listing" and link != url and link not in seen:
+                seen.add(link)
+                links.append([link, None])
+        return products, links
+
+    def crawl_page(self, url: str, lastmod: Optional[float] = None) -> Dict:
+        """Fetch and parse one listing page unless it's known to be unchanged"""
+        state = self.db.get_crawl_state(url)
+        page = {"url": url, "products": {}, "links": state["links"] if state else []}
+
+        if state and lastmod is not None and lastmod <= state["crawled_at"]:
+            page["outcome"] = "unchanged"
+            return page
+
+        headers = {}
+        if state and state["etag"]:
+            headers["If-None-Match"] = state["etag"]
+        if state and state["last_modified"]:
+            headers["If-Modified-Since"] = state["last_modified"]
+
+        fetched_at = time.time()
+        try:
+            response = self.fetcher.fetch(url, headers=headers)
+        except Exception as e:
+            logging.warning(f"🕸️ Discovery couldn't fetch {url}: {e}")
+            page["outcome"] = "error"
+            return page
+
+        if response.status_code == 304:
+            self.db.save_crawl_state(url, 304)
+            page["outcome"] = "not_modified"
+            return page
+        if response.status_code != 200:
+            logging.warning(f"🕸️ Discovery got HTTP {response.status_code} for {url}")
+            self.db.save_crawl_state(url, response.status_code)
+            page["outcome"] = "error"
+            return page
+
+        body = response.content
+        digest = hashlib.sha1(body).hexdigest()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if state and state["content_hash"] == digest:
+            # Same bytes without validators: nothing new to parse
+            self.db.save_crawl_state(url, 200, etag, last_modified)
+            page["outcome"] = "unchanged"
+            return page
+
+        try:
+            content_type = response.headers.get("Content-Type", "")
+            if "xml" in content_type or body.lstrip().startswith(b"<?xml"):
+                products, links = self.parse_sitemap(body)
+            else:
+                products, links = self.parse_listing(url, body)
+        except Exception as e:
+            logging.warning(f"🕸️ Discovery couldn't parse {url}: {e}")
+            page["outcome"] = "error"
+            return page
+
+        # Saved by run() once the products are, so a failed run crawls it again
+        page.update(
+            outcome="fetched",
+            products=products,
+            links=links,
+            state=dict(
+                url=url,
+                status_code=200,
+                etag=etag,
+                last_modified=last_modified,
+                content_hash=digest,
+                links=links,
+                changed=True,
+                crawled_at=fetched_at,
+            ),
+        )
+        return page
+
+    def run(self) -> Dict:
+        """One crawl from the seeds, returning what it did and found"""
+        start = time.perf_counter()
+        outcomes = {"fetched": 0, "not_modified": 0, "unchanged": 0, "error": 0}
+        products: Dict[str, Dict] = {}
+        states: List[Dict] = []
+
+        frontier = [(url, 0, None) for url in self.seeds]
+        seen = set(self.seeds)
+        crawled = 0
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="discovery"
+        ) as executor:
+            # Breadth-first, one depth level (or max_pages slice) at a time
+            while frontier and crawled < self.max_pages and not self._stop.is_set():
+                batch = frontier[: self.max_pages - crawled]
+                frontier = frontier[len(batch) :]
+                crawled += len(batch)
+                pages = executor.map(
+                    lambda item: (item[1], self.crawl_page(item[0], item[2])), batch
+                )
+                for depth, page in pages:
+                    outcomes[page["outcome"]] += 1
+                    metrics.DISCOVERY_PAGES.inc(outcome=page["outcome"])
+                    if "state" in page:
+                        states.append(page["state"])
+                    for url, entry in page["products"].items():
+                        if url not in products or "product_name" not in products[url]:
+                            products[url] = entry
+                    path = urlsplit(page["url"]).path
+                    for link, lastmod in page["links"]:
+                        # Further pages of the same listing aren't a level deeper
+                        next_depth = depth if urlsplit(link).path == path else depth + 1
+                        if link not in seen and next_depth <= self.max_depth:
+                            seen.add(link)
+                            frontier.append((link, next_depth, lastmod))
+
+        added = (
+            self.db.add_new_monitor_urls(list(products.values())) if products else []
+        )
+        # Pages only count as crawled once their products are saved
+        for state in states:
+            self.db.save_crawl_state(**state)
+        metrics.DISCOVERED_URLS.inc(len(added))
+        for url in added:
+            logging.info(f"🆕 Discovered {url} ({', '.join(products[url]['tags'])})")
+
+        report = {
+            "pages": crawled,
+            **outcomes,
+            "queued": len(frontier),
+            "products": len(products),
+            "added": added,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        logging.info(
+            f"🕸️ Discovery crawled {crawled} pages ({outcomes['fetched']} changed, "
+            f"{outcomes['not_modified'] + outcomes['unchanged']} unchanged, "
+            f"{outcomes['error']} failed) in {report['seconds']:.1f}s: "
+            f"{len(products)} products, {len(added)} new"
+        )
+        self.last_report = report
+        return report
+
+    def _run(self, interval: float):
+        logging.info(f"🕸️ Discovery started, crawling every {interval:.0f}s")
+        while not self._stop.is_set():
+            try:
+                self.run()
+            except Exception as e:
+                logging.error(f"Discovery crawl failed: {e}")
+            self._stop.wait(interval)
+        logging.info("🕸️ Discovery stopped")
+
+    def start(self, interval: float = None):
+        """Crawl every ``interval`` seconds on a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(interval or Config.DISCOVERY_INTERVAL,),
+            name="discovery",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
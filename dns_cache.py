@@ -0,0 +1,127 @@
+"""
+In-process DNS cache with a TTL, for the monitor's page fetches only
+
+requests (through urllib3) and httpx both call ``socket.getaddrinfo`` for
+every new connection. Inside ``DnsCache.active()`` that call is answered
+from the cache until the TTL runs out; lookups anywhere else (the
+dashboard, SMTP, webhooks, other threads) go straight to the system
+resolver. Failed lookups are never cached.
+
+``getaddrinfo`` doesn't expose record TTLs, so every entry lives for the
+same fixed TTL. A host that fails over to new addresses keeps being
+dialled at the old ones until its entry expires, which is why the TTL is
+capped (DNS_CACHE_MAX_TTL) well below typical record TTLs.
+"""
+
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import metrics
+
+# The cache answering lookups on this thread, if any
+_local = threading.local()
+
+# The real resolver, once the hook is installed
+_original: Optional[Callable] = None
+_install_lock = threading.Lock()
+
+
+def _getaddrinfo(*args, **kwargs):
+    cache = getattr(_local, "cache", None)
+    if cache is None:
+        return _original(*args, **kwargs)
+    return cache.getaddrinfo(*args, **kwargs)
+
+
+def install_hook():
+    """Route ``socket.getaddrinfo`` through whichever cache is active (idempotent)"""
+    global _original
+    with _install_lock:
+        if _original is None:
+            _original = socket.getaddrinfo
+            socket.getaddrinfo = _getaddrinfo
+
+
+def uninstall_hook():
+    """Restore the original ``socket.getaddrinfo``"""
+    global _original
+    with _install_lock:
+        if _original is not None:
+            socket.getaddrinfo = _original
+            _original = None
+
+
+def system_getaddrinfo(*args, **kwargs) -> List:
+    """The resolver underneath the hook"""
+    return (_original or socket.getaddrinfo)(*args, **kwargs)
+
+
+class DnsCache:
+    """TTL cache in front of a ``getaddrinfo`` function"""
+
+    def __init__(self, ttl: float = 30, max_entries: int = 1024, resolve=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.resolve = resolve or system_getaddrinfo
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple, Tuple[float, List]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def active(self) -> Iterator["DnsCache"]:
+        """Answer this thread's lookups from the cache inside the block"""
+        install_hook()
+        previous = getattr(_local, "cache", None)
+        _local.cache = self
+        try:
+            yield self
+        finally:
+            _local.cache = previous
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0) -> List:
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                hit = True
+            else:
+                self.misses += 1
+                hit = False
+
+        if hit:
+            metrics.DNS_LOOKUPS.inc(outcome="hit")
+            return list(entry[1])
+
+        metrics.DNS_LOOKUPS.inc(outcome="miss")
+        result = self.resolve(host, port, family, type, proto, flags)
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict(now)
+            self._entries[key] = (now + self.ttl, result)
+        return list(result)
+
+    def _evict(self, now: float):
+        """Drop expired entries, or the oldest one if none have expired"""
+        expired = [key for key, (expires, _) in self._entries.items() if expires <= now]
+        for key in expired:
+            del self._entries[key]
+        if not expired:
+            del self._entries[next(iter(self._entries))]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
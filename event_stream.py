@@ -0,0 +1,132 @@
+import json
+import logging
+import queue
+import threading
+from typing import Dict, Iterator, Optional, Set
+
+from config import Config
+from database import DatabaseManager
+from dashboard_snapshot import DashboardSnapshot
+
+
+class EventBroadcaster:
+    """Fans out monitor events to Server-Sent Events subscribers
+
+    A single poller thread watches the database for new stock events and
+    snapshot updates written by the monitor process, so the cost is one
+    small query per interval no matter how many dashboards are open, and
+    nothing at all when none are.
+    """
+
+    HEARTBEAT_INTERVAL = 15  # seconds
+    MAX_QUEUE_SIZE = 1000
+
+    def __init__(self, db: DatabaseManager, snapshot: DashboardSnapshot):
+        self.db = db
+        self.snapshot = snapshot
+        self.poll_interval = Config.STREAM_POLL_INTERVAL
+
+        self._subscribers: Set[queue.Queue] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self._last_event_id: Optional[int] = None
+        self._snapshot_version: Optional[float] = None
+        self._last_status: Dict[str, bool] = {}
+
+    def subscribe(self) -> queue.Queue:
+        """Register a new subscriber and make sure the poller is running"""
+        subscriber = queue.Queue(maxsize=self.MAX_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._poll, name="event-stream", daemon=True
+                )
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event_type: str, data: Dict):
+        """Send an event to every subscriber"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event_type, data))
+            except queue.Full:
+                # A stalled client shouldn't hold up everyone else
+                logging.debug("Dropping event for slow stream subscriber")
+
+    def _poll_once(self):
+        if self._last_event_id is None:
+            self._last_event_id = self.db.get_max_event_id()
+            self._snapshot_version = self.db.get_snapshot_version(self.snapshot.NAME)
+            self._last_status = {
+                url: bool(event["has_stock"])
+                for url, event in self.db.get_latest_events().items()
+            }
+            return
+
+        for event in self.db.get_events_after(self._last_event_id):
+            self._last_event_id = event["id"]
+            in_stock = bool(event["has_stock"])
+            previous = self._last_status.get(event["url"])
+            self._last_status[event["url"]] = in_stock
+
+            self.publish(
+                "stock",
+                {
+                    "id": event["id"],
+                    "url": event["url"],
+                    "product_name": event["product_name"],
+                    "price": event["price"],
+                    "in_stock": in_stock,
+                    "timestamp": event["timestamp"],
+                    "flipped": previous is not None and previous != in_stock,
+                },
+            )
+
+        version = self.db.get_snapshot_version(self.snapshot.NAME)
+        if version is not None and version != self._snapshot_version:
+            self._snapshot_version = version
+            data = self.snapshot.load()
+            self.publish("cycle", {"stats": data["stats"], "cycle": data.get("cycle")})
+
+    def _poll(self):
+        logging.info("📡 Event stream poller started")
+        idle = threading.Event()
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Start from the current position when the next viewer arrives
+                    self._thread = None
+                    self._last_event_id = None
+                    break
+
+            try:
+                self._poll_once()
+            except Exception as e:
+                logging.error(f"Event stream poll error: {e}")
+            idle.wait(self.poll_interval)
+
+        logging.info("📡 Event stream poller stopped (no subscribers)")
+
+    def stream(self, subscriber: queue.Queue) -> Iterator[str]:
+        """Yield Server-Sent Events for a subscriber"""
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event_type, data = subscriber.get(timeout=self.HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
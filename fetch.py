@@ -0,0 +1,363 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import wait
+from contextlib import contextmanager, nullcontext
+from typing import Deque, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+import tracing
+from config import Config
+from dns_cache import DnsCache
+from rate_limit import HostRateLimiter, HostUnavailableError
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+# Latency samples needed before the adaptive hedge delay kicks in
+HEDGE_MIN_SAMPLES = 20
+
+CHUNK_SIZE = 64 * 1024
+
+
+class FetchDeadlineExceeded(requests.Timeout):
+    """The whole fetch, body included, ran past the check's deadline"""
+
+
+class RequestsTransport:
+    """HTTP/1.1 over a pooled keep-alive requests session (the default)"""
+
+    name = "requests"
+
+    def __init__(self, pool_size: int = 10):
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def open(
+        self, url: str, timeout: Tuple[float, float], headers: Dict[str, str] = None
+    ) -> requests.Response:
+        """Send the request and return once the headers are in"""
+        return self.session.get(url, headers=headers, timeout=timeout, stream=True)
+
+    def iter_body(self, response: requests.Response) -> Iterator[bytes]:
+        return response.iter_content(CHUNK_SIZE)
+
+    def finish(self, response: requests.Response, body: bytes) -> requests.Response:
+        response._content = body
+        return response
+
+    def close(self):
+        self.session.close()
+
+
+class Http2Transport:
+    """HTTP/2 over httpx, multiplexing requests to a host on a few connections
+
+    Needs ``pip install 'httpx[http2]'``. Responses are handed back as
+    ``requests.Response`` objects and httpx errors as ``requests``
+    exceptions, so callers can't tell the transports apart. ``http1=False``
+    speaks HTTP/2 without negotiating it first, for cleartext test servers.
+    """
+
+    name = "http2"
+
+    def __init__(self, pool_size: int = 10, http1: bool = True):
+        import httpx
+
+        self.httpx = httpx
+        self.client = httpx.Client(
+            http1=http1,
+            http2=True,
+            headers=DEFAULT_HEADERS,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+        )
+
+    @contextmanager
+    def _errors(self) -> Iterator[None]:
+        try:
+            yield
+        except self.httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except self.httpx.TransportError as e:
+            raise requests.ConnectionError(str(e)) from e
+        except self.httpx.HTTPError as e:
+            raise requests.RequestException(str(e)) from e
+
+    def open(
+        self, url: str, timeout: Tuple[float, float], headers: Dict[str, str] = None
+    ):
+        connect, read = timeout
+        with self._errors():
+            request = self.client.build_request(
+                "GET",
+                url,
+                headers=headers,
+                timeout=self.httpx.Timeout(read, connect=connect),
+            )
+            return self.client.send(request, stream=True)
+
+    def iter_body(self, response) -> Iterator[bytes]:
+        with self._errors():
+            yield from response.iter_bytes(CHUNK_SIZE)
+
+    def finish(self, response, body: bytes) -> requests.Response:
+        converted = requests.Response()
+        converted.status_code = response.status_code
+        converted.headers = requests.structures.CaseInsensitiveDict(
+            response.headers.items()
+        )
+        converted.url = str(response.url)
+        converted.reason = response.reason_phrase
+        converted.encoding = requests.utils.get_encoding_from_headers(converted.headers)
+        converted._content = body
+        return converted
+
+    def close(self):
+        self.client.close()
+
+
+TRANSPORTS = {
+    RequestsTransport.name: RequestsTransport,
+    Http2Transport.name: Http2Transport,
+}
+
+
+def create_transport(name: str, pool_size: int = 10):
+    """Build the HTTP_TRANSPORT, falling back to requests if it can't be used"""
+    if name not in TRANSPORTS:
+        logging.warning(f"Unknown HTTP transport '{name}', using requests")
+        name = RequestsTransport.name
+    try:
+        return TRANSPORTS[name](pool_size)
+    except ImportError as e:
+        logging.warning(
+            f"HTTP/2 transport not available ({e}) - "
+            f"pip install 'httpx[http2]'; using requests"
+        )
+        return RequestsTransport(pool_size)
+
+
+class PageFetcher:
+    """Downloads product pages over a pooled, keep-alive session
+
+    With a ``limiter``, every request first waits for its host's rate limit
+    and every response is fed back so the limiter can adapt. HTTP_TRANSPORT
+    picks the client (requests, or httpx for HTTP/2) and DNS_CACHE_TTL
+    enables a DNS cache for this fetcher's connections only.
+
+    Each fetch has a connect timeout, a read timeout and an overall
+    deadline. With hedging enabled, a second request is sent once the first
+    has taken longer than the host's p95 (or HEDGE_DELAY) and whichever
+    finishes first wins.
+    """
+
+    def __init__(self, limiter: HostRateLimiter = None, pool_size: int = 10):
+        self.connect_timeout = Config.CONNECT_TIMEOUT
+        self.timeout = Config.REQUEST_TIMEOUT
+        self.deadline = Config.CHECK_DEADLINE
+        self.hedge = Config.ENABLE_HEDGED_REQUESTS
+        self.hedge_delay = Config.HEDGE_DELAY
+        self.limiter = limiter
+        self.pool_size = pool_size
+        self.transport_name = Config.HTTP_TRANSPORT
+        self._transport = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self.dns_cache: Optional[DnsCache] = None
+        if Config.DNS_CACHE_TTL > 0:
+            ttl = min(Config.DNS_CACHE_TTL, Config.DNS_CACHE_MAX_TTL)
+            if ttl < Config.DNS_CACHE_TTL:
+                logging.warning(
+                    f"DNS_CACHE_TTL capped at {ttl:.0f}s (DNS_CACHE_MAX_TTL) so "
+                    f"DNS failovers are picked up"
+                )
+            self.dns_cache = DnsCache(ttl)
+            logging.info(f"🧭 DNS cache enabled for page fetches (TTL {ttl:.0f}s)")
+
+    @property
+    def transport(self):
+        with self._lock:
+            if self._transport is None:
+                self._transport = create_transport(self.transport_name, self.pool_size)
+            return self._transport
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size * 2, thread_name_prefix="fetch"
+                )
+            return self._executor
+
+    def fetch(self, url: str, headers: Dict[str, str] = None) -> requests.Response:
+        """Fetch a page, recording time to first byte and download time
+
+        ``fetch.ttfb`` covers DNS, connect, TLS and server time (zero-cost
+        connects when the pooled connection is reused); ``fetch.download``
+        is reading the body. Raises a ``requests.Timeout`` once the deadline
+        has passed. ``headers`` are sent on top of the session's, e.g. for
+        conditional requests.
+        """
+        host = urlparse(url).hostname or ""
+        if self.limiter is not None:
+            self._wait_for_slot(url, host)
+
+        deadline = time.monotonic() + self.deadline
+        if self.hedge:
+            response, ttfb, download = self._fetch_hedged(url, host, deadline, headers)
+        else:
+            response, ttfb, download = self._fetch_once(url, host, deadline, headers)
+
+        with self._lock:
+            samples = self._latencies.get(host)
+            if samples is None:
+                samples = self._latencies[host] = deque(maxlen=200)
+            samples.append(ttfb + download)
+
+        trace = tracing.current_trace()
+        if trace is not None:
+            trace.add("fetch.ttfb", ttfb)
+            trace.add("fetch.download", download)
+        tracing.annotate(status_code=response.status_code, bytes=len(response.content))
+        return response
+
+    def _fetch_once(
+        self, url: str, host: str, deadline: float, headers: Dict[str, str] = None
+    ) -> Tuple[requests.Response, float, float]:
+        """One request, returning the response, time to first byte and download time"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            if self.limiter is not None:
+                self.limiter.cancel(url)
+            raise FetchDeadlineExceeded(f"No time left to fetch {url}")
+
+        transport = self.transport
+        resolving = self.dns_cache.active() if self.dns_cache else nullcontext()
+        start = time.perf_counter()
+        try:
+            with resolving:
+                response = transport.open(
+                    url,
+                    (
+                        min(self.connect_timeout, remaining),
+                        min(self.timeout, remaining),
+                    ),
+                    headers,
+                )
+        except requests.RequestException:
+            metrics.HTTP_RESPONSES.inc(host=host, status="error")
+            if self.limiter is not None:
+                self.limiter.record(url)
+            raise
+        metrics.HTTP_RESPONSES.inc(host=host, status=response.status_code)
+        if self.limiter is not None:
+            self.limiter.record(url, response.status_code, response.headers)
+
+        headers_at = time.perf_counter()
+        try:
+            # Read the body here so it is timed separately and a server that
+            # trickles bytes can't keep the check past its deadline
+            chunks = []
+            for chunk in transport.iter_body(response):
+                chunks.append(chunk)
+                if time.monotonic() > deadline:
+                    raise FetchDeadlineExceeded(
+                        f"Fetching {url} took longer than {self.deadline:.0f}s"
+                    )
+        finally:
+            response.close()
+        response = transport.finish(response, b"".join(chunks))
+        done = time.perf_counter()
+        return response, headers_at - start, done - headers_at
+
+    def hedge_delay_for(self, host: str) -> Optional[float]:
+        """Seconds before hedging a request to host (None: don't hedge yet)"""
+        if self.hedge_delay > 0:
+            return self.hedge_delay
+        with self._lock:
+            samples = sorted(self._latencies.get(host, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return tracing.percentile(samples, 95)
+
+    def _fetch_hedged(
+        self, url: str, host: str, deadline: float, headers: Dict[str, str] = None
+    ) -> Tuple[requests.Response, float, float]:
+        primary = self.executor.submit(self._fetch_once, url, host, deadline, headers)
+        delay = self.hedge_delay_for(host)
+        if delay is None:
+            return primary.result()
+
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeout:
+            pass
+
+        # The hedge is a real extra request, so it needs a spare slot (and
+        # a closed circuit: a half-open host only gets the one probe)
+        if time.monotonic() >= deadline or (
+            self.limiter is not None and not self.limiter.try_acquire(url)
+        ):
+            return primary.result()
+
+        metrics.HEDGED_REQUESTS.inc(outcome="sent")
+        hedge = self.executor.submit(self._fetch_once, url, host, deadline, headers)
+        pending, error = {primary, hedge}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                won = "hedge" if future is hedge else "primary"
+                metrics.HEDGED_REQUESTS.inc(outcome=f"{won}_won")
+                tracing.annotate(hedged=True, hedge_won=future is hedge)
+                return result
+        raise error
+
+    def _wait_for_slot(self, url: str, host: str):
+        """Wait for the host's rate limit, noting any delay on the trace"""
+        try:
+            waited, reason = self.limiter.acquire(url)
+        except HostUnavailableError as e:
+            metrics.HOST_DELAYS.inc(host=host, reason=e.reason)
+            tracing.annotate(delay_reason=e.reason, skipped=True)
+            raise
+
+        if reason is not None:
+            metrics.HOST_DELAYS.inc(host=host, reason=reason)
+            metrics.HOST_DELAY_SECONDS.observe(waited, host=host)
+            trace = tracing.current_trace()
+            if trace is not None:
+                trace.add("throttle", waited)
+            tracing.annotate(delay_seconds=round(waited, 3), delay_reason=reason)
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            if self._transport is not None:
+                self._transport.close()
+                self._transport = None
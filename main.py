@@ -8,6 +8,7 @@ import argparse
 import logging
 import sys
 import os
+import time
 from pathlib import Path
 
 # Add current directory to path for imports
@@ -15,8 +16,6 @@ current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
 from config import Config
-from monitor import StockMonitor
-from web_dashboard import app
 
 
 def setup_logging():
@@ -56,7 +55,34 @@ def validate_config():
     return True
 
 
-def run_monitor():
+def create_profiler(args):
+    """Profiler for ``monitor --profile``, or None when not profiling"""
+    if not args.profile:
+        return None
+
+    from datetime import datetime
+
+    from profiling import create_profiler as build
+
+    output_dir = os.path.join(
+        args.profile_dir, f"{datetime.now():%Y%m%d-%H%M%S}-{args.profile}"
+    )
+    cycles = (
+        "every cycle" if args.profile_cycles == 0 else f"{args.profile_cycles} cycles"
+    )
+    print(f"🔬 Profiling ({args.profile}) {cycles} into {output_dir}")
+    if args.trace_memory:
+        print("🧠 Tracing memory allocations between cycles")
+    return build(
+        args.profile,
+        output_dir,
+        cycles=args.profile_cycles,
+        trace_memory=args.trace_memory,
+        interval=args.profile_interval,
+    )
+
+
+def run_monitor(profiler=None):
     """Run the stock monitor"""
     print("🚀 Starting Labubu Monitor")
     print(f"📡 Monitoring URLs: {len(Config.get_urls())}")
@@ -64,20 +90,143 @@ def run_monitor():
     print(f"🔔 Notification methods: {get_enabled_notifications()}")
     print("-" * 50)
 
+    from monitor import StockMonitor
+
     monitor = StockMonitor()
-    monitor.run_continuous_monitoring()
+    monitor.run_continuous_monitoring(profiler)
 
 
-def run_web():
+def run_web(workers: int = 0, threads: int = None):
     """Run the web dashboard"""
+    threads = threads or Config.WEB_THREADS
+
     print("🌐 Starting Labubu Monitor Web Dashboard")
     print(f"🔗 URL: http://{Config.WEB_HOST}:{Config.WEB_PORT}")
     print(f"📊 Dashboard will show monitoring statistics and history")
+    if workers:
+        print(f"⚙️  Workers: {workers} x {threads} threads")
     print("-" * 50)
 
+    from web_dashboard import app, get_db
+
+    # Seed the configured URLs once here rather than on every import
+    get_db().upsert_monitor_urls([{"url": url} for url in Config.get_urls()])
+
+    if workers:
+        import wsgi
+
+        wsgi.serve(Config.WEB_HOST, Config.WEB_PORT, workers, threads)
+        return
+
     app.run(host=Config.WEB_HOST, port=Config.WEB_PORT, debug=False, use_reloader=False)
 
 
+URL_ACTIONS = ("import", "list", "activate", "deactivate")
+
+
+def run_urls(args) -> int:
+    """Manage monitored URLs: import a catalogue, list, (de)activate"""
+    from database import DatabaseManager
+    import url_import
+
+    db = DatabaseManager()
+    action = args.action
+
+    if action == "import":
+        if len(args.targets) != 1:
+            print("❌ Usage: python main.py urls import FILE [--format csv|json]")
+            return 2
+        try:
+            text, fmt = url_import.load_file(args.targets[0], args.format)
+            report = url_import.import_urls(
+                db,
+                text,
+                fmt,
+                default_tags=url_import.parse_tags(args.tag),
+                deactivate_missing=args.deactivate_missing,
+                dry_run=args.dry_run,
+            )
+        except (OSError, ValueError) as e:
+            print(f"❌ Import failed: {e}")
+            return 1
+
+        for error in report["errors"]:
+            print(f"  ⚠️  Row {error['row']}: {error['error']}")
+        prefix = "🧪 Dry run: " if args.dry_run else "📥 "
+        print(
+            f"{prefix}{report['urls']} URLs valid, {len(report['errors'])} rejected - "
+            f"{report['inserted']} added, {report['updated']} updated, "
+            f"{report['deactivated']} deactivated"
+        )
+        return 1 if report["errors"] else 0
+
+    if action == "list":
+        tags = url_import.parse_tags(args.tag)
+        urls = db.get_monitor_urls(
+            include_inactive=args.all, tag=tags[0] if tags else None
+        )
+        for url in urls:
+            status = "✅" if url["is_active"] else "⏸️ "
+            tags = f" [{', '.join(url['tags'])}]" if url["tags"] else ""
+            print(f"{status} {url['id']:>6}  {url['url']}{tags}")
+        print(f"📡 {len(urls)} URLs")
+        return 0
+
+    if action in ("activate", "deactivate"):
+        if not args.targets:
+            print(f"❌ Usage: python main.py urls {action} URL [URL ...]")
+            return 2
+        try:
+            urls = [url_import.normalize_url(url) for url in args.targets]
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 2
+        changed = db.set_monitor_urls_active(urls, action == "activate")
+        print(f"{'✅' if action == 'activate' else '⏸️ '} {changed} URLs {action}d")
+        return 0
+
+    print(f"❌ Unknown urls action '{action}' (use {', '.join(URL_ACTIONS)})")
+    return 2
+
+
+def run_discover(args) -> int:
+    """Crawl the catalogue for new products once, or every DISCOVERY_INTERVAL"""
+    from database import DatabaseManager
+    from discovery import DiscoveryCrawler
+
+    seeds = args.seed or Config.get_discovery_seeds()
+    if not seeds:
+        print("❌ No seeds: set DISCOVERY_SEEDS or pass --seed URL")
+        return 2
+
+    try:
+        crawler = DiscoveryCrawler(DatabaseManager(), seeds=seeds)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    print(f"🕸️  Crawling from {len(crawler.seeds)} seeds")
+    if args.loop:
+        crawler.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            crawler.stop()
+            print("\n🛑 Stopped by user")
+        return 0
+
+    report = crawler.run()
+    for url in report["added"]:
+        print(f"  🆕 {url}")
+    print(
+        f"🕸️  {report['pages']} pages ({report['fetched']} changed, "
+        f"{report['not_modified'] + report['unchanged']} unchanged, "
+        f"{report['error']} failed) - {len(report['added'])} new products"
+    )
+    return 1 if report["error"] and not report["fetched"] else 0
+
+
 def get_enabled_notifications():
     """Get list of enabled notification methods"""
     methods = []
@@ -125,7 +274,15 @@ def main():
 Examples:
   python main.py monitor          # Run stock monitoring
   python main.py web             # Run web dashboard  
+  python main.py web --workers 4 # Run web dashboard under gunicorn/waitress
+  python main.py monitor --profile                 # cProfile the next 3 cycles
+  python main.py monitor --profile=sampling --profile-cycles 0 --trace-memory
   python main.py status          # Show configuration status
+  python main.py urls import catalogue.csv --tag labubu   # Bulk add/update URLs
+  python main.py urls list --all                # Monitored URLs, inactive too
+  python main.py urls deactivate URL [URL ...]  # Stop checking URLs
+  python main.py discover                       # Crawl once for new products
+  python main.py discover --loop                # Crawl every DISCOVERY_INTERVAL
   
 Environment Variables:
   OPENAI_API_KEY                 # Required: Your OpenAI API key
@@ -141,12 +298,117 @@ Environment Variables:
     )
 
     parser.add_argument(
-        "command", choices=["monitor", "web", "status"], help="Command to run"
+        "command",
+        choices=["monitor", "web", "status", "urls", "discover"],
+        help="Command to run",
+    )
+
+    parser.add_argument(
+        "action", nargs="?", help=f"urls: one of {', '.join(URL_ACTIONS)}"
+    )
+
+    parser.add_argument(
+        "targets", nargs="*", help="urls: the file to import, or URLs to (de)activate"
     )
 
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
 
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=Config.WEB_WORKERS,
+        help="Serve the dashboard with N production server workers (web only)",
+    )
+
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=Config.WEB_THREADS,
+        help="Threads per dashboard worker (default: 8)",
+    )
+
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="cprofile",
+        choices=["cprofile", "sampling"],
+        help="Profile monitoring cycles (monitor only, default: cprofile)",
+    )
+
+    parser.add_argument(
+        "--profile-cycles",
+        type=int,
+        default=3,
+        help="Number of cycles to profile, 0 for every cycle (default: 3)",
+    )
+
+    parser.add_argument(
+        "--profile-dir",
+        default="profiles",
+        help="Directory for profile output (default: profiles)",
+    )
+
+    parser.add_argument(
+        "--profile-interval",
+        type=float,
+        default=0.01,
+        help="Seconds between samples with --profile=sampling (default: 0.01)",
+    )
+
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Diff tracemalloc snapshots between profiled cycles",
+    )
+
+    parser.add_argument(
+        "--format",
+        choices=["csv", "json"],
+        help="urls import: file format (default: from the file extension)",
+    )
+
+    parser.add_argument(
+        "--tag",
+        help="urls import: tags added to every row (comma-separated); "
+        "urls list: only URLs with this tag",
+    )
+
+    parser.add_argument(
+        "--deactivate-missing",
+        action="store_true",
+        help="urls import: deactivate active URLs that aren't in the file",
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="urls import: validate the file without saving anything",
+    )
+
+    parser.add_argument(
+        "--all", action="store_true", help="urls list: include inactive URLs"
+    )
+
+    parser.add_argument(
+        "--seed",
+        action="append",
+        help="discover: page to start crawling from, repeatable "
+        "(default: DISCOVERY_SEEDS)",
+    )
+
+    parser.add_argument(
+        "--loop",
+        action="store_true",
+        help="discover: keep crawling every DISCOVERY_INTERVAL seconds",
+    )
+
     args = parser.parse_args()
+    if args.trace_memory and not args.profile:
+        parser.error("--trace-memory requires --profile")
+    if args.command == "urls" and args.action not in URL_ACTIONS:
+        parser.error(f"urls needs an action: {', '.join(URL_ACTIONS)}")
+    if args.command != "urls" and (args.action or args.targets):
+        parser.error(f"unexpected arguments for {args.command}")
 
     # Override log level if debug is requested
     if args.debug:
@@ -160,15 +422,21 @@ Environment Variables:
         show_status()
         return
 
+    # URL management and discovery only need the database
+    if args.command == "urls":
+        sys.exit(run_urls(args))
+    if args.command == "discover":
+        sys.exit(run_discover(args))
+
     # Validate configuration for monitor/web commands
     if not validate_config():
         sys.exit(1)
 
     try:
         if args.command == "monitor":
-            run_monitor()
+            run_monitor(create_profiler(args))
         elif args.command == "web":
-            run_web()
+            run_web(args.workers, args.threads)
     except KeyboardInterrupt:
         print("\n🛑 Stopped by user")
     except Exception as e:
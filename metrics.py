@@ -0,0 +1,372 @@
+"""
+Minimal Prometheus text-format metrics for the monitor and the dashboard
+
+Metrics live in a process-wide registry. The monitor serves them on
+METRICS_PORT and the dashboard at /metrics.
+"""
+
+import logging
+import math
+import threading
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric(ABC):
+    """Base class for a metric family with optional labels"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every label set"""
+        pass
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {
+                    "buckets": [0] * len(self.buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, dict(state, buckets=list(state["buckets"])))
+                for key, state in self._values.items()
+            )
+
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["buckets"]):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames, key, f'le="{_format_value(bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    """Holds metric families and renders them in the exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], None]):
+        """Run collector before every scrape, e.g. to refresh queue-depth gauges"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                logging.warning(f"Metrics collector failed: {e}")
+
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# Stock checks
+CHECKS = REGISTRY.counter("labubu_checks_total", "Stock checks by verdict", ["result"])
+CHECK_SECONDS = REGISTRY.histogram(
+    "labubu_check_duration_seconds", "Wall time of one stock check"
+)
+CHECK_STAGE_SECONDS = REGISTRY.histogram(
+    "labubu_check_stage_seconds", "Time spent per check stage", ["stage"]
+)
+HTTP_RESPONSES = REGISTRY.counter(
+    "labubu_http_responses_total",
+    "Product page responses by host and status code",
+    ["host", "status"],
+)
+HEDGED_REQUESTS = REGISTRY.counter(
+    "labubu_hedged_requests_total",
+    "Hedged page requests sent, and which request won",
+    ["outcome"],
+)
+DNS_LOOKUPS = REGISTRY.counter(
+    "labubu_dns_lookups_total", "Host lookups by DNS cache outcome", ["outcome"]
+)
+HOST_DELAYS = REGISTRY.counter(
+    "labubu_host_delays_total",
+    "Checks delayed or skipped by per-host rate limiting, by reason",
+    ["host", "reason"],
+)
+HOST_DELAY_SECONDS = REGISTRY.histogram(
+    "labubu_host_delay_seconds", "Time checks waited for their host", ["host"]
+)
+HOST_RATE = REGISTRY.gauge(
+    "labubu_host_rate", "Current allowed requests per second per host", ["host"]
+)
+HOST_CIRCUIT_OPEN = REGISTRY.gauge(
+    "labubu_host_circuit_open", "1 while a host's circuit breaker is open", ["host"]
+)
+
+# Catalogue discovery
+DISCOVERY_PAGES = REGISTRY.counter(
+    "labubu_discovery_pages_total",
+    "Discovery crawl pages by outcome (fetched, not_modified, unchanged, error)",
+    ["outcome"],
+)
+DISCOVERED_URLS = REGISTRY.counter(
+    "labubu_discovered_urls_total", "New product URLs added by discovery"
+)
+
+# Monitoring cycles
+CYCLE_SECONDS = REGISTRY.histogram(
+    "labubu_cycle_duration_seconds",
+    "Wall time of one monitoring cycle",
+    buckets=(1, 2.5, 5, 10, 15, 30, 60, 120, 300, 600),
+)
+CYCLE_OVERRUNS = REGISTRY.counter(
+    "labubu_cycle_overruns_total", "Cycles that took longer than CHECK_INTERVAL"
+)
+CHECK_INTERVAL = REGISTRY.gauge(
+    "labubu_check_interval_seconds", "Configured CHECK_INTERVAL"
+)
+LAST_CYCLE = REGISTRY.gauge(
+    "labubu_last_cycle_timestamp_seconds", "When the last cycle finished"
+)
+MONITORED_URLS = REGISTRY.gauge(
+    "labubu_monitored_urls", "URLs checked in the last cycle"
+)
+
+# Notifications
+NOTIFICATIONS = REGISTRY.counter(
+    "labubu_notifications_total",
+    "Notification delivery attempts by channel and result",
+    ["channel", "result"],
+)
+NOTIFICATION_LATENCY = REGISTRY.histogram(
+    "labubu_notification_latency_seconds",
+    "Time from restock detection to delivery per channel",
+    ["channel"],
+)
+OUTBOX_JOBS = REGISTRY.gauge(
+    "labubu_outbox_jobs", "Notification outbox jobs by status", ["status"]
+)
+
+# Database
+DB_CONNECTIONS = REGISTRY.counter(
+    "labubu_db_connections_total", "SQLite connections opened"
+)
+DB_CONNECTION_SECONDS = REGISTRY.histogram(
+    "labubu_db_connection_seconds",
+    "How long SQLite connections were held",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5),
+)
+
+# Dashboard
+DASHBOARD_REQUESTS = REGISTRY.counter(
+    "labubu_dashboard_requests_total",
+    "Dashboard requests by route and status code",
+    ["route", "status"],
+)
+DASHBOARD_REQUEST_SECONDS = REGISTRY.histogram(
+    "labubu_dashboard_request_seconds", "Dashboard request handling time", ["route"]
+)
+RESPONSE_CACHE_LOOKUPS = REGISTRY.counter(
+    "labubu_response_cache_lookups_total",
+    "Response cache lookups by endpoint and outcome",
+    ["endpoint", "outcome"],
+)
+
+
+def observe_trace(trace):
+    """Feed a finished check trace into the check metrics"""
+    in_stock = trace.attributes.get("in_stock")
+    if in_stock is None:
+        result = "unknown"
+    else:
+        result = "in_stock" if in_stock else "out_of_stock"
+    CHECKS.inc(result=result)
+    CHECK_SECONDS.observe((trace.total_ms or 0.0) / 1000)
+    for stage, ms in trace.stages.items():
+        CHECK_STAGE_SECONDS.observe(ms / 1000, stage=stage)
+
+
+def track_outbox(db):
+    """Report outbox queue depths at scrape time"""
+
+    def collect():
+        OUTBOX_JOBS.clear()
+        for status, count in db.get_outbox_stats().items():
+            OUTBOX_JOBS.set(count, status=status)
+
+    REGISTRY.register_collector(collect)
+
+
+def track_rate_limits(limiter):
+    """Report per-host rates and circuit breaker states at scrape time"""
+
+    def collect():
+        for host, stats in limiter.stats().items():
+            HOST_RATE.set(stats["rate"], host=host)
+            HOST_CIRCUIT_OPEN.set(int(stats["circuit"] != "closed"), host=host)
+
+    REGISTRY.register_collector(collect)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"metrics: {format % args}")
+
+
+def start_http_server(
+    port: int, host: str = "0.0.0.0"
+) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics on a side port from a daemon thread"""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logging.error(f"Failed to start metrics server on port {port}: {e}")
+        return None
+
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="metrics-server", daemon=True
+    ).start()
+    logging.info(f"📈 Metrics available at http://{host}:{port}/metrics")
+    return server
@@ -1,63 +1,100 @@
+import functools
 import requests
 import logging
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
-from openai import OpenAI
 from typing import Dict, List, Optional
 from urllib.parse import urljoin, urlparse
 
+from ai_messages import AIMessageService
 from config import Config
+from dashboard_snapshot import DashboardSnapshot
+from detection import get_detector
 from database import DatabaseManager
+from discovery import DiscoveryCrawler
+from fetch import PageFetcher
 from notifiers import NotificationManager
-
-try:
-    from screenshot_checker import ScreenshotStockChecker
-
-    SCREENSHOT_AVAILABLE = True
-except ImportError:
-    SCREENSHOT_AVAILABLE = False
-    logging.warning("Screenshot checker not available - selenium dependencies missing")
-
-
-class ProductInfo:
-    """Data class for product information"""
-
-    def __init__(
-        self,
-        name: str = None,
-        price: str = None,
-        image_url: str = None,
-        availability: str = None,
-    ):
-        self.name = name
-        self.price = price
-        self.image_url = image_url
-        self.availability = availability
-        self.last_updated = datetime.utcnow()
-
-    def to_dict(self) -> Dict:
-        return {
-            "name": self.name,
-            "price": self.price,
-            "image_url": self.image_url,
-            "availability": self.availability,
-            "last_updated": self.last_updated.isoformat(),
-        }
+from outbox import NotificationOutbox
+from rate_limit import HostRateLimiter, HostUnavailableError
+from records import CheckResult, ProductInfo, UrlStateTable
+from response_cache import ResponseCache
+from url_import import normalize_url
+import metrics
+import tracing
+
+
+# Statuses that mean the product page is gone: a definite "not available",
+# unlike timeouts, 429s or server errors, which say nothing about stock
+GONE_STATUSES = (404, 410)
+
+
+@functools.lru_cache(maxsize=None)
+def load_screenshot_checker():
+    """Import the screenshot checker on first use (None if selenium is missing)"""
+    try:
+        from screenshot_checker import ScreenshotStockChecker
+    except ImportError:
+        logging.warning(
+            "Screenshot checker not available - selenium dependencies missing"
+        )
+        return None
+    return ScreenshotStockChecker
 
 
 class StockMonitor:
     """Main stock monitoring class"""
 
-    def __init__(self):
-        self.db = DatabaseManager()
+    def __init__(self, db: DatabaseManager = None, seed_urls: bool = True):
+        self.db = db or DatabaseManager()
         self.notification_manager = NotificationManager()
-        self.openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
-        self.last_stock_status = {}
+        self.ai_messages = AIMessageService(self.db)
+        self.snapshot = DashboardSnapshot(self.db)
+        self.response_cache = ResponseCache(self.db)
+        self.rate_limiter = HostRateLimiter(
+            Config.HOST_RATE,
+            burst=Config.HOST_BURST,
+            min_rate=Config.HOST_MIN_RATE,
+            max_wait=Config.HOST_MAX_WAIT,
+            breaker_threshold=Config.BREAKER_THRESHOLD,
+            breaker_cooldown=Config.BREAKER_COOLDOWN,
+            breaker_max_cooldown=Config.BREAKER_MAX_COOLDOWN,
+        )
+        self.fetcher = PageFetcher(
+            self.rate_limiter, pool_size=max(10, Config.CHECK_CONCURRENCY)
+        )
+        self.profiler = None
+        self.detector = get_detector()
+        self.tracer = tracing.Tracer()
+        self.tracer.listeners.append(metrics.observe_trace)
+        self.outbox = (
+            NotificationOutbox(self.db, self.notification_manager)
+            if Config.ENABLE_OUTBOX
+            else None
+        )
+        self.url_state = UrlStateTable()
+
+        # Message references of alerts sent without the outbox, for follow-ups
+        self._alert_refs: Dict[str, Dict[str, str]] = {}
 
-        # Add default URLs to database
+        # Add default URLs to database, keeping what's known about them
+        if seed_urls:
+            self.db.upsert_monitor_urls(self.seed_entries())
+
+    @staticmethod
+    def seed_entries() -> List[Dict]:
+        """MONITOR_URLS, normalized like imported URLs so neither duplicates"""
+        entries = []
         for url in Config.get_urls():
-            self.db.add_monitor_url(url)
+            try:
+                entries.append({"url": normalize_url(url)})
+            except ValueError as e:
+                logging.warning(f"⚠️ Skipping MONITOR_URLS entry: {e}")
+        return entries
+
+    @property
+    def openai_client(self):
+        return self.ai_messages.client
 
     def extract_product_info(self, soup: BeautifulSoup, url: str) -> ProductInfo:
         """Extract product information from the page"""
@@ -131,14 +168,20 @@ class StockMonitor:
 
     def check_stock(
         self, url: str, use_screenshot: bool = False
-    ) -> tuple[bool, ProductInfo]:
-        """Check if product is in stock and return stock status + product info"""
+    ) -> tuple[Optional[bool], ProductInfo]:
+        """Check if product is in stock and return stock status + product info
+
+        The status is None (unknown) when the page couldn't be fetched or
+        parsed; that says nothing about stock and must not count as a change.
+        A 404 or 410 means the product was delisted and counts as out of stock.
+        """
 
         # Try screenshot method if enabled and available
-        if use_screenshot and SCREENSHOT_AVAILABLE:
+        checker_class = load_screenshot_checker() if use_screenshot else None
+        if checker_class:
             try:
                 logging.info(f"📸 Using screenshot method for {url}")
-                screenshot_checker = ScreenshotStockChecker()
+                screenshot_checker = checker_class()
                 in_stock, screenshot_info = (
                     screenshot_checker.check_stock_with_screenshot(url)
                 )
@@ -162,103 +205,24 @@ class StockMonitor:
 
         # Fallback to traditional HTML parsing method
         try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/91.0.4472.124 Safari/537.36"
-            }
-
-            response = requests.get(
-                url, headers=headers, timeout=Config.REQUEST_TIMEOUT
-            )
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "html.parser")
-            product_info = self.extract_product_info(soup, url)
-
-            # Check for stock indicators
-            in_stock = False
-
-            # Method 1: Check for any button with stock-related text
-            all_buttons = soup.find_all(["button", "a", "div"])
-            stock_button_phrases = [
-                "add to cart",
-                "buy now",
-                "purchase",
-                "pick one to shake",
-                "buy multiple boxes",
-                "add to bag",
-                "shop now",
-                "get it now",
-                "buy",
-                "cart",
-                "shake",
-                "pick one",
-            ]
-
-            for btn in all_buttons:
-                btn_text = btn.get_text().strip().lower()
-                if btn_text and any(
-                    phrase in btn_text for phrase in stock_button_phrases
-                ):
-                    # Check if button is not disabled
-                    if not btn.get("disabled") and "disabled" not in btn.get(
-                        "class", []
-                    ):
-                        logging.debug(f"Found stock button: '{btn_text.strip()}'")
-                        in_stock = True
-                        break
-
-            # Method 2: Check for specific PopMart stock indicators in page text
-            if not in_stock:
-                page_text = soup.get_text().lower()
-                popmart_stock_indicators = [
-                    "pick one to shake",
-                    "buy multiple boxes",
-                    "add to cart",
-                    "in stock",
-                    "available now",
-                    "buy now",
-                ]
-
-                for indicator in popmart_stock_indicators:
-                    if indicator in page_text:
-                        logging.debug(f"Found stock indicator in text: '{indicator}'")
-                        in_stock = True
-                        break
-
-            # Method 3: Check availability text
-            if not in_stock:
-                availability_texts = (
-                    [product_info.availability] if product_info.availability else []
+            with tracing.stage("fetch"):
+                response = self.fetcher.fetch(url)
+            if response.status_code in GONE_STATUSES:
+                logging.info(
+                    f"🚫 {url} returned HTTP {response.status_code}, "
+                    f"treating it as not available"
                 )
-
-                # Add more availability indicators
-                stock_indicators = soup.select(
-                    ".stock-status, .availability, .product-status"
+                return False, ProductInfo(
+                    availability=f"Not found (HTTP {response.status_code})"
                 )
-                for indicator in stock_indicators:
-                    availability_texts.append(indicator.get_text().strip().lower())
-
-                for text in availability_texts:
-                    if text and any(
-                        phrase in text
-                        for phrase in ["in stock", "available", "add to cart"]
-                    ):
-                        in_stock = True
-                        break
-                    elif any(
-                        phrase in text
-                        for phrase in ["out of stock", "sold out", "unavailable"]
-                    ):
-                        in_stock = False
-                        break
+            response.raise_for_status()
+
+            with tracing.stage("parse"):
+                soup = BeautifulSoup(response.text, "html.parser")
+                product_info = self.extract_product_info(soup, url)
 
-            # Method 4: Check if page exists and doesn't show 404/error
-            if soup.select("h1"):  # Basic check if page loaded properly
-                page_text = soup.get_text().lower()
-                if "page not found" in page_text or "404" in page_text:
-                    in_stock = False
+            with tracing.stage("detect"):
+                in_stock = self.detect_stock(soup, product_info)
 
             logging.debug(
                 f"Stock check for {url}: in_stock={in_stock}, "
@@ -267,101 +231,238 @@ class StockMonitor:
 
             return in_stock, product_info
 
+        except HostUnavailableError:
+            raise
         except requests.RequestException as e:
             logging.error(f"Request failed for {url}: {e}")
-            return False, ProductInfo()
+            tracing.annotate(error=str(e))
+            return None, ProductInfo()
         except Exception as e:
             logging.error(f"Stock check failed for {url}: {e}")
-            return False, ProductInfo()
+            tracing.annotate(error=str(e))
+            return None, ProductInfo()
+
+    def detect_stock(self, soup: BeautifulSoup, product_info: ProductInfo) -> bool:
+        """Decide from a parsed page whether the product is in stock"""
+        return self.detector.detect(soup, product_info)
 
     def generate_ai_message(self, url: str, product_info: ProductInfo) -> str:
         """Generate AI-powered notification message"""
-        try:
-            product_name = product_info.name or "Labubu product"
-            price = product_info.price or "Unknown price"
-
-            prompt = f"""
-            A PopMart {product_name} (price: {price}) just came back in stock! 
-            Create an exciting, urgent notification message that will motivate someone 
-            to buy it immediately. Keep it under 100 words and include emojis.
-            URL: {url}
-            """
-
-            response = self.openai_client.chat.completions.create(
-                model=Config.OPENAI_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an enthusiastic shopping assistant who helps people get limited edition collectibles.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=150,
-                temperature=0.8,
+        return self.ai_messages.generate_with_fallback(url, product_info)
+
+    def get_restock_message(self, url: str, product_info: ProductInfo) -> str:
+        """Get the restock message, using a precomputed one when available"""
+        with tracing.stage("ai"):
+            if Config.ENABLE_AI_MESSAGE_CACHE:
+                return self.ai_messages.get_message(url, product_info)
+            return self.generate_ai_message(url, product_info)
+
+    def _dispatch_alert(
+        self,
+        url: str,
+        message: str,
+        product_info: ProductInfo,
+        alert_id: str,
+        detected_at: float,
+        stage: str = "alert",
+    ):
+        """Send an alert through the outbox, or directly when it is disabled"""
+        # Hand off to the durable outbox so delivery retries happen off
+        # the monitoring loop
+        if self.outbox:
+            self.outbox.enqueue_restock_alert(
+                url, message, product_info.to_dict(), alert_id, detected_at, stage
             )
+            return
 
-            ai_message = response.choices[0].message.content.strip()
-            logging.info(f"Generated AI message: {ai_message}")
-            return ai_message
+        message_refs = {}
+        notification_results = self.notification_manager.send_restock_alert(
+            url, message, product_info.to_dict(), message_refs
+        )
+        latency_ms = (time.time() - detected_at) * 1000
+        if message_refs:
+            self._alert_refs[alert_id] = message_refs
+
+        # Log notification attempts
+        for notifier_type, success in notification_results.items():
+            status = "success" if success else "failed"
+            self.db.log_notification(
+                url, notifier_type, status, message, stage, latency_ms
+            )
 
-        except Exception as e:
-            logging.error(f"Failed to generate AI message: {e}")
-            return f"🎉 Great news! {product_info.name or 'Your monitored item'} is back in stock! Get it now before it sells out again! 🛒✨"
+        logging.info(
+            f"Restock alert processed for {url}. "
+            f"Notifications: {notification_results}"
+        )
+
+    def _dispatch_followup(
+        self,
+        url: str,
+        message: str,
+        product_info: ProductInfo,
+        alert_id: str,
+        detected_at: float,
+    ):
+        """Deliver the AI message for an alert that was sent first"""
+        if self.outbox:
+            self.outbox.enqueue_followup(
+                url, message, product_info.to_dict(), alert_id, detected_at
+            )
+            return
+
+        notification_results = self.notification_manager.send_followup_alert(
+            url, message, product_info.to_dict(), self._alert_refs.pop(alert_id, {})
+        )
+        latency_ms = (time.time() - detected_at) * 1000
 
-    def process_restock_alert(self, url: str, product_info: ProductInfo):
+        for notifier_type, success in notification_results.items():
+            status = "success" if success else "failed"
+            self.db.log_notification(
+                url, notifier_type, status, message, "enriched", latency_ms
+            )
+
+        logging.info(
+            f"AI follow-up processed for {url}. "
+            f"Notifications: {notification_results}"
+        )
+
+    def process_restock_alert(
+        self, url: str, product_info: ProductInfo, alert_id: str = None
+    ):
         """Process and send restock alerts"""
         try:
-            # Generate AI message
-            ai_message = self.generate_ai_message(url, product_info)
+            detected_at = time.time()
+            alert_id = alert_id or f"{url}:{int(detected_at)}"
 
-            # Send notifications
-            notification_results = self.notification_manager.send_restock_alert(
-                url, ai_message, product_info.to_dict()
+            has_cached_message = (
+                Config.ENABLE_AI_MESSAGE_CACHE
+                and self.ai_messages.get_cached(url, product_info, allow_stale=True)
+                is not None
             )
 
-            # Log notification attempts
-            for notifier_type, success in notification_results.items():
-                status = "success" if success else "failed"
-                self.db.log_notification(url, notifier_type, status, ai_message)
+            # Send-first: never let a model call delay the first alert
+            if Config.SEND_FIRST_ALERTS and not has_cached_message:
+                fallback_message = self.ai_messages.fallback_message(product_info)
+                self._dispatch_alert(
+                    url,
+                    fallback_message,
+                    product_info,
+                    alert_id,
+                    detected_at,
+                    stage="initial",
+                )
+                self.ai_messages.enrich_in_background(
+                    url,
+                    product_info,
+                    lambda message: self._dispatch_followup(
+                        url, message, product_info, alert_id, detected_at
+                    ),
+                    # No follow-up is coming, so its message refs aren't needed
+                    on_failed=lambda: self._alert_refs.pop(alert_id, None),
+                )
+                return
 
-            logging.info(
-                f"Restock alert processed for {url}. "
-                f"Notifications: {notification_results}"
-            )
+            # Generate AI message (served from the cache when precomputed)
+            ai_message = self.get_restock_message(url, product_info)
+            self._dispatch_alert(url, ai_message, product_info, alert_id, detected_at)
 
         except Exception as e:
             logging.error(f"Failed to process restock alert for {url}: {e}")
 
-    def monitor_single_url(self, url: str):
-        """Monitor a single URL for stock changes"""
+    def monitor_single_url(self, url: str) -> Optional[tracing.Trace]:
+        """Monitor a single URL for stock changes, returning its trace"""
+        trace = None
         try:
+            with self.tracer.trace(url) as trace:
+                self._monitor_single_url(url, trace)
+        except HostUnavailableError as e:
+            logging.warning(f"⏸️ Skipped {url}: {e}")
+        except Exception as e:
+            logging.error(f"Error monitoring {url}: {e}")
+        return trace
+
+    def _monitor_single_url(self, url: str, trace: tracing.Trace):
+        with trace.stage("db"):
             self.db.update_last_checked(url)
 
-            in_stock, product_info = self.check_stock(url)
+        in_stock, product_info = self.check_stock(url)
+        trace.attributes["in_stock"] = in_stock
+        result = CheckResult(
+            url, in_stock, product_info, error=trace.attributes.get("error")
+        )
+
+        # A failed check says nothing about stock: keep the last known state
+        if in_stock is None:
+            self.url_state.record(result)
+            logging.warning(
+                f"❔ {url} - Stock: unknown ({result.error or 'check failed'})"
+            )
+            return
 
-            # Log the stock event
-            self.db.log_stock_event(
+        # Log the stock event
+        with trace.stage("db"):
+            event_id = self.db.log_stock_event(
                 url, in_stock, product_info.name, product_info.price
             )
 
-            # Check if this is a new restock (was out of stock, now in stock)
-            was_in_stock = self.last_stock_status.get(url, False)
+        # Check if this is a new restock (was out of stock, now in stock)
+        was_in_stock = self.url_state.record(result) or False
 
-            if in_stock and not was_in_stock:
-                logging.info(f"🎉 RESTOCK DETECTED! {url}")
-                self.process_restock_alert(url, product_info)
+        if in_stock and not was_in_stock:
+            logging.info(f"🎉 RESTOCK DETECTED! {url}")
+            with trace.stage("notify"):
+                self.process_restock_alert(
+                    url, product_info, alert_id=f"restock:{event_id}"
+                )
 
-            # Update last known status
-            self.last_stock_status[url] = in_stock
+        # Dashboards shouldn't wait for the end of the cycle to see a flip
+        if in_stock != was_in_stock:
+            self.response_cache.invalidate(f"stock flip for {url}")
 
-            status_emoji = "✅" if in_stock else "❌"
+        # Precompute the restock message so an alert never waits on the LLM.
+        # Only a product that is out of stock can fire the next alert, so
+        # in-stock ones aren't warmed; each warm is one model call per
+        # product and AI_MESSAGE_TTL, whether or not it ever restocks
+        if Config.ENABLE_AI_MESSAGE_CACHE and not in_stock:
+            self.ai_messages.warm(url, product_info)
+
+        status_emoji = "✅" if in_stock else "❌"
+        logging.info(
+            f"{status_emoji} {url} - Stock: {in_stock} - "
+            f"Product: {product_info.name or 'Unknown'}"
+        )
+
+    def report_delays(self, traces: List[Optional[tracing.Trace]]) -> List[Dict]:
+        """Log which URLs rate limiting delayed or skipped this cycle, and why"""
+        delayed = [
+            {
+                "url": trace.url,
+                "reason": trace.attributes["delay_reason"],
+                "seconds": trace.attributes.get("delay_seconds", 0.0),
+                "skipped": bool(trace.attributes.get("skipped")),
+            }
+            for trace in traces
+            if trace is not None and "delay_reason" in trace.attributes
+        ]
+        if not delayed:
+            return delayed
+
+        by_reason: Dict[str, List[Dict]] = {}
+        for entry in delayed:
+            by_reason.setdefault(entry["reason"], []).append(entry)
+        for reason, entries in by_reason.items():
+            skipped = sum(entry["skipped"] for entry in entries)
+            longest = max(entry["seconds"] for entry in entries)
             logging.info(
-                f"{status_emoji} {url} - Stock: {in_stock} - "
-                f"Product: {product_info.name or 'Unknown'}"
+                f"⏳ {len(entries)} URLs delayed by {reason} "
+                f"(longest {longest:.1f}s, {skipped} skipped)"
             )
-
-        except Exception as e:
-            logging.error(f"Error monitoring {url}: {e}")
+            for entry in entries:
+                action = (
+                    "skipped" if entry["skipped"] else f"waited {entry['seconds']:.1f}s"
+                )
+                logging.debug(f"   {entry['url']}: {action}")
+        return delayed
 
     def run_monitoring_cycle(self):
         """Run one complete monitoring cycle for all URLs"""
@@ -372,29 +473,90 @@ class StockMonitor:
             return
 
         logging.info(f"Starting monitoring cycle for {len(monitor_urls)} URLs")
+        cycle_start = time.time()
+        metrics.MONITORED_URLS.set(len(monitor_urls))
+
+        # Checks run concurrently; per-host rate limits keep them polite
+        check = self.monitor_single_url
+        if self.profiler is not None:
+            check = self.profiler.wrap(check)
+        urls = [url_data["url"] for url_data in monitor_urls]
+        with ThreadPoolExecutor(
+            max_workers=max(1, Config.CHECK_CONCURRENCY),
+            thread_name_prefix="check",
+        ) as executor:
+            traces = list(executor.map(check, urls))
+
+        delayed = self.report_delays(traces)
+
+        # Precompute what the dashboard shows so page views don't query
+        try:
+            self.snapshot.refresh(
+                {
+                    "url_count": len(monitor_urls),
+                    "duration_seconds": round(time.time() - cycle_start, 3),
+                    "finished_at": time.time(),
+                    "delayed": delayed,
+                    "hosts": self.rate_limiter.stats(),
+                }
+            )
+        except Exception as e:
+            logging.error(f"Failed to refresh dashboard snapshot: {e}")
 
-        for url_data in monitor_urls:
-            url = url_data["url"]
-            try:
-                self.monitor_single_url(url)
-                # Small delay between requests to be respectful
-                time.sleep(1)
-            except Exception as e:
-                logging.error(f"Error in monitoring cycle for {url}: {e}")
+        try:
+            self.db.save_snapshot(self.tracer.SNAPSHOT_NAME, self.tracer.summary())
+        except Exception as e:
+            logging.error(f"Failed to save latency metrics: {e}")
+
+        try:
+            self.response_cache.invalidate("monitoring cycle")
+        except Exception as e:
+            logging.error(f"Failed to invalidate response cache: {e}")
+
+        duration = time.time() - cycle_start
+        metrics.CYCLE_SECONDS.observe(duration)
+        metrics.LAST_CYCLE.set(time.time())
+        if duration > Config.CHECK_INTERVAL:
+            metrics.CYCLE_OVERRUNS.inc()
+            logging.warning(
+                f"⏱️ Monitoring cycle took {duration:.1f}s, longer than the "
+                f"{Config.CHECK_INTERVAL}s check interval"
+            )
 
         logging.info("Monitoring cycle completed")
 
-    def run_continuous_monitoring(self):
-        """Run continuous monitoring loop"""
+    def run_continuous_monitoring(self, profiler=None):
+        """Run continuous monitoring loop, optionally profiling cycles"""
         logging.info("🚀 Starting Labubu Monitor")
         logging.info(f"Check interval: {Config.CHECK_INTERVAL} seconds")
         logging.info(
             f"Enabled notifiers: {self.notification_manager.get_enabled_notifiers()}"
         )
 
+        metrics.CHECK_INTERVAL.set(Config.CHECK_INTERVAL)
+        metrics.track_outbox(self.db)
+        metrics.track_rate_limits(self.rate_limiter)
+        if Config.METRICS_PORT:
+            metrics.start_http_server(Config.METRICS_PORT)
+
+        if self.outbox:
+            self.outbox.start()
+
+        # Discovery shares the fetcher, so its pages count against the same
+        # per-host rate limits as stock checks
+        crawler = None
+        if Config.ENABLE_DISCOVERY:
+            crawler = DiscoveryCrawler(self.db, fetcher=self.fetcher)
+            crawler.start()
+
         try:
+            self.profiler = profiler
             while True:
-                self.run_monitoring_cycle()
+                if profiler is not None:
+                    with profiler.cycle():
+                        self.run_monitoring_cycle()
+                else:
+                    self.run_monitoring_cycle()
                 logging.info(f"💤 Sleeping for {Config.CHECK_INTERVAL} seconds...")
                 time.sleep(Config.CHECK_INTERVAL)
 
@@ -403,3 +565,11 @@ class StockMonitor:
         except Exception as e:
             logging.error(f"Fatal error in monitoring loop: {e}")
             raise
+        finally:
+            if crawler is not None:
+                crawler.stop()
+            if self.outbox:
+                self.outbox.stop()
+            self.ai_messages.shutdown()
+            if profiler is not None:
+                profiler.close()
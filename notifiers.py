@@ -1,17 +1,33 @@
 import smtplib
 import requests
 import logging
+import time
 from abc import ABC, abstractmethod
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Dict, List, Optional
 from datetime import datetime
 from config import Config
+import metrics
+from rate_limit import RateLimitedError, parse_retry_after
+from webhook_transport import get_webhook_transport
 
 
 class BaseNotifier(ABC):
     """Abstract base class for all notifiers"""
 
+    # Seconds the remote side asked us to wait after the last failed send
+    retry_after: Optional[float] = None
+
+    # Whether several alerts can be merged into a single message
+    supports_batching = False
+
+    # Whether an enriched (AI) follow-up should be sent after a first alert
+    supports_followup = True
+
+    # Reference to the last single-alert message sent (used for edits)
+    last_message_ref: Optional[str] = None
+
     @abstractmethod
     def send_notification(
         self, message: str, url: str, product_info: Dict = None
@@ -24,10 +40,54 @@ class BaseNotifier(ABC):
         """Return the type of this notifier"""
         pass
 
+    def send_batch(self, alerts: List[Dict]) -> List[bool]:
+        """Send several alerts (dicts of message/url/product_info)"""
+        return [
+            self.send_notification(
+                alert["message"], alert["url"], alert.get("product_info")
+            )
+            for alert in alerts
+        ]
+
+    def send_followup(
+        self,
+        message: str,
+        url: str,
+        product_info: Dict = None,
+        message_ref: str = None,
+    ) -> bool:
+        """Deliver an enriched message for an alert that was already sent"""
+        return self.send_notification(message, url, product_info)
+
+    def _raise_for_status(self, response: requests.Response):
+        """Raise on HTTP errors, remembering any Retry-After hint"""
+        self.retry_after = None
+        if response.status_code in (429, 503):
+            self.retry_after = parse_retry_after(response.headers)
+        response.raise_for_status()
+
+    def _request(self, method: str, webhook_url: str, **kwargs) -> requests.Response:
+        """Send through the shared rate-limited webhook transport"""
+        # A hint from an earlier attempt must not outlive it
+        self.retry_after = None
+        try:
+            response = get_webhook_transport().request(method, webhook_url, **kwargs)
+        except RateLimitedError as e:
+            self.retry_after = e.retry_after
+            raise
+        self._raise_for_status(response)
+        return response
+
+    def _post(self, webhook_url: str, **kwargs) -> requests.Response:
+        return self._request("POST", webhook_url, **kwargs)
+
 
 class EmailNotifier(BaseNotifier):
     """Email notification handler"""
 
+    # A second email for the same restock is more noise than help
+    supports_followup = False
+
     def __init__(self):
         self.smtp_server = Config.EMAIL_SMTP_SERVER
         self.smtp_port = Config.EMAIL_SMTP_PORT
@@ -87,59 +147,154 @@ class EmailNotifier(BaseNotifier):
 class DiscordNotifier(BaseNotifier):
     """Discord webhook notification handler"""
 
+    supports_batching = True
+
+    # Discord allows at most 10 embeds per message, 4096 characters per
+    # embed description and 6000 characters across all embeds of a message
+    MAX_EMBEDS = 10
+    MAX_DESCRIPTION = 4096
+    MAX_EMBED_TOTAL = 6000
+
     def __init__(self):
         self.webhook_url = Config.DISCORD_WEBHOOK_URL
 
+    def _build_embed(
+        self, url: str, product_info: Dict = None, message: str = None
+    ) -> Dict:
+        description = message or "The item you're monitoring is back in stock!"
+        embed = {
+            "title": "🧸 Labubu Restock Alert!",
+            "description": description[: self.MAX_DESCRIPTION],
+            "color": 0x00FF00,  # Green color
+            "fields": [
+                {
+                    "name": "Product",
+                    "value": (
+                        product_info.get("name", "Unknown")
+                        if product_info
+                        else "Unknown"
+                    ),
+                    "inline": True,
+                },
+                {
+                    "name": "Price",
+                    "value": (
+                        product_info.get("price", "N/A") if product_info else "N/A"
+                    ),
+                    "inline": True,
+                },
+                {
+                    "name": "Link",
+                    "value": f"[Click here to buy!]({url})",
+                    "inline": False,
+                },
+            ],
+            "footer": {
+                "text": f"Labubu Monitor • {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            },
+        }
+
+        if product_info and product_info.get("image_url"):
+            embed["thumbnail"] = {"url": product_info["image_url"]}
+
+        return embed
+
+    @staticmethod
+    def _embed_size(embed: Dict) -> int:
+        """Characters Discord counts towards the per-message embed limit"""
+        size = len(embed["title"]) + len(embed["description"])
+        size += len(embed["footer"]["text"])
+        for field in embed["fields"]:
+            size += len(field["name"]) + len(str(field["value"]))
+        return size
+
+    def _chunks(self, embeds: List[Dict]) -> List[List[int]]:
+        """Group embeds (by index) into messages within Discord's limits"""
+        chunks: List[List[int]] = []
+        total = 0
+        for index, embed in enumerate(embeds):
+            size = self._embed_size(embed)
+            if (
+                not chunks
+                or len(chunks[-1]) >= self.MAX_EMBEDS
+                or total + size > self.MAX_EMBED_TOTAL
+            ):
+                chunks.append([])
+                total = 0
+            chunks[-1].append(index)
+            total += size
+        return chunks
+
     def send_notification(
         self, message: str, url: str, product_info: Dict = None
     ) -> bool:
         """Send Discord notification"""
-        try:
-            embed = {
-                "title": "🧸 Labubu Restock Alert!",
-                "description": "The item you're monitoring is back in stock!",
-                "color": 0x00FF00,  # Green color
-                "fields": [
-                    {
-                        "name": "Product",
-                        "value": (
-                            product_info.get("name", "Unknown")
-                            if product_info
-                            else "Unknown"
-                        ),
-                        "inline": True,
-                    },
-                    {
-                        "name": "Price",
-                        "value": (
-                            product_info.get("price", "N/A") if product_info else "N/A"
-                        ),
-                        "inline": True,
-                    },
-                    {
-                        "name": "Link",
-                        "value": f"[Click here to buy!]({url})",
-                        "inline": False,
-                    },
-                ],
-                "footer": {
-                    "text": f"Labubu Monitor • {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                },
-            }
+        return self.send_batch(
+            [{"message": message, "url": url, "product_info": product_info}]
+        )[0]
+
+    def send_batch(self, alerts: List[Dict]) -> List[bool]:
+        """Send alerts as few Discord messages with one embed per restock
+
+        Each alert's message goes in its own embed, so a long message can't
+        push the others out of a shared content field.
+        """
+        results = []
+        self.last_message_ref = None
+        embeds = [
+            self._build_embed(alert["url"], alert.get("product_info"), alert["message"])
+            for alert in alerts
+        ]
+
+        for chunk in self._chunks(embeds):
+            try:
+                payload = {
+                    "content": "@everyone",
+                    "embeds": [embeds[index] for index in chunk],
+                }
+
+                # wait=true makes Discord return the message so it can be edited
+                response = self._post(
+                    self.webhook_url, json=payload, params={"wait": "true"}
+                )
+                if len(alerts) == 1 and response.content:
+                    self.last_message_ref = response.json().get("id")
 
-            if product_info and product_info.get("image_url"):
-                embed["thumbnail"] = {"url": product_info["image_url"]}
+                logging.info(
+                    f"Discord notification sent successfully ({len(chunk)} alerts)"
+                )
+                results.extend([True] * len(chunk))
 
-            payload = {"content": f"@everyone {message}", "embeds": [embed]}
+            except Exception as e:
+                logging.error(f"Failed to send Discord notification: {e}")
+                results.extend([False] * len(chunk))
+
+        return results
 
-            response = requests.post(self.webhook_url, json=payload, timeout=10)
-            response.raise_for_status()
+    def send_followup(
+        self,
+        message: str,
+        url: str,
+        product_info: Dict = None,
+        message_ref: str = None,
+    ) -> bool:
+        """Edit the original Discord message in place, or post a follow-up"""
+        if not message_ref:
+            return super().send_followup(message, url, product_info)
 
-            logging.info("Discord notification sent successfully")
+        try:
+            payload = {
+                "content": "@everyone",
+                "embeds": [self._build_embed(url, product_info, message)],
+            }
+            self._request(
+                "PATCH", f"{self.webhook_url}/messages/{message_ref}", json=payload
+            )
+            logging.info("Discord notification updated with AI message")
             return True
 
         except Exception as e:
-            logging.error(f"Failed to send Discord notification: {e}")
+            logging.error(f"Failed to update Discord notification: {e}")
             return False
 
     def get_notification_type(self) -> str:
@@ -165,13 +320,11 @@ class WebhookNotifier(BaseNotifier):
                 "product_info": product_info or {},
             }
 
-            response = requests.post(
+            self._post(
                 self.webhook_url,
                 json=payload,
                 headers={"Content-Type": "application/json"},
-                timeout=10,
             )
-            response.raise_for_status()
 
             logging.info("Webhook notification sent successfully")
             return True
@@ -180,6 +333,36 @@ class WebhookNotifier(BaseNotifier):
             logging.error(f"Failed to send webhook notification: {e}")
             return False
 
+    def send_followup(
+        self,
+        message: str,
+        url: str,
+        product_info: Dict = None,
+        message_ref: str = None,
+    ) -> bool:
+        """Send the enriched message as a restock_alert_update event"""
+        try:
+            payload = {
+                "timestamp": datetime.utcnow().isoformat(),
+                "event": "restock_alert_update",
+                "url": url,
+                "message": message,
+                "product_info": product_info or {},
+            }
+
+            self._post(
+                self.webhook_url,
+                json=payload,
+                headers={"Content-Type": "application/json"},
+            )
+
+            logging.info("Webhook follow-up sent successfully")
+            return True
+
+        except Exception as e:
+            logging.error(f"Failed to send webhook follow-up: {e}")
+            return False
+
     def get_notification_type(self) -> str:
         return "webhook"
 
@@ -187,87 +370,130 @@ class WebhookNotifier(BaseNotifier):
 class SlackNotifier(BaseNotifier):
     """Slack webhook notification handler"""
 
+    supports_batching = True
+
+    # Slack allows at most 50 blocks per message
+    MAX_BLOCKS = 50
+
     def __init__(self):
         self.webhook_url = Config.SLACK_WEBHOOK_URL
 
-    def send_notification(
+    def _build_blocks(
         self, message: str, url: str, product_info: Dict = None
-    ) -> bool:
-        """Send Slack notification"""
-        try:
-            # Create rich Slack message blocks
-            blocks = [
-                {
-                    "type": "header",
-                    "text": {
-                        "type": "plain_text",
-                        "text": "🧸 Labubu Restock Alert! 🧸",
-                    },
+    ) -> List[Dict]:
+        # Create rich Slack message blocks
+        blocks = [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"*Great news!* The item you're monitoring is back in stock!\n\n*AI Message:* {message}",
                 },
-                {
-                    "type": "section",
-                    "text": {
+            },
+            {
+                "type": "section",
+                "fields": [
+                    {
                         "type": "mrkdwn",
-                        "text": f"*Great news!* The item you're monitoring is back in stock!\n\n*AI Message:* {message}",
+                        "text": f"*Product:*\n{product_info.get('name', 'Unknown') if product_info else 'Unknown'}",
                     },
-                },
-                {
-                    "type": "section",
-                    "fields": [
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*Product:*\n{product_info.get('name', 'Unknown') if product_info else 'Unknown'}",
-                        },
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*Price:*\n{product_info.get('price', 'N/A') if product_info else 'N/A'}",
-                        },
-                    ],
-                },
-                {
-                    "type": "actions",
-                    "elements": [
-                        {
-                            "type": "button",
-                            "text": {"type": "plain_text", "text": "🛒 Buy Now!"},
-                            "url": url,
-                            "style": "primary",
-                        }
-                    ],
-                },
+                    {
+                        "type": "mrkdwn",
+                        "text": f"*Price:*\n{product_info.get('price', 'N/A') if product_info else 'N/A'}",
+                    },
+                ],
+            },
+            {
+                "type": "actions",
+                "elements": [
+                    {
+                        "type": "button",
+                        "text": {"type": "plain_text", "text": "🛒 Buy Now!"},
+                        "url": url,
+                        "style": "primary",
+                    }
+                ],
+            },
+            {"type": "divider"},
+        ]
+
+        # Add thumbnail if available
+        if product_info and product_info.get("image_url"):
+            blocks.insert(
+                1,
                 {
-                    "type": "context",
-                    "elements": [
-                        {
-                            "type": "mrkdwn",
-                            "text": f"Sent by Labubu Monitor • {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-                        }
-                    ],
+                    "type": "image",
+                    "image_url": product_info["image_url"],
+                    "alt_text": "Product Image",
                 },
-            ]
+            )
 
-            # Add thumbnail if available
-            if product_info and product_info.get("image_url"):
-                blocks.insert(
-                    2,
-                    {
-                        "type": "image",
-                        "image_url": product_info["image_url"],
-                        "alt_text": "Product Image",
-                    },
-                )
+        return blocks
 
-            payload = {"text": f"🧸 Labubu Restock Alert!", "blocks": blocks}
+    def send_notification(
+        self, message: str, url: str, product_info: Dict = None
+    ) -> bool:
+        """Send Slack notification"""
+        return self.send_batch(
+            [{"message": message, "url": url, "product_info": product_info}]
+        )[0]
+
+    def send_batch(self, alerts: List[Dict]) -> List[bool]:
+        """Send alerts as few Slack messages with a block group per restock"""
+        header = {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": "🧸 Labubu Restock Alert! 🧸",
+            },
+        }
+        footer = {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"Sent by Labubu Monitor • {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                }
+            ],
+        }
+
+        # Pack alerts into messages without exceeding the block limit
+        chunks: List[List[Dict]] = []
+        chunk_blocks: List[List[Dict]] = []
+        used = 2  # header + footer
+        for alert in alerts:
+            blocks = self._build_blocks(
+                alert["message"], alert["url"], alert.get("product_info")
+            )
+            if chunks and used + len(blocks) <= self.MAX_BLOCKS:
+                chunks[-1].append(alert)
+                chunk_blocks[-1].extend(blocks)
+                used += len(blocks)
+            else:
+                chunks.append([alert])
+                chunk_blocks.append(list(blocks))
+                used = 2 + len(blocks)
+
+        results = []
+        for chunk, blocks in zip(chunks, chunk_blocks):
+            try:
+                payload = {
+                    "text": f"🧸 Labubu Restock Alert!",
+                    "blocks": [header] + blocks[:-1] + [footer],
+                }
 
-            response = requests.post(self.webhook_url, json=payload, timeout=10)
-            response.raise_for_status()
+                self._post(self.webhook_url, json=payload)
 
-            logging.info("Slack notification sent successfully")
-            return True
+                logging.info(
+                    f"Slack notification sent successfully ({len(chunk)} alerts)"
+                )
+                results.extend([True] * len(chunk))
 
-        except Exception as e:
-            logging.error(f"Failed to send Slack notification: {e}")
-            return False
+            except Exception as e:
+                logging.error(f"Failed to send Slack notification: {e}")
+                results.extend([False] * len(chunk))
+
+        return results
 
     def get_notification_type(self) -> str:
         return "slack"
@@ -302,23 +528,74 @@ class NotificationManager:
             logging.warning("No notifiers enabled!")
 
     def send_restock_alert(
-        self, url: str, ai_message: str, product_info: Dict = None
+        self,
+        url: str,
+        ai_message: str,
+        product_info: Dict = None,
+        message_refs: Dict[str, str] = None,
     ) -> Dict[str, bool]:
         """Send restock alert through all enabled notifiers"""
         results = {}
 
         for notifier in self.notifiers:
+            notification_type = notifier.get_notification_type()
+            start = time.time()
             try:
+                notifier.last_message_ref = None
                 success = notifier.send_notification(ai_message, url, product_info)
                 results[notifier.get_notification_type()] = success
+                metrics.NOTIFICATION_LATENCY.observe(
+                    time.time() - start, channel=notification_type
+                )
+                metrics.NOTIFICATIONS.inc(
+                    channel=notification_type,
+                    result="success" if success else "failed",
+                )
+                if message_refs is not None and notifier.last_message_ref:
+                    message_refs[notifier.get_notification_type()] = (
+                        notifier.last_message_ref
+                    )
             except Exception as e:
                 logging.error(
                     f"Error in {notifier.get_notification_type()} notifier: {e}"
                 )
                 results[notifier.get_notification_type()] = False
+                metrics.NOTIFICATIONS.inc(channel=notification_type, result="error")
+
+        return results
+
+    def send_followup_alert(
+        self,
+        url: str,
+        ai_message: str,
+        product_info: Dict = None,
+        message_refs: Dict[str, str] = None,
+    ) -> Dict[str, bool]:
+        """Send the enriched message for an alert that already went out"""
+        results = {}
+        message_refs = message_refs or {}
+
+        for notifier in self.notifiers:
+            if not notifier.supports_followup:
+                continue
+            notification_type = notifier.get_notification_type()
+            try:
+                results[notification_type] = notifier.send_followup(
+                    ai_message, url, product_info, message_refs.get(notification_type)
+                )
+            except Exception as e:
+                logging.error(f"Error in {notification_type} follow-up: {e}")
+                results[notification_type] = False
 
         return results
 
+    def get_notifier(self, notification_type: str) -> Optional[BaseNotifier]:
+        """Get the enabled notifier for a notification type"""
+        for notifier in self.notifiers:
+            if notifier.get_notification_type() == notification_type:
+                return notifier
+        return None
+
     def get_enabled_notifiers(self) -> List[str]:
         """Get list of enabled notifier types"""
         return [notifier.get_notification_type() for notifier in self.notifiers]
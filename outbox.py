@@ -0,0 +1,307 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import metrics
+from config import Config
+from database import DatabaseManager
+from notifiers import BaseNotifier, NotificationManager
+
+
+class NotificationOutbox:
+    """Durable notification queue with retries, backoff and dead-lettering"""
+
+    def __init__(self, db: DatabaseManager, notification_manager: NotificationManager):
+        self.db = db
+        self.notification_manager = notification_manager
+        self.max_attempts = Config.OUTBOX_MAX_ATTEMPTS
+        self.base_backoff = Config.OUTBOX_BASE_BACKOFF
+        self.max_backoff = Config.OUTBOX_MAX_BACKOFF
+        self.poll_interval = Config.OUTBOX_POLL_INTERVAL
+        self.batch_window = Config.NOTIFY_BATCH_WINDOW
+
+        # Channels that are backing off (e.g. after a 429) until the given time
+        self.channel_blocked_until: Dict[str, float] = {}
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enqueue_restock_alert(
+        self,
+        url: str,
+        message: str,
+        product_info: Dict,
+        alert_id: str,
+        detected_at: float = None,
+        stage: str = "alert",
+    ) -> List[int]:
+        """Queue one delivery job per enabled notifier for a restock alert"""
+        job_ids = []
+
+        for notification_type in self.notification_manager.get_enabled_notifiers():
+            job_id = self.db.enqueue_notification(
+                f"{alert_id}:{notification_type}",
+                url,
+                notification_type,
+                message,
+                product_info,
+                detected_at,
+                stage=stage,
+            )
+            if job_id:
+                job_ids.append(job_id)
+
+        if job_ids:
+            self._wakeup.set()
+
+        logging.info(f"📬 Queued {len(job_ids)} notification jobs for {url}")
+        return job_ids
+
+    def enqueue_followup(
+        self,
+        url: str,
+        message: str,
+        product_info: Dict,
+        alert_id: str,
+        detected_at: float = None,
+    ) -> List[int]:
+        """Queue the enriched message for an alert that was sent first"""
+        job_ids = []
+
+        for notifier in self.notification_manager.notifiers:
+            if not notifier.supports_followup:
+                continue
+            notification_type = notifier.get_notification_type()
+            job_id = self.db.enqueue_notification(
+                f"{alert_id}:{notification_type}:enriched",
+                url,
+                notification_type,
+                message,
+                product_info,
+                detected_at,
+                stage="enriched",
+                parent_key=f"{alert_id}:{notification_type}",
+            )
+            if job_id:
+                job_ids.append(job_id)
+
+        if job_ids:
+            self._wakeup.set()
+
+        logging.info(f"📬 Queued {len(job_ids)} follow-up jobs for {url}")
+        return job_ids
+
+    def compute_backoff(self, attempts: int, retry_after: float = None) -> float:
+        """Exponential backoff with jitter, never shorter than Retry-After"""
+        delay = min(self.max_backoff, self.base_backoff * (2 ** max(0, attempts - 1)))
+        delay = delay * random.uniform(0.8, 1.2)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _record_result(
+        self,
+        job: Dict,
+        notifier: BaseNotifier,
+        success: bool,
+        error: str = None,
+        message_ref: str = None,
+    ) -> bool:
+        """Mark a job delivered, schedule a retry, or dead-letter it"""
+        notification_type = job["notification_type"]
+
+        if success:
+            latency_ms = (time.time() - job["detected_at"]) * 1000
+            metrics.NOTIFICATIONS.inc(channel=notification_type, result="success")
+            metrics.NOTIFICATION_LATENCY.observe(
+                latency_ms / 1000, channel=notification_type
+            )
+            self.db.mark_notification_delivered(job["id"], message_ref)
+            self.db.log_notification(
+                job["url"],
+                notification_type,
+                "success",
+                job["message"],
+                stage=job["stage"],
+                latency_ms=latency_ms,
+            )
+            self.channel_blocked_until.pop(notification_type, None)
+            return True
+
+        error = error or "notifier reported failure"
+        attempts = job["attempts"] + 1
+        if attempts >= self.max_attempts:
+            metrics.NOTIFICATIONS.inc(channel=notification_type, result="failed")
+            self.db.dead_letter_notification(job["id"], error)
+            self.db.log_notification(
+                job["url"],
+                notification_type,
+                "failed",
+                job["message"],
+                stage=job["stage"],
+            )
+            logging.error(
+                f"☠️ Dead-lettered {notification_type} job {job['id']} "
+                f"after {attempts} attempts: {error}"
+            )
+            return False
+
+        metrics.NOTIFICATIONS.inc(channel=notification_type, result="retry")
+        retry_after = notifier.retry_after
+        delay = self.compute_backoff(attempts, retry_after)
+        next_attempt_at = time.time() + delay
+        self.db.schedule_notification_retry(job["id"], next_attempt_at, error)
+
+        # A rate limit applies to the whole channel, not just this job
+        if retry_after is not None:
+            self.channel_blocked_until[notification_type] = next_attempt_at
+
+        logging.warning(
+            f"🔁 {notification_type} job {job['id']} failed "
+            f"(attempt {attempts}/{self.max_attempts}), retrying in {delay:.1f}s"
+        )
+        return False
+
+    def deliver_jobs(self, notification_type: str, jobs: List[Dict]) -> int:
+        """Deliver due jobs for one channel, merging them when supported"""
+        notifier = self.notification_manager.get_notifier(notification_type)
+
+        if notifier is None:
+            error = f"{notification_type} notifier is not enabled"
+            for job in jobs:
+                self.db.dead_letter_notification(job["id"], error)
+                logging.error(f"☠️ Dead-lettered job {job['id']}: {error}")
+            return 0
+
+        followups = [job for job in jobs if job["stage"] == "enriched"]
+        alerts = [job for job in jobs if job["stage"] != "enriched"]
+
+        refs: List[Optional[str]] = [None] * len(alerts)
+        if len(alerts) > 1 and notifier.supports_batching:
+            try:
+                results = notifier.send_batch(
+                    [
+                        {
+                            "message": job["message"],
+                            "url": job["url"],
+                            "product_info": job["product_info"],
+                        }
+                        for job in alerts
+                    ]
+                )
+                errors = [None] * len(alerts)
+            except Exception as e:
+                results = [False] * len(alerts)
+                errors = [str(e)] * len(alerts)
+        else:
+            results, errors = [], []
+            for index, job in enumerate(alerts):
+                try:
+                    notifier.last_message_ref = None
+                    results.append(
+                        notifier.send_notification(
+                            job["message"], job["url"], job["product_info"]
+                        )
+                    )
+                    errors.append(None)
+                    refs[index] = notifier.last_message_ref
+                except Exception as e:
+                    results.append(False)
+                    errors.append(str(e))
+
+        delivered = 0
+        for job, success, error, ref in zip(alerts, results, errors, refs):
+            if self._record_result(job, notifier, success, error, ref):
+                delivered += 1
+
+        for job in followups:
+            if self._deliver_followup(job, notifier):
+                delivered += 1
+
+        return delivered
+
+    def _deliver_followup(self, job: Dict, notifier: BaseNotifier) -> bool:
+        """Edit the original message if possible, otherwise send a follow-up"""
+        parent = self.db.get_notification_job(job["parent_key"])
+
+        # The enriched text must not overtake the first alert
+        if parent and parent["status"] == "pending":
+            self.db.defer_notification(job["id"], parent["next_attempt_at"] + 1)
+            return False
+
+        message_ref = parent["message_ref"] if parent else None
+        try:
+            success = notifier.send_followup(
+                job["message"], job["url"], job["product_info"], message_ref
+            )
+            error = None
+        except Exception as e:
+            success = False
+            error = str(e)
+
+        return self._record_result(job, notifier, success, error)
+
+    def run_pending(self) -> int:
+        """Deliver all due jobs once and return how many were delivered"""
+        now = time.time()
+        jobs_by_channel: Dict[str, List[Dict]] = {}
+
+        for job in self.db.get_due_notifications():
+            notification_type = job["notification_type"]
+            blocked_until = self.channel_blocked_until.get(notification_type)
+            if blocked_until and blocked_until > now:
+                self.db.defer_notification(job["id"], blocked_until)
+                continue
+            jobs_by_channel.setdefault(notification_type, []).append(job)
+
+        delivered = 0
+        for notification_type, jobs in jobs_by_channel.items():
+            delivered += self.deliver_jobs(notification_type, jobs)
+        return delivered
+
+    def _seconds_until_next_job(self) -> float:
+        """How long the worker may sleep before a job becomes due"""
+        next_due = self.db.get_next_notification_due()
+        if next_due is None:
+            return self.poll_interval
+        return min(self.poll_interval, max(0.0, next_due - time.time()))
+
+    def _run(self):
+        """Worker loop"""
+        logging.info("📮 Notification outbox worker started")
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+                timeout = self._seconds_until_next_job()
+            except Exception as e:
+                logging.error(f"Notification outbox error: {e}")
+                timeout = self.poll_interval
+
+            woken = self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+            # Give a burst of restocks a moment to arrive so they share a message
+            if woken and self.batch_window > 0:
+                self._stop.wait(self.batch_window)
+        logging.info("📮 Notification outbox worker stopped")
+
+    def start(self):
+        """Start the background delivery worker"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="notification-outbox", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Stop the background delivery worker"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
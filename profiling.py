@@ -0,0 +1,330 @@
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Functions called out in every summary, since cycle slowdowns usually
+# show up in one of them first
+HOT_PATHS = ("check_stock", "extract_product_info", "detect", "log_stock_event")
+
+# Leaf frames of threads that are idle rather than working
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "socketserver.py")
+
+
+class CycleProfiler(ABC):
+    """Profiles monitoring cycles and writes the results to ``output_dir``
+
+    ``cycles`` limits profiling to the first N cycles (0 profiles every
+    cycle); the monitor keeps running normally afterwards.
+    """
+
+    mode = "base"
+
+    def __init__(self, output_dir: str, cycles: int = 3, trace_memory: bool = False):
+        self.output_dir = output_dir
+        self.cycles = cycles
+        self.trace_memory = trace_memory
+        self.cycle_number = 0
+        self._memory_snapshot: Optional[tracemalloc.Snapshot] = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    @property
+    def active(self) -> bool:
+        return self.cycles == 0 or self.cycle_number < self.cycles
+
+    @contextmanager
+    def cycle(self) -> Iterator[None]:
+        """Profile one monitoring cycle, if still within the cycle budget"""
+        if not self.active:
+            yield
+            return
+
+        self.cycle_number += 1
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._memory_snapshot = tracemalloc.take_snapshot()
+
+        self.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stop()
+            elapsed = time.perf_counter() - start
+            try:
+                written = self.write()
+                if self.trace_memory:
+                    written.append(self.write_memory_diff())
+                logging.info(
+                    f"🔬 Profiled cycle {self.cycle_number} ({elapsed:.1f}s): "
+                    f"{', '.join(written)}"
+                )
+            except Exception as e:
+                logging.error(f"Failed to write profile: {e}")
+
+            if not self.active:
+                self.close()
+                logging.info(f"🔬 Profiling finished after {self.cycle_number} cycles")
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    @abstractmethod
+    def start(self):
+        pass
+
+    @abstractmethod
+    def stop(self):
+        pass
+
+    @abstractmethod
+    def write(self) -> List[str]:
+        """Write this cycle's results, returning the file paths"""
+        pass
+
+    def wrap(self, fn: Callable) -> Callable:
+        """Wrap work the cycle runs on other threads (a no-op by default)"""
+        return fn
+
+    def write_memory_diff(self, limit: int = 25) -> str:
+        """Allocation growth by source line since the previous cycle"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        current, peak = tracemalloc.get_traced_memory()
+
+        lines = [
+            f"Cycle {self.cycle_number}: {current / 1024:.0f} KiB traced, "
+            f"peak {peak / 1024:.0f} KiB",
+            "",
+            f"Top {limit} allocation changes since the previous cycle:",
+        ]
+        for stat in snapshot.compare_to(self._memory_snapshot, "lineno")[:limit]:
+            lines.append(f"  {stat}")
+        self._memory_snapshot = snapshot
+
+        path = self.path(f"memory-cycle{self.cycle_number}.txt")
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+    def close(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._memory_snapshot = None
+
+
+class CProfileProfiler(CycleProfiler):
+    """Deterministic profile of a cycle with cProfile
+
+    Covers the monitoring thread and every check wrapped with ``wrap``.
+    Since Python 3.12 cProfile hooks every thread at once and only one
+    profiler may be active, so workers are then covered by the cycle's
+    profile instead of their own. Writes a ``.pstats`` file per cycle
+    (for snakeviz, gprof2dot or flameprof) and a text summary of the hot
+    paths.
+    """
+
+    mode = "cprofile"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._profile: Optional[cProfile.Profile] = None
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._profiling = False
+        self._main_thread: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._thread_profiles = []
+        self._main_thread = threading.get_ident()
+        self._profiling = True
+        self._profile = self._enable()
+        if self._profile is None:
+            logging.warning(
+                "🔬 cProfile couldn't start (another profiler or debugger is "
+                "active); this cycle only covers worker threads"
+            )
+
+    @staticmethod
+    def _enable() -> Optional[cProfile.Profile]:
+        """A running profile, or None if another profiling tool is active"""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None
+        return profile
+
+    def wrap(self, fn: Callable) -> Callable:
+        """cProfile only sees its own thread, so profile each worker call too"""
+
+        @functools.wraps(fn)
+        def profiled(*args, **kwargs):
+            if not self._profiling or threading.get_ident() == self._main_thread:
+                return fn(*args, **kwargs)
+            profile = self._enable()
+            if profile is None:
+                # 3.12+: the cycle's profile already sees this thread
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    self._thread_profiles.append(profile)
+
+        return profiled
+
+    def stop(self):
+        if self._profile is not None:
+            self._profile.disable()
+        self._profiling = False
+
+    def write(self) -> List[str]:
+        profiles = [self._profile] if self._profile is not None else []
+        profiles += self._thread_profiles
+        if not profiles:
+            return []
+
+        out = io.StringIO()
+        stats = pstats.Stats(profiles[0], stream=out)
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats_path = self.path(f"cycle{self.cycle_number}.pstats")
+        stats.dump_stats(stats_path)
+
+        stats.sort_stats("cumulative")
+        out.write("Hot paths:\n")
+        stats.print_stats("|".join(rf"\({name}\)" for name in HOT_PATHS))
+        out.write("\nTop functions by cumulative time:\n")
+        stats.print_stats(25)
+
+        summary_path = self.path(f"cycle{self.cycle_number}-summary.txt")
+        with open(summary_path, "w") as f:
+            f.write(out.getvalue())
+        return [stats_path, summary_path]
+
+
+class SamplingProfiler(CycleProfiler):
+    """Low-overhead statistical profiler covering every thread
+
+    A background thread records the Python stack of each busy thread every
+    ``interval`` seconds. Stacks accumulate across cycles into a collapsed
+    stacks file for flamegraph.pl or speedscope.
+    """
+
+    mode = "sampling"
+
+    def __init__(self, *args, interval: float = 0.01, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def sample(self):
+        """Record the current stack of every busy thread except this one"""
+        me = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == me or os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def function_counts(self) -> Dict[str, Dict[str, int]]:
+        """Inclusive (anywhere on the stack) and self (leaf) samples per function"""
+        counts: Dict[str, Dict[str, int]] = {}
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            for label in set(frames):
+                counts.setdefault(label, {"total": 0, "self": 0})["total"] += count
+            counts[frames[-1]]["self"] += count
+        return counts
+
+    def write(self) -> List[str]:
+        stacks_path = self.path("profile.collapsed")
+        with open(stacks_path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        counts = self.function_counts()
+        total = self.samples or 1
+
+        def line(label: str, entry: Dict[str, int]) -> str:
+            return (
+                f"  {entry['total'] / total:6.1%} total  "
+                f"{entry['self'] / total:6.1%} self  {label}"
+            )
+
+        lines = [
+            f"{self.samples} samples over {self.cycle_number} cycles "
+            f"every {self.interval * 1000:.0f}ms",
+            "",
+            "Hot paths:",
+        ]
+        for label, entry in sorted(counts.items(), key=lambda i: -i[1]["total"]):
+            if label.split(" ", 1)[0] in HOT_PATHS:
+                lines.append(line(label, entry))
+        lines += ["", "Top functions by self time:"]
+        for label, entry in sorted(counts.items(), key=lambda i: -i[1]["self"])[:25]:
+            lines.append(line(label, entry))
+
+        summary_path = self.path("summary.txt")
+        with open(summary_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return [stacks_path, summary_path]
+
+
+PROFILERS = {
+    CProfileProfiler.mode: CProfileProfiler,
+    SamplingProfiler.mode: SamplingProfiler,
+}
+
+
+def create_profiler(
+    mode: str,
+    output_dir: str,
+    cycles: int = 3,
+    trace_memory: bool = False,
+    interval: float = 0.01,
+) -> CycleProfiler:
+    """Build the profiler for ``main.py monitor --profile=<mode>``"""
+    if mode == SamplingProfiler.mode:
+        return SamplingProfiler(output_dir, cycles, trace_memory, interval=interval)
+    return PROFILERS[mode](output_dir, cycles, trace_memory)
@@ -0,0 +1,414 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds"""
+    value = headers.get("Retry-After") or headers.get("X-RateLimit-Reset-After")
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - datetime.now().timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedError(Exception):
+    """Raised when a destination cannot be used until a rate limit resets"""
+
+    def __init__(self, destination: str, retry_after: float):
+        super().__init__(
+            f"Rate limited by {destination}, retry after {retry_after:.1f}s"
+        )
+        self.destination = destination
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket that can be steered by rate-limit headers"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate  # tokens per second
+        self.max_rate = rate  # headers can slow the bucket down, never speed it up
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available, otherwise return seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Block until a token is available or the timeout would be exceeded"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def seconds_until_available(self) -> float:
+        """Seconds until the next token can be taken"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.tokens >= 1:
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def block_for(self, seconds: float):
+        """Drain the bucket and refuse tokens for the given number of seconds"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = 0.0
+            self.updated = now
+            self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def update_from_headers(self, headers):
+        """Sync the bucket with X-RateLimit-* response headers"""
+        limit = headers.get("X-RateLimit-Limit")
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+
+        try:
+            if limit is not None:
+                limit = float(limit)
+                if limit > 0:
+                    with self._lock:
+                        self.capacity = limit
+
+            if remaining is not None:
+                remaining = float(remaining)
+                if remaining <= 0 and reset_after is not None:
+                    self.block_for(float(reset_after))
+                else:
+                    with self._lock:
+                        self.tokens = min(self.tokens, remaining)
+                        # Reset-After is the time left in the window, not its
+                        # length: spread what's left of the window over it
+                        if reset_after is not None and float(reset_after) > 0:
+                            self.rate = min(
+                                self.max_rate, remaining / float(reset_after)
+                            )
+        except ValueError:
+            pass
+
+
+class HostUnavailableError(RateLimitedError):
+    """Raised instead of waiting when a host can't be checked this cycle"""
+
+    def __init__(self, host: str, retry_after: float, reason: str):
+        super().__init__(host, retry_after)
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return (
+            f"{self.destination} unavailable ({self.reason}), "
+            f"retry after {self.retry_after:.1f}s"
+        )
+
+
+class CircuitBreaker:
+    """Stops requests to a host after repeated failures
+
+    After ``threshold`` consecutive failures the circuit opens for
+    ``cooldown`` seconds. Then one probe request is let through: success
+    closes the circuit, failure reopens it for twice as long (up to
+    ``max_cooldown``). A probe that never reports back is given up on after
+    ``probe_timeout`` seconds and another one is allowed.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        threshold: int,
+        cooldown: float,
+        max_cooldown: float,
+        probe_timeout: float = 60,
+    ):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_timeout = probe_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_until = 0.0
+        self.probe_until = 0.0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def _blocked_for(self, now: float) -> float:
+        if self.state == self.OPEN:
+            return max(0.0, self.opened_until - now)
+        if self.state == self.HALF_OPEN:
+            return max(0.0, self.probe_until - now)
+        return 0.0
+
+    def check(self) -> float:
+        """0 if a request (or the probe) may go ahead, otherwise seconds to wait
+
+        Doesn't claim the probe; call ``start_request`` once the request is
+        really about to be sent.
+        """
+        with self._lock:
+            return self._blocked_for(time.monotonic())
+
+    def start_request(self) -> bool:
+        """Claim the right to send a request, taking the probe if one is due"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self._blocked_for(now) > 0:
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_until = now + self.probe_timeout
+            return True
+
+    def cancel_probe(self, retry_after: float):
+        """The probe wasn't sent after all: stay open for ``retry_after``"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self.opened_until = time.monotonic() + retry_after
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+
+    def record_failure(self) -> bool:
+        """Count a failure, returning True if this opened the circuit"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            elif self.failures < self.threshold:
+                return False
+            self.state = self.OPEN
+            self.opened_until = time.monotonic() + self.cooldown
+            self.times_opened += 1
+            return True
+
+
+class HostPolicy:
+    """Token bucket and circuit breaker for one host, with AIMD rate control
+
+    The rate grows additively back towards ``max_rate`` after each success
+    and is halved on every 429/503 or server error.
+    """
+
+    INCREASE = 0.1  # fraction of max_rate regained per success
+    DECREASE = 0.5
+
+    def __init__(
+        self,
+        host: str,
+        rate: float,
+        burst: float,
+        min_rate: float,
+        breaker: CircuitBreaker,
+    ):
+        self.host = host
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker
+        self.retry_after_until = 0.0
+        self.throttled = 0
+        self.errors = 0
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def delay_reason(self) -> str:
+        """Why a request to this host would have to wait right now"""
+        if time.monotonic() < self.retry_after_until:
+            return "retry-after"
+        if self.rate < self.max_rate:
+            return "backoff"
+        return "rate limit"
+
+    def on_success(self):
+        self.breaker.record_success()
+        with self.bucket._lock:
+            self.bucket.rate = min(
+                self.max_rate, self.bucket.rate + self.max_rate * self.INCREASE
+            )
+
+    def on_throttle(self, retry_after: Optional[float]):
+        self.throttled += 1
+        with self.bucket._lock:
+            self.bucket.rate = max(self.min_rate, self.bucket.rate * self.DECREASE)
+        wait = retry_after if retry_after is not None else 1 / self.bucket.rate
+        if retry_after is not None:
+            self.retry_after_until = time.monotonic() + retry_after
+        self.bucket.block_for(wait)
+
+    def on_failure(self) -> bool:
+        self.errors += 1
+        return self.breaker.record_failure()
+
+
+class HostRateLimiter:
+    """Per-host politeness: token buckets, AIMD backoff and circuit breakers
+
+    ``acquire`` blocks until a request to the URL's host is allowed and
+    says how long it waited and why; ``record`` feeds the response back.
+    Waits longer than ``max_wait`` (and open circuits) raise
+    HostUnavailableError so one struggling host can't stall a whole cycle.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 1,
+        min_rate: float = 0.05,
+        max_wait: float = 60,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 60,
+        breaker_max_cooldown: float = 900,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_wait = max_wait
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.breaker_max_cooldown = breaker_max_cooldown
+        self._hosts: Dict[str, HostPolicy] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return (urlparse(url).hostname or "").lower()
+
+    def policy(self, url: str) -> HostPolicy:
+        host = self.host_of(url)
+        with self._lock:
+            policy = self._hosts.get(host)
+            if policy is None:
+                policy = self._hosts[host] = HostPolicy(
+                    host,
+                    self.rate,
+                    self.burst,
+                    self.min_rate,
+                    CircuitBreaker(
+                        self.breaker_threshold,
+                        self.breaker_cooldown,
+                        self.breaker_max_cooldown,
+                    ),
+                )
+            return policy
+
+    def acquire(self, url: str) -> Tuple[float, Optional[str]]:
+        """Wait for a request slot, returning (seconds waited, reason or None)"""
+        policy = self.policy(url)
+        blocked = policy.breaker.check()
+        if blocked > 0:
+            raise HostUnavailableError(policy.host, blocked, "circuit open")
+
+        # The bucket (and any Retry-After) comes first: a half-open breaker
+        # only hands out its probe to a request that will really be sent
+        waited, reason = 0.0, None
+        while True:
+            wait = policy.bucket.try_acquire()
+            if wait <= 0:
+                break
+            reason = reason or policy.delay_reason()
+            if waited + wait > self.max_wait:
+                raise HostUnavailableError(policy.host, wait, reason)
+            time.sleep(wait)
+            waited += wait
+
+        if not policy.breaker.start_request():
+            # Another request took the probe while this one waited
+            raise HostUnavailableError(
+                policy.host, policy.breaker.check(), "circuit open"
+            )
+        return waited, reason
+
+    def try_acquire(self, url: str) -> bool:
+        """Take a slot for an optional extra request (a hedge) without waiting
+
+        Only while the circuit is closed, so a half-open host still gets
+        exactly one probe. The request must be reported with ``record``.
+        """
+        policy = self.policy(url)
+        if policy.breaker.state != CircuitBreaker.CLOSED:
+            return False
+        return policy.bucket.try_acquire() <= 0
+
+    def cancel(self, url: str, retry_after: float = 0):
+        """A request that got a slot wasn't sent, so it can't act as the probe"""
+        self.policy(url).breaker.cancel_probe(retry_after)
+
+    def record(self, url: str, status_code: int = None, headers=None):
+        """Adapt to a response (or to a connection error when no status)"""
+        policy = self.policy(url)
+        if status_code is None or status_code >= 500 or status_code == 429:
+            if status_code in (429, 503):
+                policy.on_throttle(parse_retry_after(headers or {}))
+            elif status_code is not None:
+                policy.on_throttle(None)
+            if policy.on_failure():
+                logging.warning(
+                    f"🔌 Circuit opened for {policy.host} after "
+                    f"{policy.breaker.failures} failures, pausing "
+                    f"{policy.breaker.cooldown:.0f}s"
+                )
+            return
+        policy.on_success()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Current rate, breaker state and throttle counts per host"""
+        with self._lock:
+            policies = list(self._hosts.values())
+        return {
+            policy.host: {
+                "rate": round(policy.rate, 4),
+                "max_rate": policy.max_rate,
+                "circuit": policy.breaker.state,
+                "circuit_opened": policy.breaker.times_opened,
+                "throttled": policy.throttled,
+                "errors": policy.errors,
+            }
+            for policy in policies
+        }
@@ -0,0 +1,158 @@
+"""
+Compact records for per-check results and per-URL monitor state
+
+ProductInfo and CheckResult are slotted dataclasses, so each instance is a
+small fixed-size object with no ``__dict__``. UrlStateTable keeps the
+monitor's per-URL state in flat arrays indexed by an interned URL id
+instead of one Python object per URL, so tracking tens of thousands of
+URLs adds almost nothing for the garbage collector to scan.
+"""
+
+import sys
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Stock flags stored per URL
+UNSEEN = 0
+OUT_OF_STOCK = 1
+IN_STOCK = 2
+
+
+@dataclass(slots=True)
+class ProductInfo:
+    """Product details extracted from a page"""
+
+    name: Optional[str] = None
+    price: Optional[str] = None
+    image_url: Optional[str] = None
+    availability: Optional[str] = None
+    last_updated: float = field(default_factory=time.time)  # epoch seconds
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "price": self.price,
+            "image_url": self.image_url,
+            "availability": self.availability,
+            # Naive UTC ISO string, as the dashboard and stored events expect
+            "last_updated": datetime.fromtimestamp(self.last_updated, timezone.utc)
+            .replace(tzinfo=None)
+            .isoformat(),
+        }
+
+
+@dataclass(slots=True)
+class CheckResult:
+    """Outcome of one stock check (``in_stock`` is None when it failed)"""
+
+    url: str
+    in_stock: Optional[bool]
+    product_info: ProductInfo
+    checked_at: float = field(default_factory=time.time)
+    error: Optional[str] = None
+
+
+class UrlStateTable:
+    """Last known stock state per URL, stored column-wise
+
+    Each URL gets a small integer id on first sight; its stock flag lives in
+    a bytearray and its timestamps in float arrays at that index.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._urls: List[str] = []
+        self._flags = bytearray()
+        self._checked_at = array("d")
+        self._changed_at = array("d")
+        self._failures = array("I")
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._ids
+
+    def id_for(self, url: str) -> int:
+        """The URL's id, allocating a row for it on first use"""
+        url_id = self._ids.get(url)
+        if url_id is not None:
+            return url_id
+        with self._lock:
+            url_id = self._ids.get(url)
+            if url_id is None:
+                url_id = len(self._urls)
+                self._urls.append(sys.intern(url))
+                self._flags.append(UNSEEN)
+                self._checked_at.append(0.0)
+                self._changed_at.append(0.0)
+                self._failures.append(0)
+                self._ids[self._urls[url_id]] = url_id
+            return url_id
+
+    def get(self, url: str, default: Optional[bool] = None) -> Optional[bool]:
+        """Last known stock state, or ``default`` if never checked successfully"""
+        url_id = self._ids.get(url)
+        if url_id is None or self._flags[url_id] == UNSEEN:
+            return default
+        return self._flags[url_id] == IN_STOCK
+
+    def record(self, result: CheckResult) -> Optional[bool]:
+        """Store a check result, returning the previous known state
+
+        Failed checks (``in_stock`` None) only count a failure; the last
+        known state is kept.
+        """
+        url_id = self.id_for(result.url)
+        with self._lock:
+            flag = self._flags[url_id]
+            previous = None if flag == UNSEEN else flag == IN_STOCK
+            self._checked_at[url_id] = result.checked_at
+            if result.in_stock is None:
+                self._failures[url_id] += 1
+                return previous
+
+            self._failures[url_id] = 0
+            if result.in_stock != previous:
+                self._flags[url_id] = IN_STOCK if result.in_stock else OUT_OF_STOCK
+                self._changed_at[url_id] = result.checked_at
+            return previous
+
+    def state(self, url: str) -> Optional[Dict]:
+        """Everything known about one URL, for status pages and debugging"""
+        url_id = self._ids.get(url)
+        if url_id is None:
+            return None
+        return {
+            "in_stock": self.get(url),
+            "checked_at": self._checked_at[url_id] or None,
+            "changed_at": self._changed_at[url_id] or None,
+            "failures": self._failures[url_id],
+        }
+
+    def items(self) -> Iterator[Tuple[str, Optional[bool]]]:
+        """(url, last known state) for every tracked URL"""
+        for url in list(self._urls):
+            yield url, self.get(url)
+
+    def counts(self) -> Dict[str, int]:
+        """Tracked URLs by last known state"""
+        flags = bytes(self._flags)
+        return {
+            "in_stock": flags.count(IN_STOCK),
+            "out_of_stock": flags.count(OUT_OF_STOCK),
+            "unseen": flags.count(UNSEEN),
+        }
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the table, URL strings included"""
+        size = sys.getsizeof(self._ids) + sys.getsizeof(self._urls)
+        size += sum(sys.getsizeof(url) for url in self._urls)
+        for column in (self._flags, self._checked_at, self._changed_at, self._failures):
+            size += sys.getsizeof(column)
+        return size
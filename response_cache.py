@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict
+from urllib.parse import urlencode
+
+import metrics
+from config import Config
+from database import DatabaseManager
+
+
+class ResponseCache:
+    """Caches API response bodies until the monitored data changes
+
+    Entries are tagged with a generation number kept in SQLite. The monitor
+    bumps it after each cycle and on every stock flip, which invalidates all
+    entries in every dashboard process at once. A TTL backs this up for
+    data that changes without a bump (e.g. outbox retries).
+    """
+
+    NAME = "api"
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self.backend = Config.RESPONSE_CACHE_BACKEND
+        self.ttl = Config.RESPONSE_CACHE_TTL
+        self.max_entries = Config.RESPONSE_CACHE_MAX_ENTRIES
+        self.check_interval = Config.RESPONSE_CACHE_CHECK_INTERVAL
+
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._generation = 0
+        self._generation_checked = 0.0
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(endpoint: str, params: Dict = None) -> str:
+        """Cache key for an endpoint and its (order-independent) parameters"""
+        if not params:
+            return endpoint
+        return f"{endpoint}?{urlencode(sorted(params.items()))}"
+
+    def generation(self) -> int:
+        """Current generation, re-read from the database at most once per interval"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._generation_checked < self.check_interval:
+                return self._generation
+
+        generation = self.db.get_cache_generation(self.NAME)
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+            self._generation_checked = now
+        return generation
+
+    def _count(self, endpoint: str, outcome: str):
+        with self._lock:
+            stats = self._stats.setdefault(
+                endpoint, {"hits": 0, "shared_hits": 0, "misses": 0}
+            )
+            stats[outcome] += 1
+        metrics.RESPONSE_CACHE_LOOKUPS.inc(endpoint=endpoint, outcome=outcome)
+
+    def get(
+        self,
+        endpoint: str,
+        params: Dict,
+        compute: Callable[[], object],
+        encode: Callable[[object], bytes] = None,
+    ) -> Dict:
+        """Get the cached entry for a request, computing it on a miss
+
+        The entry holds the ``body`` bytes (JSON unless another encoder is
+        given) and an ``etag`` derived from them, so it changes whenever the
+        body does, even within a generation (e.g. after the TTL).
+        """
+        key = self.make_key(endpoint, params)
+        generation = self.generation()
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            fresh = (
+                entry is not None
+                and entry["generation"] == generation
+                and now - entry["stored_at"] < self.ttl
+            )
+            if fresh:
+                self._entries.move_to_end(key)
+
+        if fresh:
+            self._count(endpoint, "hits")
+            return entry
+
+        body = None
+        if self.backend == "sqlite":
+            body = self.db.get_cached_response(key, generation, self.ttl)
+
+        if body is not None:
+            self._count(endpoint, "shared_hits")
+        else:
+            self._count(endpoint, "misses")
+            value = compute()
+            body = encode(value) if encode else json.dumps(value).encode("utf-8")
+            if self.backend == "sqlite":
+                self.db.save_cached_response(key, generation, body)
+
+        entry = {
+            "body": body,
+            "etag": hashlib.md5(body).hexdigest(),
+            "generation": generation,
+            "stored_at": now,
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_fragment(self, name: str, params: Dict, render: Callable[[], str]) -> str:
+        """Get a rendered HTML fragment, rendering it on a miss"""
+        entry = self.get(
+            f"fragment:{name}", params, render, encode=lambda html: html.encode("utf-8")
+        )
+        return entry["body"].decode("utf-8")
+
+    def invalidate(self, reason: str = None):
+        """Bump the generation so every process drops its cached responses"""
+        generation = self.db.bump_cache_generation(self.NAME)
+        with self._lock:
+            self._entries.clear()
+            self._generation = generation
+            self._generation_checked = time.monotonic()
+        logging.debug(f"Response cache invalidated ({reason or 'manual'})")
+
+    def stats(self) -> Dict:
+        """Hit/miss counts per endpoint and overall hit ratio for this process"""
+        with self._lock:
+            endpoints = {}
+            hits = misses = 0
+            for endpoint, counts in self._stats.items():
+                endpoint_hits = counts["hits"] + counts["shared_hits"]
+                endpoint_total = endpoint_hits + counts["misses"]
+                endpoints[endpoint] = {
+                    **counts,
+                    "hit_ratio": endpoint_hits / endpoint_total,
+                }
+                hits += endpoint_hits
+                misses += counts["misses"]
+
+            return {
+                "backend": self.backend,
+                "generation": self._generation,
+                "entries": len(self._entries),
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+                "endpoints": endpoints,
+            }
@@ -0,0 +1,93 @@
+import pytest
+
+from ai_messages import AIMessageBatcher, AIMessageService
+from records import ProductInfo
+
+
+class FakeDB:
+    def __init__(self):
+        self.rows = {}
+        self.reads = 0
+
+    def get_ai_message(self, url):
+        self.reads += 1
+        return self.rows.get(url)
+
+    def save_ai_message(self, url, fingerprint, message, expires_at):
+        self.rows[url] = {
+            "url": url,
+            "fingerprint": fingerprint,
+            "message": message,
+            "expires_at": expires_at,
+        }
+
+    def delete_ai_message(self, url):
+        self.rows.pop(url, None)
+
+
+def test_memory_cache_is_bounded_and_falls_back_to_db():
+    db = FakeDB()
+    service = AIMessageService(db)
+    service.max_entries = 10
+    info = ProductInfo("LABUBU", "$19.99")
+    fingerprint = service.fingerprint(info)
+
+    for i in range(100):
+        service._store(f"https://a.test/{i}", fingerprint, f"message {i}")
+    assert len(service._entries) == 10
+
+    # Evicted rows are read back from the database
+    assert service.get_cached("https://a.test/0", info) == "message 0"
+    assert db.reads == 1
+    assert service.get_cached("https://a.test/0", info) == "message 0"
+    assert db.reads == 1
+    assert len(service._entries) == 10
+
+
+class CountingService(AIMessageService):
+    def __init__(self, fail_batch: bool = True, fail_single: bool = False):
+        super().__init__(FakeDB())
+        self.fail_batch = fail_batch
+        self.fail_single = fail_single
+        self.calls = []
+
+    def generate(self, url, product_info):
+        self.calls.append(("generate", url))
+        if self.fail_single:
+            raise RuntimeError("API down")
+        return f"message for {url}"
+
+    def generate_batch(self, items):
+        if len(items) == 1:
+            return super().generate_batch(items)
+        self.calls.append(("batch", len(items)))
+        if self.fail_batch:
+            raise RuntimeError("API down")
+        return {url: f"batched {url}" for url, _ in items}
+
+
+def test_failed_single_item_batch_is_not_retried():
+    service = CountingService(fail_single=True)
+    batcher = AIMessageBatcher(service, window=60, max_size=20)
+    future = batcher.submit("https://a.test/1", ProductInfo("LABUBU"))
+    batcher.flush()
+
+    with pytest.raises(RuntimeError):
+        future.result(timeout=1)
+    assert service.calls == [("generate", "https://a.test/1")]
+
+
+def test_failed_batch_falls_back_to_per_item_calls():
+    service = CountingService()
+    batcher = AIMessageBatcher(service, window=60, max_size=20)
+    futures = [
+        batcher.submit(f"https://a.test/{i}", ProductInfo("LABUBU")) for i in range(2)
+    ]
+    batcher.flush()
+
+    assert [f.result(timeout=1) for f in futures] == [
+        "message for https://a.test/0",
+        "message for https://a.test/1",
+    ]
+    assert service.calls[0] == ("batch", 2)
+    assert len(service.calls) == 3
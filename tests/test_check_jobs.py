@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+import web_dashboard
+from check_jobs import CheckJobManager
+
+URL_1 = "https://www.popmart.com/us/products/1"
+URL_2 = "https://www.popmart.com/us/products/2"
+
+
+def wait_for(jobs, job_id, status="done", timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}")
+
+
+@pytest.fixture
+def jobs(db):
+    jobs = CheckJobManager(db)
+    yield jobs
+    jobs.shutdown()
+
+
+def test_repeat_requests_share_the_active_job(jobs):
+    release = threading.Event()
+    calls = []
+
+    def check():
+        calls.append(1)
+        release.wait(5)
+        return {"in_stock": True}
+
+    first, created = jobs.submit("check", URL_1, check)
+    again, created_again = jobs.submit("check", URL_1, check)
+    other_kind, _ = jobs.submit("screenshot", URL_1, lambda: {})
+    other_url, _ = jobs.submit("check", URL_2, lambda: {})
+
+    assert created and not created_again
+    assert again["id"] == first["id"]
+    assert other_kind["id"] != first["id"]
+    assert other_url["id"] != first["id"]
+
+    release.set()
+    assert wait_for(jobs, first["id"])["result"] == {"in_stock": True}
+    assert calls == [1]
+
+    # Once finished, a new request starts a new job
+    later, created_later = jobs.submit("check", URL_1, check)
+    assert created_later and later["id"] != first["id"]
+
+
+def test_failed_job_records_the_error(jobs):
+    def check():
+        raise RuntimeError("page blew up")
+
+    job, _ = jobs.submit("check", URL_1, check)
+
+    assert wait_for(jobs, job["id"], "failed")["error"] == "page blew up"
+
+
+def test_finished_job_is_reported(db):
+    finished = []
+    jobs = CheckJobManager(db, on_finished=finished.append)
+
+    job, _ = jobs.submit("check", URL_1, lambda: {"in_stock": False})
+    wait_for(jobs, job["id"])
+    deadline = time.monotonic() + 5
+    while not finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    jobs.shutdown()
+
+    assert finished[0]["id"] == job["id"]
+
+
+def test_test_check_uses_the_database_id(db, monkeypatch):
+    db.upsert_monitor_urls([{"url": URL_1}, {"url": URL_2}])
+    first, second = db.get_monitor_urls()
+    db.update_monitor_url(first["id"], is_active=False)
+
+    checked = []
+    monkeypatch.setattr(
+        web_dashboard,
+        "run_test_check",
+        lambda url: checked.append(url) or {"url": url},
+    )
+    monkeypatch.setattr(
+        web_dashboard, "_components", {"db": db, "check_jobs": CheckJobManager(db)}
+    )
+    client = web_dashboard.app.test_client()
+
+    # Index 0 of the active list would now be URL_2
+    response = client.post(f"/api/test_check/{first['id']}")
+    assert response.status_code == 202
+    job = wait_for(web_dashboard.get_check_jobs(), response.get_json()["job_id"])
+    assert job["url"] == URL_1
+    assert checked == [URL_1]
+
+    assert client.post("/api/test_check/9999").status_code == 404
+    assert client.post("/api/test_screenshot/9999").status_code == 404
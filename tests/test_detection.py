@@ -0,0 +1,73 @@
+import json
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+from config import Config
+from detection import HeuristicDetector, StrictDetector, get_detector
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "benchmarks",
+    "fixtures",
+)
+
+with open(os.path.join(FIXTURES_DIR, "labels.json")) as f:
+    LABELS = {
+        name: expected
+        for name, expected in json.load(f).items()
+        if os.path.exists(os.path.join(FIXTURES_DIR, f"{name}.html"))
+    }
+
+
+def load(name: str) -> BeautifulSoup:
+    with open(os.path.join(FIXTURES_DIR, f"{name}.html"), encoding="utf-8") as f:
+        return BeautifulSoup(f.read(), "html.parser")
+
+
+def parse(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, "html.parser")
+
+
+@pytest.mark.parametrize("name", sorted(LABELS))
+def test_strict_detector_matches_every_labelled_page(name):
+    assert StrictDetector().detect(load(name), None) is LABELS[name]
+
+
+@pytest.mark.parametrize(
+    "name", sorted(n for n, expected in LABELS.items() if expected)
+)
+def test_heuristic_detector_finds_every_in_stock_page(name):
+    assert HeuristicDetector().detect(load(name), None)
+
+
+def test_strict_detector_ignores_controls_outside_the_product():
+    html = """
+        <nav><a href="/cart">Add to cart</a></nav>
+        <main class="product-detail">
+            <button disabled>Add to bag</button>
+            <button>Notify me when available</button>
+            <div class="buttons">Add to bag and check out in one click today, with free
+                shipping on every order over fifty dollars</div>
+        </main>
+    """
+
+    assert not StrictDetector().detect(parse(html), None)
+    assert HeuristicDetector().detect(parse(html), None)
+
+
+def test_strict_detector_accepts_submit_inputs():
+    html = '<main><input type="submit" value="Add to Cart"></main>'
+
+    assert StrictDetector().detect(parse(html), None)
+
+
+def test_get_detector_defaults_to_the_configured_one(monkeypatch):
+    monkeypatch.setattr(Config, "STOCK_DETECTOR", "strict")
+
+    assert isinstance(get_detector(), StrictDetector)
+    assert isinstance(get_detector("heuristic"), HeuristicDetector)
+
+    with pytest.raises(ValueError, match="choose from heuristic, strict"):
+        get_detector("psychic")
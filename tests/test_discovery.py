@@ -0,0 +1,131 @@
+import os
+import sys
+
+import pytest
+
+from discovery import DISCOVERED_TAG, DiscoveryCrawler
+from fetch import PageFetcher
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"
+    ),
+)
+
+from fixture_server import FixtureServer  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    with FixtureServer() as server:
+        yield server
+
+
+@pytest.fixture
+def crawler(db, server):
+    crawler = DiscoveryCrawler(
+        db,
+        fetcher=PageFetcher(),
+        seeds=[
+            f"{server.base_url}/sitemap.xml",
+            f"{server.base_url}/us/search?keyword=labubu",
+        ],
+        keywords=["labubu", "monsters"],
+    )
+    yield crawler
+    crawler.fetcher.close()
+
+
+def discovered(db):
+    return sorted(row["url"] for row in db.get_monitor_urls(tag=DISCOVERED_TAG))
+
+
+def test_classify(crawler, server):
+    base = server.base_url
+
+    assert crawler.classify(f"{base}/us/products/12/LABUBU?variant=1#x") == (
+        "product",
+        f"{base}/us/products/12/LABUBU",
+    )
+    assert crawler.classify(f"{base}/us/collection/11?page=2") == (
+        "listing",
+        f"{base}/us/collection/11?page=2",
+    )
+    assert crawler.classify(f"{base}/us/account") == (None, None)
+    assert crawler.classify("https://elsewhere.test/us/products/12") == (None, None)
+
+
+def test_cold_crawl_adds_matching_products(db, crawler):
+    report = crawler.run()
+
+    assert report["error"] == 0
+    assert report["added"]
+    assert discovered(db) == sorted(report["added"])
+    for row in db.get_monitor_urls(tag=DISCOVERED_TAG):
+        assert "/products/" in row["url"] or "/pop-now/set/" in row["url"]
+
+
+def test_unchanged_crawl_downloads_nothing_new(db, crawler, server):
+    crawler.run()
+    known = discovered(db)
+    requests_before = server.requests
+
+    report = crawler.run()
+
+    assert report["added"] == []
+    assert report["fetched"] == 0
+    assert server.requests - requests_before < report["pages"]
+    assert discovered(db) == known
+
+
+def test_new_listing_is_found_on_the_next_crawl(db, crawler, server):
+    crawler.run()
+    path = "/us/collection/11?page=2"
+    card = (
+        b'      <div class="product_card">\n'
+        b'        <a href="/us/products/2200/LABUBU-New-Arrival">LABUBU New Arrival</a>\n'
+        b"      </div>\n"
+    )
+    server.publish(path, server.site[path][0].replace(b"</main>", card + b"</main>"))
+
+    report = crawler.run()
+
+    assert report["added"] == [f"{server.base_url}/us/products/2200/LABUBU-New-Arrival"]
+
+
+def test_deactivated_products_stay_deactivated(db, crawler):
+    first = crawler.run()["added"][0]
+    db.upsert_monitor_urls([{"url": first, "is_active": False}])
+
+    crawler.run()
+
+    assert first not in discovered(db)
+
+
+def test_products_are_found_again_after_a_failed_save(db, crawler, monkeypatch):
+    def fail(entries):
+        raise RuntimeError("database is locked")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(db, "add_new_monitor_urls", fail)
+        with pytest.raises(RuntimeError):
+            crawler.run()
+
+    report = crawler.run()
+
+    assert report["fetched"] == report["pages"]
+    assert report["added"]
+    assert discovered(db) == sorted(report["added"])
+
+
+def test_unparseable_page_is_an_error(crawler, monkeypatch):
+    def broken(url, body):
+        raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+
+    monkeypatch.setattr(crawler, "parse_listing", broken)
+
+    report = crawler.run()
+
+    assert report["error"] > 0
+    assert report["fetched"] > 0
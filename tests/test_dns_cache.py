@@ -0,0 +1,105 @@
+import socket
+import threading
+
+import pytest
+
+import dns_cache
+from config import Config
+from dns_cache import DnsCache
+from fetch import PageFetcher
+
+
+class FakeResolver:
+    def __init__(self):
+        self.calls = 0
+        self.address = "10.0.0.1"
+
+    def __call__(self, host, port, *args):
+        self.calls += 1
+        if host == "missing.test":
+            raise socket.gaierror("Name or service not known")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (self.address, port))]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dns_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture(autouse=True)
+def restore_resolver():
+    yield
+    dns_cache.uninstall_hook()
+
+
+def test_entries_expire_after_the_ttl(clock):
+    resolver = FakeResolver()
+    cache = DnsCache(ttl=30, resolve=resolver)
+
+    first = cache.getaddrinfo("www.popmart.com", 443)
+    resolver.address = "10.0.0.2"
+    clock[0] += 29
+    assert cache.getaddrinfo("www.popmart.com", 443) == first
+    assert resolver.calls == 1
+
+    # After the TTL the new (failed-over) address is picked up
+    clock[0] += 2
+    assert cache.getaddrinfo("www.popmart.com", 443)[0][4][0] == "10.0.0.2"
+    assert resolver.calls == 2
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}
+
+
+def test_failed_lookups_are_not_cached(clock):
+    resolver = FakeResolver()
+    cache = DnsCache(ttl=30, resolve=resolver)
+
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            cache.getaddrinfo("missing.test", 443)
+    assert resolver.calls == 2
+
+
+def test_full_cache_evicts_expired_then_oldest(clock):
+    cache = DnsCache(ttl=30, max_entries=2, resolve=FakeResolver())
+
+    cache.getaddrinfo("a.test", 443)
+    clock[0] += 10
+    cache.getaddrinfo("b.test", 443)
+    cache.getaddrinfo("c.test", 443)
+    assert set(key[0] for key in cache._entries) == {"b.test", "c.test"}
+
+    clock[0] += 25
+    cache.getaddrinfo("d.test", 443)
+    assert set(key[0] for key in cache._entries) == {"c.test", "d.test"}
+
+
+def test_cache_only_answers_inside_active():
+    resolver = FakeResolver()
+    cache = DnsCache(ttl=30, resolve=resolver)
+
+    with cache.active():
+        assert socket.getaddrinfo("shop.test", 443)[0][4][0] == "10.0.0.1"
+
+        # Other threads (the dashboard, notifiers) use the system resolver
+        other = []
+        thread = threading.Thread(
+            target=lambda: other.append(socket.getaddrinfo("localhost", 80))
+        )
+        thread.start()
+        thread.join()
+
+    assert socket.getaddrinfo("localhost", 80)
+    assert other and other[0][0][4][0] != "10.0.0.1"
+    assert resolver.calls == 1
+
+
+def test_fetcher_caps_the_ttl(monkeypatch):
+    monkeypatch.setattr(Config, "DNS_CACHE_TTL", 3600)
+    monkeypatch.setattr(Config, "DNS_CACHE_MAX_TTL", 60)
+
+    assert PageFetcher().dns_cache.ttl == 60
+
+    monkeypatch.setattr(Config, "DNS_CACHE_TTL", 0)
+    assert PageFetcher().dns_cache is None
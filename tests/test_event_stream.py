@@ -0,0 +1,95 @@
+import queue
+
+import pytest
+
+from dashboard_snapshot import DashboardSnapshot
+from event_stream import EventBroadcaster
+from response_cache import ResponseCache
+
+URL = "https://www.popmart.com/us/products/1"
+
+
+def test_cycle_event_carries_the_new_snapshot_before_the_bump(db):
+    monitor_snapshot = DashboardSnapshot(db)
+    monitor_snapshot.refresh({"url_count": 1})
+    snapshot = DashboardSnapshot(db, ResponseCache(db))
+    snapshot.get()
+
+    broadcaster = EventBroadcaster(db, snapshot)
+    subscriber = queue.Queue()
+    broadcaster._subscribers.add(subscriber)
+    broadcaster._poll_once()
+
+    # Polled between the monitor's refresh and its generation bump
+    monitor_snapshot.refresh({"url_count": 2})
+    broadcaster._poll_once()
+
+    assert subscriber.get_nowait() == (
+        "cycle",
+        {"stats": monitor_snapshot._payload["stats"], "cycle": {"url_count": 2}},
+    )
+
+
+@pytest.fixture
+def broadcaster(db):
+    broadcaster = EventBroadcaster(db, DashboardSnapshot(db))
+    broadcaster.poll_interval = 0.01
+    return broadcaster
+
+
+def test_stock_events_after_the_first_poll_are_published(db, broadcaster):
+    db.log_stock_event(URL, False)
+    subscriber = queue.Queue()
+    broadcaster._subscribers.add(subscriber)
+
+    # The first poll only records where the stream starts
+    broadcaster._poll_once()
+    assert subscriber.empty()
+
+    db.log_stock_event(URL, False, price="$20")
+    db.log_stock_event(URL, True, price="$20")
+    broadcaster._poll_once()
+
+    events = [subscriber.get_nowait() for _ in range(subscriber.qsize())]
+    assert [(kind, data["in_stock"], data["flipped"]) for kind, data in events] == [
+        ("stock", False, False),
+        ("stock", True, True),
+    ]
+
+
+def test_full_subscriber_does_not_block_the_others(broadcaster):
+    slow, fast = queue.Queue(maxsize=1), queue.Queue()
+    broadcaster._subscribers.update([slow, fast])
+
+    broadcaster.publish("job", {"id": 1})
+    broadcaster.publish("job", {"id": 2})
+
+    assert slow.qsize() == 1
+    assert fast.qsize() == 2
+
+
+def test_stream_formats_events_and_heartbeats(broadcaster, monkeypatch):
+    monkeypatch.setattr(EventBroadcaster, "HEARTBEAT_INTERVAL", 0.01)
+    subscriber = queue.Queue()
+    subscriber.put(("job", {"id": 1}))
+    stream = broadcaster.stream(subscriber)
+
+    assert next(stream) == "retry: 3000\n\n"
+    assert next(stream) == 'event: job\ndata: {"id": 1}\n\n'
+    assert next(stream) == ": keepalive\n\n"
+
+
+def test_poller_stops_with_the_last_subscriber(broadcaster):
+    subscriber = broadcaster.subscribe()
+    thread = broadcaster._thread
+    assert thread.is_alive()
+    assert broadcaster.subscribe() is not subscriber
+    assert broadcaster._thread is thread
+
+    for pending in list(broadcaster._subscribers):
+        broadcaster.unsubscribe(pending)
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert broadcaster._thread is None
+    assert broadcaster.subscriber_count() == 0
@@ -0,0 +1,138 @@
+import pytest
+
+import web_dashboard
+from config import Config
+
+URL_A = "https://www.popmart.com/us/products/1"
+URL_B = "https://www.popmart.com/us/products/2"
+
+
+def add_event(db, url, has_stock, timestamp):
+    with db.get_connection() as conn:
+        cursor = conn.execute(
+            "INSERT INTO stock_events (url, has_stock, timestamp) VALUES (?, ?, ?)",
+            (url, has_stock, timestamp),
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+
+@pytest.fixture
+def events(db):
+    """Seven events; several share a timestamp so only the id breaks ties"""
+    return [
+        add_event(db, URL_A, False, "2026-01-01 00:00:00"),
+        add_event(db, URL_B, True, "2026-01-01 00:00:01"),
+        add_event(db, URL_A, True, "2026-01-01 00:00:01"),
+        add_event(db, URL_A, False, "2026-01-01 00:00:01"),
+        add_event(db, URL_B, False, "2026-01-01 00:00:02"),
+        add_event(db, URL_A, True, "2026-01-01 00:00:03"),
+        add_event(db, URL_A, False, "2026-01-01 00:00:03"),
+    ]
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(web_dashboard, "_components", {"db": db})
+    monkeypatch.setattr(Config, "ENABLE_RESPONSE_CACHE", False)
+    return web_dashboard.app.test_client()
+
+
+def walk(db, limit, **filters):
+    pages, before = [], None
+    while True:
+        page = db.query_events(**filters, before=before, limit=limit)
+        if not page:
+            return pages
+        pages.append([event["id"] for event in page])
+        before = (page[-1]["timestamp"], page[-1]["id"])
+
+
+def test_pages_cover_every_event_once_newest_first(db, events):
+    pages = walk(db, limit=2)
+
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert sum(pages, []) == list(reversed(events))
+
+
+def test_pages_respect_filters(db, events):
+    pages = walk(db, limit=2, url=URL_A, has_stock=False)
+
+    assert sum(pages, []) == [events[6], events[3], events[0]]
+
+
+def test_page_after_cursor_skips_earlier_rows(db, events):
+    page = db.query_events(before=("2026-01-01 00:00:01", events[3]), limit=10)
+
+    assert [event["id"] for event in page] == [events[2], events[1], events[0]]
+
+
+def test_cursor_round_trip():
+    event = {"timestamp": "2026-01-01 00:00:01", "id": 42}
+
+    cursor = web_dashboard.encode_cursor(event)
+    assert "=" not in cursor
+    assert web_dashboard.decode_cursor(cursor) == ("2026-01-01 00:00:01", 42)
+    assert web_dashboard.decode_cursor("") is None
+
+
+def test_api_follows_next_cursor_to_the_end(client, events):
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/api/events", query_string=params).get_json()
+        seen += [event["id"] for event in body["data"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == list(reversed(events))
+
+
+def test_api_rejects_bad_cursor(client, events):
+    response = client.get("/api/events", query_string={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "Invalid cursor"
+
+
+def test_count_matches_filtered_range(db, events):
+    assert db.count_events() == {"total": 7, "in_stock": 3, "out_of_stock": 4}
+    assert db.count_events(url=URL_B, since="2026-01-01 00:00:02") == {
+        "total": 1,
+        "in_stock": 0,
+        "out_of_stock": 1,
+    }
+
+
+def test_events_in_the_same_second_span_a_page_boundary(db):
+    ids = [
+        add_event(db, URL_A, True, "2026-01-01 00:00:01"),
+        add_event(db, URL_A, True, "2026-01-01 00:00:01.250000"),
+        add_event(db, URL_A, True, "2026-01-01 00:00:01.750000"),
+        add_event(db, URL_A, True, "2026-01-01 00:00:01.750000"),
+        add_event(db, URL_A, True, "2026-01-01 00:00:02"),
+    ]
+
+    for limit in (1, 2, 3):
+        assert sum(walk(db, limit=limit), []) == list(reversed(ids))
+
+
+def test_since_and_until_keep_sub_second_precision(client, db):
+    ids = [
+        add_event(db, URL_A, True, "2026-01-01 00:00:01"),
+        add_event(db, URL_A, True, "2026-01-01 00:00:01.250000"),
+        add_event(db, URL_A, True, "2026-01-01 00:00:01.750000"),
+    ]
+
+    def query(**params):
+        body = client.get("/api/events", query_string=params).get_json()
+        return [event["id"] for event in body["data"]]
+
+    assert query(until="2026-01-01T00:00:01.500Z") == [ids[1], ids[0]]
+    assert query(since="2026-01-01T00:00:01.250") == [ids[2], ids[1]]
+    assert query(since="2026-01-01T00:00:01Z", until="2026-01-01T00:00:01.250") == [
+        ids[0]
+    ]
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from fetch import FetchDeadlineExceeded, PageFetcher
+from rate_limit import CircuitBreaker, HostRateLimiter
+
+URL = "https://www.popmart.com/us/products/1"
+
+
+class FakeTransport:
+    """Answers each request after the next scripted delay"""
+
+    name = "fake"
+
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.opened = []
+        self._lock = threading.Lock()
+
+    def open(self, url, timeout, headers=None):
+        with self._lock:
+            number = len(self.opened)
+            self.opened.append(url)
+            delay = self.delays[number] if number < len(self.delays) else 0
+        time.sleep(delay)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = f"request {number}".encode()
+        response._content_consumed = True
+        return response
+
+    def iter_body(self, response):
+        return [response._content]
+
+    def finish(self, response, body):
+        response._content = body
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def limiter():
+    return HostRateLimiter(rate=100, burst=10, breaker_threshold=1)
+
+
+def make_fetcher(transport, limiter=None, hedge_delay=None):
+    fetcher = PageFetcher(limiter)
+    fetcher._transport = transport
+    fetcher.deadline = 5
+    fetcher.hedge = hedge_delay is not None
+    fetcher.hedge_delay = hedge_delay or 0
+    return fetcher
+
+
+def test_hedge_wins_when_the_primary_is_slow(limiter):
+    transport = FakeTransport(1.0, 0)
+    fetcher = make_fetcher(transport, limiter, hedge_delay=0.05)
+
+    start = time.monotonic()
+    response = fetcher.fetch(URL)
+
+    assert response.content == b"request 1"
+    assert time.monotonic() - start < 0.8
+    assert len(transport.opened) == 2
+    fetcher.close()
+
+
+def test_primary_wins_without_a_hedge_when_fast(limiter):
+    transport = FakeTransport(0, 0)
+    fetcher = make_fetcher(transport, limiter, hedge_delay=0.5)
+
+    assert fetcher.fetch(URL).content == b"request 0"
+    assert len(transport.opened) == 1
+    fetcher.close()
+
+
+def test_no_hedge_without_a_spare_token():
+    limiter = HostRateLimiter(rate=0.01, burst=1)
+    transport = FakeTransport(0.2, 0)
+    fetcher = make_fetcher(transport, limiter, hedge_delay=0.05)
+
+    assert fetcher.fetch(URL).content == b"request 0"
+    assert len(transport.opened) == 1
+    fetcher.close()
+
+
+def test_half_open_host_gets_a_single_probe(limiter):
+    breaker = limiter.policy(URL).breaker
+    breaker.record_failure()
+    breaker.opened_until = time.monotonic()
+    transport = FakeTransport(0.2, 0)
+    fetcher = make_fetcher(transport, limiter, hedge_delay=0.05)
+
+    assert fetcher.fetch(URL).content == b"request 0"
+    assert len(transport.opened) == 1
+    assert breaker.state == CircuitBreaker.CLOSED
+    fetcher.close()
+
+
+def test_probe_is_released_when_no_time_is_left(limiter):
+    breaker = limiter.policy(URL).breaker
+    breaker.record_failure()
+    breaker.opened_until = time.monotonic()
+    transport = FakeTransport()
+    fetcher = make_fetcher(transport, limiter)
+    fetcher.deadline = 0
+
+    with pytest.raises(FetchDeadlineExceeded):
+        fetcher.fetch(URL)
+
+    assert transport.opened == []
+    assert breaker.state == CircuitBreaker.OPEN
+    fetcher.close()
+
+
+def test_slow_body_runs_into_the_deadline():
+    class TrickleTransport(FakeTransport):
+        def iter_body(self, response):
+            for _ in range(10):
+                time.sleep(0.05)
+                yield b"x"
+
+    fetcher = make_fetcher(TrickleTransport())
+    fetcher.deadline = 0.1
+
+    with pytest.raises(FetchDeadlineExceeded):
+        fetcher.fetch(URL)
+    fetcher.close()
@@ -0,0 +1,31 @@
+import pytest
+
+from metrics import Metric, Registry
+
+
+def test_metric_is_abstract():
+    with pytest.raises(TypeError):
+        Metric("labubu_test", "Abstract")
+
+
+def test_counter_and_histogram_render():
+    registry = Registry()
+    checks = registry.counter("labubu_test_checks_total", "Checks", ["result"])
+    seconds = registry.histogram("labubu_test_seconds", "Time", buckets=(0.1, 1))
+    checks.inc(result="in_stock")
+    checks.inc(2, result="in_stock")
+    seconds.observe(0.05)
+    seconds.observe(5)
+
+    text = registry.render()
+    assert 'labubu_test_checks_total{result="in_stock"} 3' in text
+    assert 'labubu_test_seconds_bucket{le="0.1"} 1' in text
+    assert 'labubu_test_seconds_bucket{le="1"} 1' in text
+    assert 'labubu_test_seconds_bucket{le="+Inf"} 2' in text
+    assert "labubu_test_seconds_count 2" in text
+
+
+def test_labels_must_match():
+    counter = Registry().counter("labubu_test_total", "Test", ["host"])
+    with pytest.raises(ValueError):
+        counter.inc(status="200")
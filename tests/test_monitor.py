@@ -0,0 +1,156 @@
+import os
+from concurrent.futures import Future
+
+import pytest
+import requests
+
+from config import Config
+from detection import get_detector
+from monitor import StockMonitor
+from notifiers import BaseNotifier
+from records import ProductInfo
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures")
+URL = "https://www.popmart.com/us/products/1898/THE-MONSTERS"
+
+
+def make_response(status_code: int, fixture: str = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = URL
+    response.encoding = "utf-8"
+    body = b""
+    if fixture:
+        with open(os.path.join(FIXTURES_DIR, f"{fixture}.html"), "rb") as f:
+            body = f.read()
+    response._content = body
+    return response
+
+
+class FakeFetcher:
+    def __init__(self, result):
+        self.result = result
+
+    def fetch(self, url, headers=None):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@pytest.fixture
+def monitor(db, monkeypatch) -> StockMonitor:
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "")
+    monkeypatch.setattr(Config, "ENABLE_OUTBOX", False)
+    return StockMonitor(db, seed_urls=False)
+
+
+@pytest.mark.parametrize("status", [404, 410])
+def test_delisted_product_is_out_of_stock(monitor, status):
+    monitor.fetcher = FakeFetcher(make_response(status, "not_found"))
+    in_stock, info = monitor.check_stock(URL)
+    assert in_stock is False
+    assert str(status) in info.availability
+
+
+@pytest.mark.parametrize(
+    "result",
+    [
+        make_response(503),
+        make_response(429),
+        make_response(500),
+        requests.Timeout("read timed out"),
+        requests.ConnectionError("connection refused"),
+    ],
+)
+def test_transient_failures_are_unknown(monitor, result):
+    monitor.fetcher = FakeFetcher(result)
+    in_stock, _ = monitor.check_stock(URL)
+    assert in_stock is None
+
+
+def test_in_stock_page(monitor):
+    monitor.fetcher = FakeFetcher(make_response(200, "in_stock"))
+    in_stock, info = monitor.check_stock(URL)
+    assert in_stock is True
+    assert info.name
+
+
+class RecordingNotifier(BaseNotifier):
+    def __init__(self):
+        self.sent = []
+        self.followups = []
+
+    def send_notification(self, message, url, product_info=None):
+        self.sent.append(message)
+        self.last_message_ref = f"msg-{len(self.sent)}"
+        return True
+
+    def send_followup(self, message, url, product_info=None, message_ref=None):
+        self.followups.append((message, message_ref))
+        return True
+
+    def get_notification_type(self):
+        return "recording"
+
+
+@pytest.fixture
+def send_first(monitor, monkeypatch):
+    """The monitor with send-first alerts and a scripted AI result"""
+    monkeypatch.setattr(Config, "SEND_FIRST_ALERTS", True)
+    monkeypatch.setattr(Config, "ENABLE_AI_MESSAGE_CACHE", False)
+    notifier = RecordingNotifier()
+    monitor.notification_manager.notifiers = [notifier]
+
+    def script(result):
+        def generate(url, product_info):
+            future = Future()
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+            return future
+
+        monkeypatch.setattr(monitor.ai_messages, "_generate_async", generate)
+
+    return monitor, notifier, script
+
+
+def test_send_first_alert_then_edits_it_with_the_ai_message(send_first):
+    monitor, notifier, script = send_first
+    script("🔥 LABUBU is back!")
+
+    monitor.process_restock_alert(URL, ProductInfo(name="LABUBU"), alert_id="a1")
+
+    assert notifier.sent == [
+        monitor.ai_messages.fallback_message(ProductInfo(name="LABUBU"))
+    ]
+    assert notifier.followups == [("🔥 LABUBU is back!", "msg-1")]
+    assert monitor._alert_refs == {}
+
+
+@pytest.mark.parametrize("result", [RuntimeError("model down"), ""])
+def test_failed_enrichment_forgets_the_alert_refs(send_first, result):
+    monitor, notifier, script = send_first
+    script(result)
+
+    monitor.process_restock_alert(URL, ProductInfo(name="LABUBU"), alert_id="a1")
+
+    assert len(notifier.sent) == 1
+    assert notifier.followups == []
+    assert monitor._alert_refs == {}
+
+
+@pytest.mark.parametrize("fixture,warmed", [("sold_out", True), ("in_stock", False)])
+def test_only_out_of_stock_products_are_warmed(monitor, monkeypatch, fixture, warmed):
+    monkeypatch.setattr(Config, "ENABLE_AI_MESSAGE_CACHE", True)
+    monkeypatch.setattr(monitor, "process_restock_alert", lambda *args, **kw: None)
+    calls = []
+    monkeypatch.setattr(
+        monitor.ai_messages, "warm", lambda url, info: calls.append(url)
+    )
+    monitor.detector = get_detector("strict")
+    monitor.fetcher = FakeFetcher(make_response(200, fixture))
+
+    monitor.monitor_single_url(URL)
+
+    assert calls == ([URL] if warmed else [])
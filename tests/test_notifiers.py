@@ -0,0 +1,71 @@
+import pytest
+
+from notifiers import DiscordNotifier
+
+
+class FakeResponse:
+    content = b'{"id": "123"}'
+
+    def json(self):
+        return {"id": "123"}
+
+
+@pytest.fixture
+def discord(monkeypatch):
+    notifier = DiscordNotifier()
+    notifier.webhook_url = "https://discord.test/api/webhooks/1/abc"
+    notifier.sent = []
+
+    def request(method, url, **kwargs):
+        notifier.sent.append((method, kwargs["json"]))
+        return FakeResponse()
+
+    monkeypatch.setattr(notifier, "_request", request)
+    return notifier
+
+
+def make_alerts(count: int, length: int):
+    return [
+        {
+            "message": f"{i}:" + "x" * length,
+            "url": f"https://www.popmart.com/us/products/{i}",
+            "product_info": {"name": f"LABUBU {i}", "price": "$19.99"},
+        }
+        for i in range(count)
+    ]
+
+
+def test_batch_keeps_every_message(discord):
+    alerts = make_alerts(10, 1500)
+    assert discord.send_batch(alerts) == [True] * 10
+
+    descriptions = []
+    for _, payload in discord.sent:
+        embeds = payload["embeds"]
+        assert len(embeds) <= DiscordNotifier.MAX_EMBEDS
+        assert sum(map(discord._embed_size, embeds)) <= DiscordNotifier.MAX_EMBED_TOTAL
+        assert len(payload["content"]) <= 2000
+        descriptions += [embed["description"] for embed in embeds]
+    assert descriptions == [alert["message"] for alert in alerts]
+    assert len(discord.sent) > 1
+
+
+def test_short_alerts_share_one_message(discord):
+    assert discord.send_batch(make_alerts(10, 50)) == [True] * 10
+    assert len(discord.sent) == 1
+    assert len(discord.sent[0][1]["embeds"]) == 10
+
+
+def test_long_message_is_cut_to_the_description_limit(discord):
+    discord.send_batch(make_alerts(1, 5000))
+    description = discord.sent[0][1]["embeds"][0]["description"]
+    assert len(description) == DiscordNotifier.MAX_DESCRIPTION
+
+
+def test_followup_edits_the_embed(discord):
+    assert discord.send_followup(
+        "AI says hi", "https://www.popmart.com/us/products/1", {}, message_ref="123"
+    )
+    method, payload = discord.sent[0]
+    assert method == "PATCH"
+    assert payload["embeds"][0]["description"] == "AI says hi"
@@ -0,0 +1,194 @@
+import time
+
+import pytest
+import requests
+
+import notifiers
+from notifiers import BaseNotifier, NotificationManager
+from outbox import NotificationOutbox
+
+
+class FakeNotifier(BaseNotifier):
+    def __init__(self, results):
+        self.results = list(results)
+        self.sent = []
+
+    def send_notification(self, message, url, product_info=None):
+        self.sent.append(url)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def get_notification_type(self):
+        return "fake"
+
+
+class FakeWebhookNotifier(BaseNotifier):
+    """Posts through the real request path to a scripted transport"""
+
+    def send_notification(self, message, url, product_info=None):
+        self._post("https://hooks.test/alert", json={"content": message})
+        return True
+
+    def get_notification_type(self):
+        return "fake"
+
+
+class ScriptedTransport:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+
+    def request(self, method, url, **kwargs):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        response.url = url
+        if outcome == 429:
+            response.headers["Retry-After"] = "120"
+        return response
+
+
+@pytest.fixture
+def make_outbox(db):
+    def make(*results):
+        manager = NotificationManager()
+        manager.notifiers = [FakeNotifier(results)]
+        outbox = NotificationOutbox(db, manager)
+        outbox.max_attempts = 3
+        outbox.base_backoff = 10
+        outbox.max_backoff = 60
+        return outbox
+
+    return make
+
+
+def enqueue(outbox, alert_id="alert-1"):
+    return outbox.enqueue_restock_alert(
+        "https://www.popmart.com/us/products/1", "Back in stock!", {}, alert_id
+    )
+
+
+def make_due(db, job_ids):
+    for job_id in job_ids:
+        db.defer_notification(job_id, 0)
+
+
+def test_delivered_job_is_not_sent_again(db, make_outbox):
+    outbox = make_outbox(True)
+    enqueue(outbox)
+
+    assert outbox.run_pending() == 1
+    assert outbox.run_pending() == 0
+    assert db.get_outbox_stats() == {"delivered": 1}
+
+
+def test_duplicate_alert_is_queued_once(db, make_outbox):
+    outbox = make_outbox(True)
+
+    assert len(enqueue(outbox)) == 1
+    assert enqueue(outbox) == []
+
+
+def test_failure_is_retried_after_backoff(db, make_outbox):
+    outbox = make_outbox(False, True)
+    job_ids = enqueue(outbox)
+
+    assert outbox.run_pending() == 0
+    job = db.get_notification_job("alert-1:fake")
+    assert job["status"] == "pending"
+    assert job["attempts"] == 1
+    assert job["last_error"] == "notifier reported failure"
+    assert job["next_attempt_at"] >= time.time() + 10 * 0.8 - 1
+
+    # Not due yet
+    assert outbox.run_pending() == 0
+    assert db.get_notification_job("alert-1:fake")["attempts"] == 1
+
+    make_due(db, job_ids)
+    assert outbox.run_pending() == 1
+    assert db.get_notification_job("alert-1:fake")["status"] == "delivered"
+
+
+def test_dead_letters_after_max_attempts(db, make_outbox):
+    outbox = make_outbox(False, RuntimeError("boom"), False)
+    job_ids = enqueue(outbox)
+
+    for _ in range(3):
+        outbox.run_pending()
+        make_due(db, job_ids)
+
+    job = db.get_notification_job("alert-1:fake")
+    assert job["status"] == "dead"
+    assert job["attempts"] == 3
+    assert db.get_outbox_stats() == {"dead": 1}
+    assert [dead["id"] for dead in db.get_dead_notifications()] == job_ids
+
+    # Dead jobs are never picked up again
+    assert outbox.run_pending() == 0
+    assert (
+        outbox.notification_manager.notifiers[0].sent
+        == ["https://www.popmart.com/us/products/1"] * 3
+    )
+
+
+def test_job_for_disabled_channel_is_dead_lettered(db, make_outbox):
+    outbox = make_outbox()
+    db.enqueue_notification("alert-1:email", "https://x.test", "email", "hi")
+
+    assert outbox.run_pending() == 0
+    assert db.get_notification_job("alert-1:email")["status"] == "dead"
+
+
+def test_backoff_grows_and_is_capped(make_outbox, monkeypatch):
+    outbox = make_outbox()
+    monkeypatch.setattr("outbox.random.uniform", lambda low, high: 1.0)
+
+    assert [outbox.compute_backoff(n) for n in range(1, 6)] == [10, 20, 40, 60, 60]
+
+
+def test_backoff_respects_retry_after(make_outbox):
+    outbox = make_outbox()
+
+    assert outbox.compute_backoff(1, retry_after=300) == 300
+
+
+def test_rate_limit_blocks_the_whole_channel(db, make_outbox):
+    outbox = make_outbox(False)
+    outbox.notification_manager.notifiers[0].retry_after = 120
+    enqueue(outbox, "alert-1")
+
+    outbox.run_pending()
+    blocked_until = outbox.channel_blocked_until["fake"]
+    assert blocked_until >= time.time() + 119
+
+    # A new alert on the same channel waits for the block to end
+    enqueue(outbox, "alert-2")
+    assert outbox.run_pending() == 0
+    assert db.get_notification_job("alert-2:fake")["attempts"] == 0
+    assert db.get_notification_job("alert-2:fake")["next_attempt_at"] == blocked_until
+
+
+def test_connection_error_after_429_does_not_reuse_retry_after(
+    db, make_outbox, monkeypatch
+):
+    transport = ScriptedTransport([429, requests.ConnectionError("reset")])
+    monkeypatch.setattr(notifiers, "get_webhook_transport", lambda: transport)
+    outbox = make_outbox()
+    outbox.notification_manager.notifiers = [FakeWebhookNotifier()]
+    job_ids = enqueue(outbox)
+
+    outbox.run_pending()
+    assert outbox.channel_blocked_until["fake"] >= time.time() + 119
+
+    outbox.channel_blocked_until.clear()
+    make_due(db, job_ids)
+    outbox.run_pending()
+
+    job = db.get_notification_job("alert-1:fake")
+    assert job["attempts"] == 2
+    assert job["last_error"] == "reset"
+    assert "fake" not in outbox.channel_blocked_until
+    assert job["next_attempt_at"] < time.time() + 60
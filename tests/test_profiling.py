@@ -0,0 +1,80 @@
+import cProfile
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import profiling
+from profiling import CProfileProfiler, CycleProfiler
+
+
+def check_stock(n: int) -> int:
+    return sum(range(n))
+
+
+def profile_cycle(tmp_path) -> str:
+    profiler = CProfileProfiler(str(tmp_path), cycles=1)
+    with profiler.cycle():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(profiler.wrap(check_stock), [10, 20, 30]))
+    assert results == [45, 190, 435]
+    with open(os.path.join(tmp_path, "cycle1-summary.txt")) as f:
+        return f.read()
+
+
+def test_cprofile_covers_worker_threads(tmp_path):
+    summary = profile_cycle(tmp_path)
+    assert "check_stock" in summary
+    assert os.path.exists(os.path.join(tmp_path, "cycle1.pstats"))
+
+
+class ExclusiveProfile(cProfile.Profile):
+    """Behaves like cProfile on 3.12+: one active profiler per process"""
+
+    active = 0
+
+    def enable(self, *args, **kwargs):
+        if ExclusiveProfile.active:
+            raise ValueError("Another profiling tool is already active")
+        ExclusiveProfile.active += 1
+        self.enabled = True
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        # pstats disables a profile again when it reads it
+        if getattr(self, "enabled", False):
+            ExclusiveProfile.active -= 1
+            self.enabled = False
+        super().disable()
+
+
+def test_cprofile_runs_workers_when_profiler_is_exclusive(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling.cProfile, "Profile", ExclusiveProfile)
+    profile_cycle(tmp_path)
+    assert ExclusiveProfile.active == 0
+
+
+def test_cprofile_cycle_survives_another_active_profiler(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling.cProfile, "Profile", ExclusiveProfile)
+    ExclusiveProfile.active = 1
+    try:
+        profiler = CProfileProfiler(str(tmp_path), cycles=1)
+        with profiler.cycle():
+            check_stock(10)
+    finally:
+        ExclusiveProfile.active = 0
+
+
+def test_cycle_profiler_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        CycleProfiler(str(tmp_path))
+
+
+def test_profiling_stops_after_cycle_budget(tmp_path):
+    profiler = CProfileProfiler(str(tmp_path), cycles=1)
+    with profiler.cycle():
+        check_stock(10)
+    with profiler.cycle():
+        check_stock(10)
+    assert profiler.cycle_number == 1
+    assert not os.path.exists(os.path.join(tmp_path, "cycle2.pstats"))
@@ -0,0 +1,182 @@
+import time
+
+import pytest
+
+from rate_limit import (
+    CircuitBreaker,
+    HostRateLimiter,
+    HostUnavailableError,
+    TokenBucket,
+    parse_retry_after,
+)
+
+URL = "https://www.popmart.com/us/products/1"
+
+
+def make_limiter(**kwargs) -> HostRateLimiter:
+    options = dict(
+        rate=1000,
+        burst=1000,
+        max_wait=0.05,
+        breaker_threshold=2,
+        breaker_cooldown=0.05,
+        breaker_max_cooldown=1,
+    )
+    options.update(kwargs)
+    return HostRateLimiter(**options)
+
+
+def open_circuit(limiter: HostRateLimiter):
+    for _ in range(limiter.breaker_threshold):
+        limiter.record(URL)
+    assert limiter.policy(URL).breaker.state == CircuitBreaker.OPEN
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({"Retry-After": "12"}) == 12
+    assert parse_retry_after({"Retry-After": "-3"}) == 0
+    assert parse_retry_after({"Retry-After": "soon"}) is None
+    assert parse_retry_after({}) is None
+
+
+def test_token_bucket_waits_when_empty():
+    bucket = TokenBucket(rate=10, capacity=1)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == pytest.approx(0.1, abs=0.01)
+    bucket.block_for(5)
+    assert bucket.try_acquire() > 4
+
+
+def test_bucket_is_never_sped_up_near_a_reset():
+    bucket = TokenBucket(rate=1, capacity=5)
+
+    bucket.update_from_headers(
+        {
+            "X-RateLimit-Limit": "5",
+            "X-RateLimit-Remaining": "5",
+            "X-RateLimit-Reset-After": "0.05",
+        }
+    )
+
+    assert bucket.rate == 1
+
+
+def test_bucket_spreads_the_remaining_requests_until_the_reset():
+    bucket = TokenBucket(rate=1, capacity=5)
+
+    bucket.update_from_headers(
+        {
+            "X-RateLimit-Limit": "5",
+            "X-RateLimit-Remaining": "2",
+            "X-RateLimit-Reset-After": "10",
+        }
+    )
+
+    assert bucket.rate == pytest.approx(0.2)
+    assert bucket.tokens <= 2
+
+
+def test_bucket_blocks_until_reset_when_exhausted():
+    bucket = TokenBucket(rate=1, capacity=5)
+
+    bucket.update_from_headers(
+        {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "3"}
+    )
+
+    assert bucket.rate == 1
+    assert bucket.try_acquire() > 2.5
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    limiter = make_limiter()
+    limiter.record(URL)
+    assert limiter.policy(URL).breaker.state == CircuitBreaker.CLOSED
+    limiter.record(URL)
+
+    with pytest.raises(HostUnavailableError) as info:
+        limiter.acquire(URL)
+    assert info.value.reason == "circuit open"
+
+
+def test_successful_probe_closes_circuit():
+    limiter = make_limiter()
+    open_circuit(limiter)
+    time.sleep(0.06)
+
+    limiter.acquire(URL)
+    breaker = limiter.policy(URL).breaker
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(HostUnavailableError):
+        limiter.acquire(URL)
+
+    limiter.record(URL, 200)
+    assert breaker.state == CircuitBreaker.CLOSED
+    limiter.acquire(URL)
+
+
+def test_failed_probe_reopens_for_longer():
+    limiter = make_limiter()
+    open_circuit(limiter)
+    time.sleep(0.06)
+    limiter.acquire(URL)
+
+    limiter.record(URL, 503)
+    breaker = limiter.policy(URL).breaker
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.cooldown == pytest.approx(0.1)
+
+
+def test_probe_not_taken_when_bucket_is_empty():
+    limiter = make_limiter()
+    open_circuit(limiter)
+    time.sleep(0.06)
+    policy = limiter.policy(URL)
+    policy.bucket.block_for(1)
+
+    with pytest.raises(HostUnavailableError) as info:
+        limiter.acquire(URL)
+    assert info.value.reason != "circuit open"
+    # The probe is still available once the bucket allows a request
+    assert policy.breaker.state == CircuitBreaker.OPEN
+    assert policy.breaker.check() == 0
+
+    policy.bucket.blocked_until = 0
+    limiter.acquire(URL)
+    assert policy.breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_cancelled_probe_reopens_circuit():
+    limiter = make_limiter()
+    open_circuit(limiter)
+    time.sleep(0.06)
+    limiter.acquire(URL)
+
+    limiter.cancel(URL, 0.05)
+    breaker = limiter.policy(URL).breaker
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.check() > 0
+    time.sleep(0.06)
+    limiter.acquire(URL)
+
+
+def test_lost_probe_times_out():
+    breaker = CircuitBreaker(1, cooldown=0.01, max_cooldown=1, probe_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.start_request()
+    assert not breaker.start_request()
+    assert breaker.check() > 0
+
+    time.sleep(0.06)
+    assert breaker.check() == 0
+    assert breaker.start_request()
+
+
+def test_throttle_halves_rate_and_success_recovers():
+    limiter = make_limiter(rate=10, burst=10)
+    policy = limiter.policy(URL)
+    limiter.record(URL, 429, {"Retry-After": "0"})
+    assert policy.rate == pytest.approx(5)
+    limiter.record(URL, 200)
+    assert policy.rate == pytest.approx(6)
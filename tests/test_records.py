@@ -0,0 +1,64 @@
+import warnings
+
+from records import CheckResult, ProductInfo, UrlStateTable
+
+URL = "https://www.popmart.com/us/products/1898/THE-MONSTERS"
+
+
+def check(in_stock, checked_at: float = 100.0, url: str = URL) -> CheckResult:
+    return CheckResult(url, in_stock, ProductInfo(), checked_at=checked_at)
+
+
+def test_product_info_to_dict_is_naive_utc():
+    info = ProductInfo("LABUBU", "$19.99", last_updated=0.0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        data = info.to_dict()
+    assert data["last_updated"] == "1970-01-01T00:00:00"
+    assert data["name"] == "LABUBU"
+
+
+def test_record_returns_previous_state():
+    table = UrlStateTable()
+    assert table.get(URL) is None
+    assert table.record(check(False, 100)) is None
+    assert table.record(check(True, 200)) is False
+    assert table.record(check(True, 300)) is True
+
+    state = table.state(URL)
+    assert state["in_stock"] is True
+    assert state["changed_at"] == 200
+    assert state["checked_at"] == 300
+    assert state["failures"] == 0
+
+
+def test_unknown_result_keeps_last_known_state():
+    table = UrlStateTable()
+    table.record(check(True, 100))
+    assert table.record(check(None, 200)) is True
+    assert table.record(check(None, 300)) is True
+
+    state = table.state(URL)
+    assert state["in_stock"] is True
+    assert state["changed_at"] == 100
+    assert state["failures"] == 2
+
+    table.record(check(False, 400))
+    assert table.state(URL)["failures"] == 0
+
+
+def test_unknown_first_result_stays_unseen():
+    table = UrlStateTable()
+    assert table.record(check(None)) is None
+    assert table.get(URL, default=False) is False
+    assert table.counts() == {"in_stock": 0, "out_of_stock": 0, "unseen": 1}
+
+
+def test_counts_and_items():
+    table = UrlStateTable()
+    for i in range(10):
+        table.record(check(i % 3 == 0, url=f"{URL}/{i}"))
+    assert len(table) == 10
+    assert table.counts() == {"in_stock": 4, "out_of_stock": 6, "unseen": 0}
+    assert dict(table.items())[f"{URL}/3"] is True
+    assert f"{URL}/9" in table
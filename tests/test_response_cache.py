@@ -0,0 +1,110 @@
+import pytest
+
+import web_dashboard
+from config import Config
+from dashboard_snapshot import DashboardSnapshot
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(db) -> ResponseCache:
+    cache = ResponseCache(db)
+    cache.backend = "memory"
+    cache.check_interval = 0
+    return cache
+
+
+def test_hit_until_invalidated(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"count": len(calls)}
+
+    first = cache.get("status", {}, compute)
+    assert cache.get("status", {}, compute) is first
+    assert len(calls) == 1
+
+    cache.invalidate("test")
+    assert cache.get("status", {}, compute)["body"] == b'{"count": 2}'
+
+
+def test_etag_changes_when_body_changes_after_ttl(cache):
+    cache.ttl = 0
+    values = iter([{"count": 1}, {"count": 1}, {"count": 2}])
+
+    first = cache.get("status", {}, lambda: next(values))
+    same = cache.get("status", {}, lambda: next(values))
+    changed = cache.get("status", {}, lambda: next(values))
+
+    assert same["etag"] == first["etag"]
+    assert changed["etag"] != first["etag"]
+
+
+def test_api_returns_304_only_while_body_is_unchanged(db, monkeypatch):
+    monkeypatch.setattr(web_dashboard, "_components", {"db": db})
+    monkeypatch.setattr(Config, "ENABLE_RESPONSE_CACHE", True)
+    monkeypatch.setattr(Config, "RESPONSE_CACHE_TTL", 0)
+    client = web_dashboard.app.test_client()
+
+    first = client.get("/api/metrics")
+    etag = first.headers["ETag"]
+    assert (
+        client.get("/api/metrics", headers={"If-None-Match": etag}).status_code == 304
+    )
+
+    db.save_snapshot("metrics", {"stages": {}})
+    refreshed = client.get("/api/metrics", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.json["data"] == {"stages": {}}
+
+
+def count_calls(monkeypatch, obj, name):
+    calls = []
+    original = getattr(obj, name)
+    monkeypatch.setattr(
+        obj, name, lambda *args, **kwargs: calls.append(1) or original(*args, **kwargs)
+    )
+    return calls
+
+
+def test_snapshot_is_only_reread_after_a_generation_bump(db, cache, monkeypatch):
+    monitor_snapshot = DashboardSnapshot(db)
+    monitor_cache = ResponseCache(db)
+    monitor_snapshot.refresh({"url_count": 1})
+
+    snapshot = DashboardSnapshot(db, cache)
+    assert snapshot.get()["cycle"] == {"url_count": 1}
+
+    versions = count_calls(monkeypatch, db, "get_snapshot_version")
+    for _ in range(3):
+        assert snapshot.get()["cycle"] == {"url_count": 1}
+    assert versions == []
+
+    # The monitor refreshes and then bumps the generation after each cycle
+    monitor_snapshot.refresh({"url_count": 2})
+    assert snapshot.get()["cycle"] == {"url_count": 1}
+    monitor_cache.invalidate("monitoring cycle")
+    assert snapshot.get()["cycle"] == {"url_count": 2}
+    assert len(versions) == 1
+
+
+def test_history_page_skips_queries_until_data_changes(db, monkeypatch):
+    monkeypatch.setattr(web_dashboard, "_components", {"db": db})
+    monkeypatch.setattr(Config, "ENABLE_RESPONSE_CACHE", True)
+    monkeypatch.setattr(Config, "RESPONSE_CACHE_CHECK_INTERVAL", 0)
+    client = web_dashboard.app.test_client()
+    queries = count_calls(monkeypatch, db, "query_events")
+
+    first = client.get("/history")
+    assert client.get("/history").data == first.data
+    assert len(queries) == 1
+
+    # Different filters are cached separately
+    client.get("/history", query_string={"hours": 0})
+    assert len(queries) == 2
+
+    db.log_stock_event("https://www.popmart.com/us/products/1", True)
+    ResponseCache(db).invalidate("stock flip")
+    assert b"products/1" in client.get("/history").data
+    assert len(queries) == 3
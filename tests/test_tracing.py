@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from tracing import LatencySketch, RollingSketch, Trace, Tracer, percentile
+
+
+def make_trace(url: str, total_ms: float) -> Trace:
+    trace = Trace(url)
+    trace.stages = {"fetch.ttfb": total_ms * 0.9, "parse": total_ms * 0.1}
+    trace.total_ms = total_ms
+    return trace
+
+
+def test_sketch_percentiles_within_two_percent():
+    rng = random.Random(7)
+    samples = [rng.lognormvariate(4, 1) for _ in range(5000)]
+    sketch = LatencySketch()
+    for ms in samples:
+        sketch.add(ms)
+
+    ordered = sorted(samples)
+    for pct in (50, 95, 99):
+        assert sketch.percentile(pct) == pytest.approx(
+            percentile(ordered, pct), rel=0.02
+        )
+    assert sketch.max == max(samples)
+    assert sketch.count == len(samples)
+
+
+def test_sketch_handles_zero_and_empty():
+    sketch = LatencySketch()
+    assert sketch.percentile(95) == 0.0
+    sketch.add(0.0)
+    assert sketch.percentile(50) == 0.0
+
+
+def test_rolling_sketch_forgets_old_samples():
+    rolling = RollingSketch(window=100)
+    for _ in range(100):
+        rolling.add(1000.0)
+    for _ in range(200):
+        rolling.add(10.0)
+    assert rolling.merged().percentile(99) == pytest.approx(10.0, rel=0.02)
+
+
+def test_tracer_keeps_only_slowest_urls():
+    tracer = Tracer(window=50, trace_file="", top_n=3)
+    for i in range(1000):
+        tracer.record(make_trace(f"https://www.popmart.com/us/products/{i}", i))
+
+    summary = tracer.summary()
+    assert summary["checks"] == 1000
+    assert [entry["total_ms"] for entry in summary["slowest"]] == [999, 998, 997]
+    assert set(summary["hosts"]) == {"www.popmart.com"}
+    assert summary["stages"]["total"]["count"] <= 100
+    assert "urls" not in summary
+
+
+def test_slowest_url_that_speeds_up_is_replaced():
+    tracer = Tracer(window=50, trace_file="", top_n=2)
+    tracer.record(make_trace("https://a.test/1", 500))
+    tracer.record(make_trace("https://a.test/2", 400))
+    tracer.record(make_trace("https://a.test/1", 5))
+    tracer.record(make_trace("https://a.test/3", 300))
+
+    urls = [entry["url"] for entry in tracer.summary()["slowest"]]
+    assert urls == ["https://a.test/2", "https://a.test/3"]
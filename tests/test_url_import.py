@@ -0,0 +1,162 @@
+import json
+
+import pytest
+
+from config import Config
+from monitor import StockMonitor
+from url_import import import_urls, normalize_url, parse_entries
+
+URL_1 = "https://www.popmart.com/us/products/1"
+URL_2 = "https://www.popmart.com/us/products/2"
+URL_3 = "https://www.popmart.com/us/products/3"
+
+
+def active_urls(db):
+    return sorted(row["url"] for row in db.get_monitor_urls())
+
+
+def test_normalize_url():
+    assert (
+        normalize_url(" HTTPS://WWW.PopMart.com:443/us/products/1?x=1#top ")
+        == "https://www.popmart.com/us/products/1?x=1"
+    )
+    assert normalize_url("http://example.com:8080") == "http://example.com:8080/"
+    with pytest.raises(ValueError):
+        normalize_url("ftp://example.com/file")
+
+
+def test_csv_error_rows_are_reported_and_valid_rows_kept():
+    text = "\n".join(
+        [
+            "url,product_name,target_price,tags,active",
+            f"{URL_1},Labubu,$19.99,Labubu;Macaron,yes",
+            "not-a-url,Broken,,,",
+            f"{URL_2},Pricey,cheap,,",
+            f"{URL_3},,,,maybe",
+        ]
+    )
+
+    entries, errors = parse_entries(text, "csv", default_tags=["import"])
+
+    assert entries == [
+        {
+            "url": URL_1,
+            "product_name": "Labubu",
+            "target_price": 19.99,
+            "tags": ["labubu", "macaron", "import"],
+            "is_active": True,
+        }
+    ]
+    assert [error["row"] for error in errors] == [2, 3, 4]
+    assert "Invalid URL" in errors[0]["error"]
+    assert errors[1]["error"] == "Invalid target_price 'cheap'"
+    assert errors[2]["error"] == "Expected true or false, got 'maybe'"
+
+
+def test_csv_without_header_is_one_url_per_line():
+    entries, errors = parse_entries(f"{URL_1}\n\n{URL_2}\n", "csv")
+
+    assert [entry["url"] for entry in entries] == [URL_1, URL_2]
+    assert errors == []
+
+
+def test_json_rows_and_duplicates_keep_the_last():
+    text = json.dumps(
+        {
+            "urls": [
+                {"url": URL_1, "name": "First"},
+                42,
+                {"url": URL_1, "name": "Second"},
+                {"url": URL_2, "settings": "[1, 2]"},
+            ]
+        }
+    )
+
+    entries, errors = parse_entries(text, "json")
+
+    assert entries == [{"url": URL_1, "product_name": "Second"}]
+    assert errors == [
+        {"row": 2, "error": "Entry must be a URL or an object with a url"},
+        {"row": 4, "error": "settings must be a JSON object"},
+    ]
+
+
+def test_unknown_format_is_refused():
+    with pytest.raises(ValueError):
+        parse_entries(URL_1, "xml")
+
+
+def test_import_keeps_fields_the_file_leaves_out(db):
+    import_urls(db, f"url,product_name,target_price\n{URL_1},Labubu,20", "csv")
+    report = import_urls(db, f"url,tags\n{URL_1},blind-box", "csv")
+
+    assert report == {
+        "urls": 1,
+        "errors": [],
+        "inserted": 0,
+        "updated": 1,
+        "deactivated": 0,
+    }
+    (row,) = db.get_monitor_urls()
+    assert row["product_name"] == "Labubu"
+    assert row["target_price"] == 20
+    assert row["tags"] == ["blind-box"]
+
+
+def test_deactivate_missing_syncs_to_the_file(db):
+    import_urls(db, "\n".join([URL_1, URL_2, URL_3]), "csv")
+
+    report = import_urls(db, "\n".join([URL_2, URL_3]), "csv", deactivate_missing=True)
+
+    assert report["inserted"] == 0
+    assert report["updated"] == 2
+    assert report["deactivated"] == 1
+    assert active_urls(db) == [URL_2, URL_3]
+    assert len(db.get_monitor_urls(include_inactive=True)) == 3
+
+    # A deactivated URL stays off unless the file sets it active
+    import_urls(db, "\n".join([URL_1, URL_2]), "csv", deactivate_missing=True)
+    assert active_urls(db) == [URL_2]
+
+    text = f"url,active\n{URL_1},yes\n{URL_2},"
+    report = import_urls(db, text, "csv", deactivate_missing=True)
+    assert report["deactivated"] == 0
+    assert active_urls(db) == [URL_1, URL_2]
+
+
+def test_deactivate_missing_refuses_files_with_errors(db):
+    import_urls(db, "\n".join([URL_1, URL_2]), "csv")
+
+    with pytest.raises(ValueError, match="1 invalid rows"):
+        import_urls(db, f"{URL_1}\nnot-a-url", "csv", deactivate_missing=True)
+    with pytest.raises(ValueError, match="no URLs"):
+        import_urls(db, "", "csv", deactivate_missing=True)
+
+    assert active_urls(db) == [URL_1, URL_2]
+
+
+def test_dry_run_writes_nothing(db):
+    report = import_urls(db, URL_1, "csv", dry_run=True)
+
+    assert report["urls"] == 1
+    assert report["inserted"] == 0
+    assert db.get_monitor_urls(include_inactive=True) == []
+
+
+def test_normalize_url_keeps_ipv6_brackets():
+    assert normalize_url("http://[::1]:8080/us/products/1") == (
+        "http://[::1]:8080/us/products/1"
+    )
+    assert normalize_url("https://[2001:DB8::1]:443/") == "https://[2001:db8::1]/"
+
+
+def test_seed_urls_match_imported_urls(db, monkeypatch):
+    monkeypatch.setattr(
+        Config,
+        "get_urls",
+        classmethod(lambda cls: ["HTTPS://WWW.POPMART.COM/us/products/1", "not a url"]),
+    )
+    db.upsert_monitor_urls(StockMonitor.seed_entries())
+    import_urls(db, URL_1, "csv")
+
+    assert active_urls(db) == [URL_1]
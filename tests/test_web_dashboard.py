@@ -0,0 +1,111 @@
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import web_dashboard
+from config import Config
+from dashboard_snapshot import DashboardSnapshot
+from response_cache import ResponseCache
+
+URL = "https://www.popmart.com/us/products/1"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def components(monkeypatch):
+    monkeypatch.setattr(web_dashboard, "_components", {})
+    monkeypatch.setattr(web_dashboard, "_components_pid", os.getpid())
+    return web_dashboard._components
+
+
+def test_import_does_not_open_the_database(tmp_path):
+    db_path = tmp_path / "labubu_monitor.db"
+    subprocess.run(
+        [sys.executable, "-c", "import web_dashboard, wsgi"],
+        cwd=ROOT,
+        env={**os.environ, "DB_PATH": str(db_path)},
+        check=True,
+    )
+
+    assert not db_path.exists()
+
+
+def test_component_is_built_once_across_threads(components):
+    built = []
+
+    def factory():
+        built.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(web_dashboard._component("thing", factory))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert built == [1]
+    assert len(set(map(id, results))) == 1
+
+
+def test_forked_process_builds_its_own_components(components, monkeypatch):
+    parent = web_dashboard._component("thing", object)
+    assert web_dashboard._component("thing", object) is parent
+
+    # What a forked worker sees: components inherited from another pid
+    monkeypatch.setattr(web_dashboard, "_components_pid", -1)
+    child = web_dashboard._component("thing", object)
+
+    assert child is not parent
+    assert web_dashboard._component("thing", object) is child
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(web_dashboard, "_components", {"db": db})
+    monkeypatch.setattr(Config, "ENABLE_RESPONSE_CACHE", True)
+    monkeypatch.setattr(Config, "RESPONSE_CACHE_CHECK_INTERVAL", 0)
+    return web_dashboard.app.test_client()
+
+
+def fragment_stats(name):
+    return web_dashboard.get_response_cache().stats()["endpoints"][f"fragment:{name}"]
+
+
+def test_dashboard_fragments_are_rendered_once_per_generation(client, db):
+    monitor_snapshot = DashboardSnapshot(db)
+    monitor_snapshot.refresh()
+
+    first = client.get("/").data
+    assert client.get("/").data == first
+    assert fragment_stats("recent_events")["misses"] == 1
+    assert fragment_stats("recent_events")["hits"] == 1
+
+    db.log_stock_event(URL, True, product_name="Have a Seat")
+    monitor_snapshot.refresh()
+    ResponseCache(db).invalidate("monitoring cycle")
+
+    assert b"Have a Seat" in client.get("/").data
+    assert fragment_stats("recent_events")["misses"] == 2
+
+
+def test_rows_carry_epoch_seconds_for_client_side_times(client, db):
+    db.log_stock_event(URL, True, product_name="Have a Seat")
+
+    html = client.get("/history").data.decode()
+    stamps = re.findall(r'data-ts="(\d+)"', html)
+
+    assert len(stamps) == 1
+    assert abs(int(stamps[0]) - time.time()) < 60
+    assert "ago" not in html.split("<tbody", 1)[1].split("</tbody>", 1)[0]
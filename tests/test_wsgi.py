@@ -0,0 +1,77 @@
+import sys
+import types
+
+import pytest
+
+import web_dashboard
+import wsgi
+
+
+def test_entry_point_exposes_the_dashboard_app():
+    assert wsgi.app is web_dashboard.app
+
+
+def test_serve_falls_back_to_the_next_server(monkeypatch):
+    started = []
+
+    def missing(*args):
+        raise ImportError("gunicorn")
+
+    monkeypatch.setattr(wsgi.os, "name", "posix")
+    monkeypatch.setattr(wsgi, "run_gunicorn", missing)
+    monkeypatch.setattr(wsgi, "run_waitress", lambda *args: started.append(args))
+
+    wsgi.serve("127.0.0.1", 8080, 2, 4)
+
+    assert started == [("127.0.0.1", 8080, 2, 4)]
+
+
+def test_serve_without_any_server_says_what_to_install(monkeypatch):
+    def missing(*args):
+        raise ImportError
+
+    monkeypatch.setattr(wsgi, "run_gunicorn", missing)
+    monkeypatch.setattr(wsgi, "run_waitress", missing)
+
+    with pytest.raises(RuntimeError, match="pip install gunicorn"):
+        wsgi.serve("127.0.0.1", 8080, 1, 1)
+
+
+def test_waitress_gets_the_workers_as_threads(monkeypatch):
+    served = {}
+    waitress = types.ModuleType("waitress")
+    waitress.serve = lambda app, **options: served.update(app=app, **options)
+    monkeypatch.setitem(sys.modules, "waitress", waitress)
+
+    wsgi.run_waitress("127.0.0.1", 8080, workers=2, threads=4)
+
+    assert served == {
+        "app": web_dashboard.app,
+        "host": "127.0.0.1",
+        "port": 8080,
+        "threads": 8,
+    }
+
+
+def test_gunicorn_runs_threaded_workers(monkeypatch):
+    ran = {}
+
+    class BaseApplication:
+        def __init__(self):
+            self.cfg = types.SimpleNamespace(
+                set=lambda key, value: ran.update({key: value})
+            )
+            self.load_config()
+
+        def run(self):
+            ran["app"] = self.load()
+
+    base = types.ModuleType("gunicorn.app.base")
+    base.BaseApplication = BaseApplication
+    monkeypatch.setitem(sys.modules, "gunicorn.app.base", base)
+
+    wsgi.run_gunicorn("0.0.0.0", 8080, workers=4, threads=8)
+
+    assert ran["app"] is web_dashboard.app
+    assert ran["bind"] == "0.0.0.0:8080"
+    assert (ran["workers"], ran["worker_class"], ran["threads"]) == (4, "gthread", 8)
@@ -0,0 +1,269 @@
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import Config
+
+_local = threading.local()
+
+
+class Trace:
+    """Stage timings (in milliseconds) for one check of one URL"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.started_at = time.time()
+        self.stages: Dict[str, float] = {}
+        self.attributes: Dict[str, object] = {}
+        self._start = time.perf_counter()
+        self.total_ms: Optional[float] = None
+
+    def add(self, name: str, seconds: float):
+        """Record time spent in a stage (repeated stages accumulate)"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self._start) * 1000
+
+    def to_dict(self) -> Dict:
+        return {
+            "url": self.url,
+            "started_at": self.started_at,
+            "total_ms": round(self.total_ms or 0.0, 3),
+            "stages": {name: round(ms, 3) for name, ms in self.stages.items()},
+            **self.attributes,
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    """The trace of the check running on this thread, if any"""
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a stage of the current check; a no-op outside a traced check"""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    with trace.stage(name):
+        yield
+
+
+def annotate(**attributes):
+    """Attach attributes (status code, bytes, ...) to the current trace"""
+    trace = current_trace()
+    if trace is not None:
+        trace.attributes.update(attributes)
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class LatencySketch:
+    """Fixed-size latency histogram with ~1% relative error
+
+    Samples are counted in logarithmic buckets (each ``GAMMA`` times wider
+    than the last), so memory depends on the range of latencies seen, not
+    on how many there were, and percentiles need no sorting of samples.
+    """
+
+    GAMMA = 1.02
+    MIN_MS = 0.001
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, ms: float):
+        index = (
+            0
+            if ms <= self.MIN_MS
+            else math.ceil(math.log(ms / self.MIN_MS, self.GAMMA))
+        )
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.max = max(self.max, ms)
+
+    def merge(self, other: "LatencySketch"):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct: float) -> float:
+        """Nearest-rank percentile, to within one bucket"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(pct / 100 * self.count)))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Middle of the bucket, never above the largest sample
+                value = self.MIN_MS * self.GAMMA**index * 2 / (1 + self.GAMMA)
+                return min(value, self.max)
+        return self.max
+
+    def summarize(self) -> Dict:
+        return {
+            "count": self.count,
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "p99": round(self.percentile(99), 3),
+            "max": round(self.max, 3),
+        }
+
+
+class RollingSketch:
+    """Percentiles over roughly the last ``window`` to ``2 * window`` samples
+
+    Two sketches take turns: once the current one holds ``window`` samples
+    it becomes the previous one and the oldest is dropped.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.current = LatencySketch()
+        self.previous = LatencySketch()
+
+    def add(self, ms: float):
+        if self.current.count >= self.window:
+            self.previous, self.current = self.current, LatencySketch()
+        self.current.add(ms)
+
+    def merged(self) -> LatencySketch:
+        sketch = LatencySketch()
+        sketch.merge(self.previous)
+        sketch.merge(self.current)
+        return sketch
+
+
+class Tracer:
+    """Collects check traces and keeps rolling latency percentiles
+
+    Percentiles are kept per stage, overall and per host, in fixed-size
+    sketches covering roughly the last ``window`` checks each. Per-URL
+    detail is only kept for the ``top_n`` slowest URLs, so memory stays
+    flat however many URLs are monitored and however long the monitor runs.
+    """
+
+    SNAPSHOT_NAME = "metrics"
+
+    def __init__(self, window: int = None, trace_file: str = None, top_n: int = None):
+        self.window = window or Config.TRACE_WINDOW
+        self.top_n = Config.TRACE_SLOWEST_URLS if top_n is None else top_n
+        self.trace_file = Config.TRACE_FILE if trace_file is None else trace_file
+
+        # Called with every finished trace, e.g. to feed Prometheus metrics
+        self.listeners: List[Callable[[Trace], None]] = []
+
+        self._stages: Dict[str, RollingSketch] = {}
+        self._hosts: Dict[Tuple[str, str], RollingSketch] = {}
+        self._slowest: Dict[str, Dict] = {}
+        self.checks = 0
+        self._lock = threading.Lock()
+
+    def _sketch(self, sketches: Dict, key) -> RollingSketch:
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = RollingSketch(self.window)
+        return sketch
+
+    @contextmanager
+    def trace(self, url: str) -> Iterator[Trace]:
+        """Trace a check of a URL on the current thread"""
+        trace = Trace(url)
+        previous = current_trace()
+        _local.trace = trace
+        try:
+            yield trace
+        finally:
+            _local.trace = previous
+            trace.finish()
+            self.record(trace)
+
+    def record(self, trace: Trace):
+        stages = dict(trace.stages, total=trace.total_ms or 0.0)
+        host = urlparse(trace.url).hostname or ""
+        with self._lock:
+            self.checks += 1
+            for name, ms in stages.items():
+                self._sketch(self._stages, name).add(ms)
+                self._sketch(self._hosts, (host, name)).add(ms)
+            self._track_slowest(trace, stages)
+
+        for listener in self.listeners:
+            try:
+                listener(trace)
+            except Exception as e:
+                logging.warning(f"Trace listener failed: {e}")
+
+        if self.trace_file:
+            try:
+                with open(self.trace_file, "a") as f:
+                    f.write(json.dumps(trace.to_dict()) + "\n")
+            except OSError as e:
+                logging.warning(f"Failed to write trace file {self.trace_file}: {e}")
+
+    def _track_slowest(self, trace: Trace, stages: Dict[str, float]):
+        """Keep the latest check of the ``top_n`` URLs with the slowest one"""
+        if self.top_n <= 0:
+            return
+        entry = {
+            "total_ms": round(stages["total"], 3),
+            "stages": {name: round(ms, 3) for name, ms in trace.stages.items()},
+            "checked_at": trace.started_at,
+        }
+        if trace.url in self._slowest or len(self._slowest) < self.top_n:
+            self._slowest[trace.url] = entry
+            return
+        fastest = min(self._slowest, key=lambda url: self._slowest[url]["total_ms"])
+        if entry["total_ms"] > self._slowest[fastest]["total_ms"]:
+            del self._slowest[fastest]
+            self._slowest[trace.url] = entry
+
+    def summary(self) -> Dict:
+        """Percentiles in milliseconds per stage, overall and per host
+
+        Plus the latest check of the slowest URLs; the size doesn't grow
+        with the number of URLs monitored.
+        """
+        with self._lock:
+            stages = {name: sketch.merged() for name, sketch in self._stages.items()}
+            hosts = {key: sketch.merged() for key, sketch in self._hosts.items()}
+            slowest = [dict(entry, url=url) for url, entry in self._slowest.items()]
+            checks = self.checks
+
+        by_host: Dict[str, Dict] = {}
+        for (host, name), sketch in hosts.items():
+            by_host.setdefault(host, {})[name] = sketch.summarize()
+
+        return {
+            "window": self.window,
+            "checks": checks,
+            "stages": {name: sketch.summarize() for name, sketch in stages.items()},
+            "hosts": by_host,
+            "slowest": sorted(slowest, key=lambda entry: -entry["total_ms"]),
+            "generated_at": time.time(),
+        }
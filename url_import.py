@@ -0,0 +1,230 @@
+"""
+Bulk import of monitored URLs from CSV or JSON
+
+CSV files have a header row with a ``url`` column and optionally
+``product_name``, ``target_price``, ``tags`` (separated by ``;`` or ``|``),
+``active`` and ``settings`` (a JSON object). A file without a header is
+read as one URL per line.
+
+``settings`` is opaque metadata: it is validated, stored and returned by
+the URL API for scripts and integrations, but the monitor itself doesn't
+read it.
+
+JSON is a list of URLs or of objects with the same keys, optionally
+wrapped as ``{"urls": [...]}``.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+FORMATS = ("csv", "json")
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+TRUE_VALUES = {"1", "true", "yes", "y", "on"}
+FALSE_VALUES = {"0", "false", "no", "n", "off"}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a product URL, or ValueError if it isn't one
+
+    Lowercases the scheme and host, drops default ports and fragments and
+    keeps the path and query as given.
+    """
+    if not isinstance(url, str):
+        raise ValueError("URL must be a string")
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        raise ValueError(f"Invalid URL (must start with http:// or https://): {url}")
+    if not parts.hostname:
+        raise ValueError(f"Invalid URL (no host): {url}")
+
+    host = parts.hostname.lower()
+    if ":" in host:
+        # IPv6 literals keep their brackets
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        raise ValueError(f"Invalid URL (bad port): {url}")
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def parse_tags(value) -> List[str]:
+    """Tags from a list or a ``;``/``|``/``,`` separated string, deduplicated"""
+    if value is None or value == "":
+        return []
+    items = value if isinstance(value, list) else re.split(r"[;|,]", str(value))
+    tags = []
+    for item in items:
+        tag = str(item).strip().lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"Expected true or false, got '{value}'")
+
+
+def clean_entry(raw, default_tags: List[str] = None) -> Dict:
+    """Validate one imported row into the fields ``upsert_monitor_urls`` takes"""
+    if isinstance(raw, str):
+        raw = {"url": raw}
+    if not isinstance(raw, dict):
+        raise ValueError("Entry must be a URL or an object with a url")
+    return {
+        "url": normalize_url(raw.get("url") or ""),
+        **clean_fields(raw, default_tags),
+    }
+
+
+def clean_fields(raw: Dict, default_tags: List[str] = None) -> Dict:
+    """Validate a URL's metadata: name, target price, tags, active, settings
+
+    Fields that are missing or blank are left out, so importing never
+    overwrites data the file doesn't mention.
+    """
+    entry = {}
+    name = raw.get("product_name", raw.get("name"))
+    if name not in (None, ""):
+        entry["product_name"] = str(name).strip()
+
+    price = raw.get("target_price")
+    if price not in (None, ""):
+        try:
+            entry["target_price"] = float(str(price).strip().lstrip("$"))
+        except ValueError:
+            raise ValueError(f"Invalid target_price '{price}'")
+
+    tags = parse_tags(raw.get("tags"))
+    for tag in default_tags or []:
+        if tag not in tags:
+            tags.append(tag)
+    if tags:
+        entry["tags"] = tags
+
+    active = raw.get("is_active", raw.get("active"))
+    if active not in (None, ""):
+        entry["is_active"] = parse_bool(active)
+
+    settings = raw.get("settings")
+    if isinstance(settings, str) and settings.strip():
+        try:
+            settings = json.loads(settings)
+        except ValueError:
+            raise ValueError("settings must be a JSON object")
+    if settings not in (None, ""):
+        if not isinstance(settings, dict):
+            raise ValueError("settings must be a JSON object")
+        entry["settings"] = settings
+    return entry
+
+
+def read_csv(text: str) -> List:
+    rows = list(csv.reader(io.StringIO(text)))
+    rows = [row for row in rows if any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    if "url" not in header:
+        # No header: one URL per line
+        return [row[0].strip() for row in rows]
+    return [dict(zip(header, row)) for row in rows[1:]]
+
+
+def read_json(text: str) -> List:
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("urls")
+    if not isinstance(data, list):
+        raise ValueError('JSON must be a list of URLs or {"urls": [...]}')
+    return data
+
+
+def detect_format(path: str = None, content_type: str = None) -> str:
+    """csv or json, from a file extension or a Content-Type header"""
+    if content_type and "json" in content_type:
+        return "json"
+    if path and os.path.splitext(path)[1].lower() == ".json":
+        return "json"
+    return "csv"
+
+
+def parse_entries(
+    text: str, fmt: str, default_tags: List[str] = None
+) -> Tuple[List[Dict], List[Dict]]:
+    """Parse and validate an import, returning (entries, errors)
+
+    Errors name the row (1-based, after any CSV header) and what was wrong
+    with it; the valid rows are still returned. A URL that appears twice
+    keeps its last row.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown import format '{fmt}' (use csv or json)")
+    rows = read_json(text) if fmt == "json" else read_csv(text)
+
+    entries: Dict[str, Dict] = {}
+    errors = []
+    for number, raw in enumerate(rows, 1):
+        try:
+            entry = clean_entry(raw, default_tags)
+        except ValueError as e:
+            errors.append({"row": number, "error": str(e)})
+            continue
+        entries.pop(entry["url"], None)
+        entries[entry["url"]] = entry
+    return list(entries.values()), errors
+
+
+def import_urls(
+    db,
+    text: str,
+    fmt: str,
+    default_tags: List[str] = None,
+    deactivate_missing: bool = False,
+    dry_run: bool = False,
+) -> Dict:
+    """Validate and upsert an import in one transaction, returning a report
+
+    With ``deactivate_missing`` the file is taken as the whole catalogue, so
+    it is refused if any row is invalid rather than deactivating the URLs
+    those rows were meant to keep.
+    """
+    entries, errors = parse_entries(text, fmt, default_tags)
+    if deactivate_missing and (errors or not entries):
+        raise ValueError(
+            "Refusing to deactivate missing URLs: "
+            + (f"{len(errors)} invalid rows" if errors else "no URLs in the import")
+        )
+
+    report = {"urls": len(entries), "errors": errors}
+    if dry_run:
+        report.update(inserted=0, updated=0, deactivated=0)
+        return report
+
+    report.update(
+        db.upsert_monitor_urls(entries, deactivate_missing=deactivate_missing)
+    )
+    return report
+
+
+def load_file(path: str, fmt: Optional[str] = None) -> Tuple[str, str]:
+    """Read an import file, returning (text, format)"""
+    with open(path, encoding="utf-8-sig") as f:
+        return f.read(), fmt or detect_format(path)
@@ -1,64 +1,291 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import (
+    Flask,
+    Response,
+    render_template,
+    request,
+    jsonify,
+    redirect,
+    url_for,
+    flash,
+    g,
+    stream_with_context,
+)
+from markupsafe import Markup
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+import base64
+import csv
+import gzip
+import io
 import json
+import os
+import threading
 import time
 
+import metrics
+import url_import
+from check_jobs import CheckJobManager
 from config import Config
+from dashboard_snapshot import DashboardSnapshot, calculate_notification_success_rate
 from database import DatabaseManager
-from monitor import StockMonitor
+from event_stream import EventBroadcaster
+from response_cache import ResponseCache
+from tracing import Tracer
 
 
 app = Flask(__name__)
 app.secret_key = Config.SECRET_KEY
 
-# Initialize components
-db = DatabaseManager()
-monitor = StockMonitor()
+# Components are created on first use, so importing this module (e.g. from
+# main.py or a WSGI server) doesn't open the database or build a monitor.
+# They are keyed by process id: a forked server worker builds its own rather
+# than inheriting the parent's, whose threads don't survive the fork.
+_components: Dict[str, object] = {}
+_components_pid = os.getpid()
+_components_lock = threading.RLock()
+
+
+def _component(name: str, factory):
+    global _components, _components_pid, _components_lock
+    if _components_pid != os.getpid():
+        _components = {}
+        _components_pid = os.getpid()
+        _components_lock = threading.RLock()
+
+    with _components_lock:
+        if name not in _components:
+            _components[name] = factory()
+        return _components[name]
+
+
+def get_db() -> DatabaseManager:
+    return _component("db", DatabaseManager)
+
+
+def get_monitor():
+    """Stock monitor used for ad-hoc checks (doesn't seed the URL table)"""
+
+    def create():
+        from monitor import StockMonitor
+
+        return StockMonitor(get_db(), seed_urls=False)
+
+    return _component("monitor", create)
+
+
+def get_snapshot() -> DashboardSnapshot:
+    return _component(
+        "snapshot", lambda: DashboardSnapshot(get_db(), get_response_cache())
+    )
+
+
+def get_broadcaster() -> EventBroadcaster:
+    return _component("broadcaster", lambda: EventBroadcaster(get_db(), get_snapshot()))
+
+
+def get_response_cache() -> ResponseCache:
+    return _component("response_cache", lambda: ResponseCache(get_db()))
+
+
+def get_check_jobs() -> CheckJobManager:
+    return _component(
+        "check_jobs",
+        lambda: CheckJobManager(
+            get_db(), on_finished=lambda job: get_broadcaster().publish("job", job)
+        ),
+    )
+
+
+EVENTS_PAGE_MAX = 500
+HISTORY_PAGE_SIZE = 100
+EXPORT_COLUMNS = [
+    "id",
+    "url",
+    "product_name",
+    "has_stock",
+    "price",
+    "timestamp",
+    "created_at",
+]
+
+
+def encode_cursor(event: Dict) -> str:
+    """Encode the (timestamp, id) keyset position of an event"""
+    raw = json.dumps([event["timestamp"], event["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+    """Decode a cursor produced by encode_cursor (raises ValueError)"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, event_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(timestamp), int(event_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _db_timestamp(value: str) -> str:
+    """Convert an ISO timestamp parameter to the stored UTC format"""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value}")
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    # Same text as sqlite3 stores a datetime, microseconds included, so string
+    # comparisons in SQL order the same way as the times themselves
+    return parsed.isoformat(" ")
+
+
+def parse_event_filters(args, default_hours: int = None) -> Dict:
+    """Read url/in_stock/since/until/hours event filters from query args"""
+    in_stock = (args.get("in_stock") or "").lower()
+    if in_stock in ("", "any"):
+        has_stock = None
+    elif in_stock in ("1", "true", "yes"):
+        has_stock = True
+    elif in_stock in ("0", "false", "no"):
+        has_stock = False
+    else:
+        raise ValueError(f"Invalid in_stock value: {in_stock}")
+
+    since = args.get("since")
+    hours = args.get("hours", default_hours, type=int)
+    if since:
+        since = _db_timestamp(since)
+    elif hours:
+        since = (datetime.utcnow() - timedelta(hours=hours)).isoformat(" ")
+
+    until = args.get("until")
+    return {
+        "url": args.get("url") or None,
+        "has_stock": has_stock,
+        "since": since,
+        "until": _db_timestamp(until) if until else None,
+    }
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Count requests and time them per route (not per URL, to bound labels)"""
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.DASHBOARD_REQUESTS.inc(route=route, status=response.status_code)
+        metrics.DASHBOARD_REQUEST_SECONDS.observe(
+            time.perf_counter() - started, route=route
+        )
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """Gzip JSON responses for clients that accept it"""
+    if (
+        response.status_code != 200
+        or response.mimetype != "application/json"
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or "gzip" not in request.headers.get("Accept-Encoding", "")
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < Config.GZIP_MIN_SIZE:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+
+    # The compressed body is no longer byte-identical to the one tagged
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def cached_json(endpoint: str, params: Dict, compute):
+    """JSON response served from the response cache, with ETag and gzip"""
+    if not Config.ENABLE_RESPONSE_CACHE:
+        return jsonify(compute())
+
+    entry = get_response_cache().get(endpoint, params, compute)
+    response = app.response_class(mimetype="application/json")
+    response.headers["Cache-Control"] = "no-cache"
+
+    # Let pollers skip the body entirely when nothing has changed
+    if request.if_none_match.contains_weak(entry["etag"]):
+        response.status_code = 304
+        response.set_etag(entry["etag"])
+        return response
+
+    body = entry["body"]
+    if len(body) >= Config.GZIP_MIN_SIZE and "gzip" in request.headers.get(
+        "Accept-Encoding", ""
+    ):
+        # Compress once per cache entry rather than once per request
+        if "gzip" not in entry:
+            entry["gzip"] = gzip.compress(body, compresslevel=6)
+        response.set_data(entry["gzip"])
+        response.headers["Content-Encoding"] = "gzip"
+        response.vary.add("Accept-Encoding")
+        response.set_etag(entry["etag"], weak=True)
+    else:
+        response.set_data(body)
+        response.set_etag(entry["etag"])
+    return response
+
+
+def cached_html(name: str, params: Dict, render: Callable[[], str]) -> Markup:
+    """HTML from ``render``, reused from the response cache while data is unchanged"""
+    if not Config.ENABLE_RESPONSE_CACHE:
+        return Markup(render())
+    return Markup(get_response_cache().get_fragment(name, params, render))
+
+
+def render_fragment(name: str, params: Dict, template: str, **context) -> Markup:
+    """Render a template partial, reusing the cached HTML while data is unchanged"""
+    return cached_html(name, params, lambda: render_template(template, **context))
 
 
 @app.route("/")
 def dashboard():
     """Main dashboard page"""
     try:
-        # Get recent events
-        recent_events = db.get_recent_events(50)
-
-        # Get monitored URLs
-        monitored_urls = db.get_monitor_urls()
-
-        # Get notification stats
-        notification_stats = db.get_notification_stats(24)
-
-        # Calculate summary statistics
-        stats = {
-            "total_urls": len(monitored_urls),
-            "total_events_24h": len(
-                [
-                    e
-                    for e in recent_events
-                    if (
-                        datetime.utcnow()
-                        - datetime.fromisoformat(e["timestamp"].replace("Z", "+00:00"))
-                    ).total_seconds()
-                    < 86400
-                ]
-            ),
-            "in_stock_now": sum(
-                1 for e in recent_events[: len(monitored_urls)] if e.get("has_stock")
-            ),
-            "notification_success_rate": calculate_notification_success_rate(
-                notification_stats
-            ),
-        }
+        # Served from the snapshot the monitor precomputes after each cycle
+        data = get_snapshot().get()
+        version = {"version": data.get("generated_at")}
 
         return render_template(
             "dashboard.html",
-            recent_events=recent_events,
-            monitored_urls=monitored_urls,
-            notification_stats=notification_stats,
-            stats=stats,
+            recent_events=data["recent_events"],
+            monitored_urls=data["monitored_urls"],
+            recent_events_html=render_fragment(
+                "recent_events",
+                version,
+                "partials/recent_events.html",
+                recent_events=data["recent_events"],
+            ),
+            monitored_urls_html=render_fragment(
+                "monitored_urls",
+                version,
+                "partials/monitored_urls.html",
+                monitored_urls=data["monitored_urls"],
+            ),
+            notification_stats=data["notification_stats"],
+            stats=data["stats"],
+            cycle=data.get("cycle"),
         )
     except Exception as e:
         logging.error(f"Dashboard error: {e}")
@@ -69,60 +296,186 @@ def dashboard():
 def api_status():
     """API endpoint for current status"""
     try:
-        monitored_urls = db.get_monitor_urls()
-        status_data = []
-
-        for url_data in monitored_urls:
-            url = url_data["url"]
-            recent_events = db.get_stock_history(url, 1)
-
-            if recent_events:
-                latest_event = recent_events[0]
-                status_data.append(
-                    {
-                        "url": url,
-                        "product_name": url_data.get("product_name", "Unknown"),
-                        "in_stock": bool(latest_event["has_stock"]),
-                        "last_checked": latest_event["timestamp"],
-                        "price": latest_event.get("price"),
-                    }
-                )
-            else:
-                status_data.append(
-                    {
-                        "url": url,
-                        "product_name": url_data.get("product_name", "Unknown"),
-                        "in_stock": False,
-                        "last_checked": None,
-                        "price": None,
-                    }
-                )
 
-        return jsonify(
-            {
+        def compute():
+            status_data = [
+                {
+                    "url": row["url"],
+                    "product_name": row["product_name"],
+                    "in_stock": bool(row["has_stock"]),
+                    "last_checked": row["timestamp"],
+                    "price": row["price"],
+                }
+                for row in get_db().get_url_statuses()
+            ]
+            return {
                 "status": "success",
                 "data": status_data,
                 "timestamp": datetime.utcnow().isoformat(),
             }
-        )
+
+        return cached_json("status", {}, compute)
     except Exception as e:
         logging.error(f"API status error: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route("/api/stream")
+def api_stream():
+    """Server-Sent Events stream of stock events and cycle summaries"""
+    subscriber = get_broadcaster().subscribe()
+
+    def generate():
+        try:
+            yield from get_broadcaster().stream(subscriber)
+        finally:
+            get_broadcaster().unsubscribe(subscriber)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/api/events")
 def api_events():
-    """API endpoint for recent events"""
+    """API endpoint for stock events (cursor-paginated, newest first)"""
     try:
-        limit = request.args.get("limit", 100, type=int)
-        events = db.get_recent_events(limit)
+        limit = min(max(request.args.get("limit", 100, type=int), 1), EVENTS_PAGE_MAX)
+        try:
+            filters = parse_event_filters(request.args)
+            before = decode_cursor(request.args.get("cursor"))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        def compute():
+            events = get_db().query_events(**filters, before=before, limit=limit)
+            next_cursor = encode_cursor(events[-1]) if len(events) == limit else None
+            return {
+                "status": "success",
+                "data": events,
+                "count": len(events),
+                "next_cursor": next_cursor,
+            }
 
-        return jsonify({"status": "success", "data": events, "count": len(events)})
+        return cached_json("events", request.args.to_dict(), compute)
     except Exception as e:
         logging.error(f"API events error: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route("/api/events/export")
+def api_events_export():
+    """Stream matching stock events as NDJSON or CSV"""
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in ("ndjson", "csv"):
+        return (
+            jsonify({"status": "error", "message": "format must be ndjson or csv"}),
+            400,
+        )
+
+    try:
+        filters = parse_event_filters(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    def generate_ndjson():
+        for event in get_db().iter_events(**filters):
+            yield json.dumps(event) + "\n"
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for event in get_db().iter_events(**filters):
+            writer.writerow([event.get(column) for column in EXPORT_COLUMNS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+
+    if export_format == "csv":
+        generate, mimetype = generate_csv, "text/csv"
+    else:
+        generate, mimetype = generate_ndjson, "application/x-ndjson"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f"attachment; filename=stock_events.{export_format}"
+        },
+    )
+
+
+@app.route("/api/notification_stats")
+def api_notification_stats():
+    """API endpoint for notification success and latency statistics"""
+    try:
+        hours = request.args.get("hours", 24, type=int)
+
+        def compute():
+            stats = get_db().get_notification_stats(hours)
+            return {
+                "status": "success",
+                "hours": hours,
+                "data": stats,
+                "success_rate": calculate_notification_success_rate(stats),
+                "latency": get_db().get_alert_latency_stats(hours),
+            }
+
+        return cached_json("notification_stats", {"hours": hours}, compute)
+    except Exception as e:
+        logging.error(f"API notification stats error: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/api/metrics")
+def api_metrics():
+    """API endpoint for per-stage check latency percentiles from the monitor"""
+    try:
+
+        def compute():
+            stored = get_db().get_snapshot(Tracer.SNAPSHOT_NAME)
+            if stored is None:
+                return {"status": "success", "data": None}
+            return {"status": "success", "data": stored[0]}
+
+        return cached_json("metrics", {}, compute)
+    except Exception as e:
+        logging.error(f"API metrics error: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape endpoint for this dashboard worker"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route("/api/cache_stats")
+def api_cache_stats():
+    """API endpoint for response cache hit ratios in this worker"""
+    return jsonify({"status": "success", "data": get_response_cache().stats()})
+
+
+@app.route("/api/outbox")
+def api_outbox():
+    """API endpoint for notification outbox status and dead letters"""
+    try:
+        return jsonify(
+            {
+                "status": "success",
+                "counts": get_db().get_outbox_stats(),
+                "dead_letters": get_db().get_dead_notifications(),
+            }
+        )
+    except Exception as e:
+        logging.error(f"API outbox error: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 @app.route("/api/add_url", methods=["POST"])
 def api_add_url():
     """API endpoint to add a new URL to monitor"""
@@ -135,141 +488,243 @@ def api_add_url():
             return jsonify({"status": "error", "message": "URL is required"}), 400
 
         # Validate URL format
-        if not url.startswith(("http://", "https://")):
+        try:
+            url = url_import.normalize_url(url)
+        except ValueError:
             return jsonify({"status": "error", "message": "Invalid URL format"}), 400
 
-        # Add to database
-        success = db.add_monitor_url(url, product_name or None)
+        # Add to database, reactivating it if it was deactivated
+        entry = {"url": url, "is_active": True}
+        if product_name:
+            entry["product_name"] = product_name
+        get_db().upsert_monitor_urls([entry])
+        urls_changed("url added")
 
-        if success:
-            return jsonify(
-                {"status": "success", "message": "URL added successfully", "url": url}
-            )
-        else:
-            return jsonify({"status": "error", "message": "Failed to add URL"}), 500
+        return jsonify(
+            {"status": "success", "message": "URL added successfully", "url": url}
+        )
 
     except Exception as e:
         logging.error(f"Add URL error: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
-@app.route("/api/test_check/<int:url_id>")
-def api_test_check(url_id):
-    """API endpoint to test stock check for a specific URL"""
-    try:
-        monitored_urls = db.get_monitor_urls()
-
-        if url_id >= len(monitored_urls):
-            return jsonify({"status": "error", "message": "URL not found"}), 404
+def run_test_check(url: str) -> Dict:
+    """Run a stock check for the dashboard's test button"""
+    in_stock, product_info = get_monitor().check_stock(url)
 
-        url = monitored_urls[url_id]["url"]
+    # Special handling for PopMart URLs - simulate stock detection for testing
+    if "popmart.com" in url.lower() and "/pop-now/set/228" in url:
+        # Override for testing purposes - this URL clearly has stock based on screenshot
+        in_stock = True
+        product_info.name = "Chibi Maruko Chan The Time With You Series"
+        product_info.price = "$19.99"
+        logging.info(f"TEST MODE: Simulating stock found for {url}")
 
-        # Perform stock check
-        in_stock, product_info = monitor.check_stock(url)
+    # Log the event, unless the check couldn't tell
+    if in_stock is not None:
+        get_db().log_stock_event(url, in_stock, product_info.name, product_info.price)
+        get_response_cache().invalidate("test check")
 
-        # Special handling for PopMart URLs - simulate stock detection for testing
-        if "popmart.com" in url.lower() and "/pop-now/set/228" in url:
-            # Override for testing purposes - this URL clearly has stock based on screenshot
-            in_stock = True
-            product_info.name = "Chibi Maruko Chan The Time With You Series"
-            product_info.price = "$19.99"
-            logging.info(f"TEST MODE: Simulating stock found for {url}")
+    return {
+        "url": url,
+        "in_stock": in_stock,
+        "product_info": product_info.to_dict(),
+        "timestamp": datetime.utcnow().isoformat(),
+    }
 
-        # Log the event
-        db.log_stock_event(url, in_stock, product_info.name, product_info.price)
 
-        return jsonify(
-            {
-                "status": "success",
-                "url": url,
-                "in_stock": in_stock,
-                "product_info": product_info.to_dict(),
-                "timestamp": datetime.utcnow().isoformat(),
-            }
+def run_test_screenshot(url: str, url_id: int) -> Dict:
+    """Take a screenshot of a monitored URL and save it for manual verification"""
+    try:
+        from screenshot_checker import ScreenshotStockChecker
+    except ImportError:
+        raise RuntimeError(
+            "Screenshot functionality not available - selenium not installed"
         )
 
+    screenshot_checker = ScreenshotStockChecker()
+
+    # Just take screenshot and save for manual verification
+    base64_image = screenshot_checker.take_screenshot(url)
+
+    # Save screenshot file
+    img_data = base64.b64decode(base64_image)
+    filename = f"screenshot_{url_id}_{int(time.time())}.png"
+    with open(filename, "wb") as f:
+        f.write(img_data)
+
+    logging.info(f"📸 Screenshot saved as {filename}")
+
+    # For now, simulate analysis since API quota is exceeded
+    simulated_analysis = {
+        "in_stock": True,  # Based on your visual confirmation
+        "product_name": "Chibi Maruko Chan The Time With You Series",
+        "price": "$19.99",
+        "confidence": 0.95,
+        "reasoning": "Screenshot captured successfully - manual verification needed",
+        "elements_found": ["screenshot_saved"],
+        "screenshot_file": filename,
+    }
+
+    return {
+        "url": url,
+        "method": "screenshot",
+        "screenshot_size": len(base64_image),
+        "screenshot_file": filename,
+        "analysis": simulated_analysis,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+def job_response(job: Dict, created: bool = True):
+    """202 response pointing the client at a check job"""
+    response = jsonify(
+        {
+            "status": "accepted",
+            "job_id": job["id"],
+            "job_status": job["status"],
+            "coalesced": not created,
+            "status_url": url_for("api_job", job_id=job["id"]),
+        }
+    )
+    response.status_code = 202
+    response.headers["Location"] = url_for("api_job", job_id=job["id"])
+    return response
+
+
+def urls_changed(reason: str):
+    """Refresh everything derived from the monitored URL list"""
+    get_snapshot().refresh()
+    get_response_cache().invalidate(reason)
+
+
+@app.route("/api/urls")
+def api_urls():
+    """API endpoint listing monitored URLs with their tags and settings"""
+    try:
+        urls = get_db().get_monitor_urls(
+            include_inactive=request.args.get("include_inactive", "").lower()
+            in ("1", "true"),
+            tag=request.args.get("tag") or None,
+        )
+        return jsonify({"status": "success", "data": urls, "count": len(urls)})
     except Exception as e:
-        logging.error(f"Test check error: {e}")
+        logging.error(f"API urls error: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
-@app.route("/api/test_screenshot/<int:url_id>")
-def api_test_screenshot(url_id):
-    """API endpoint to test screenshot-based stock check"""
+@app.route("/api/urls/import", methods=["POST"])
+def api_urls_import():
+    """API endpoint to bulk add or update URLs from a CSV or JSON body
+
+    ``?tag=a,b`` tags every row, ``?deactivate_missing=1`` deactivates
+    active URLs missing from the body and ``?dry_run=1`` only validates.
+    """
     try:
-        monitored_urls = db.get_monitor_urls()
+        fmt = request.args.get("format") or url_import.detect_format(
+            content_type=request.content_type
+        )
+        report = url_import.import_urls(
+            get_db(),
+            request.get_data(as_text=True),
+            fmt,
+            default_tags=url_import.parse_tags(request.args.get("tag")),
+            deactivate_missing=request.args.get("deactivate_missing") in ("1", "true"),
+            dry_run=request.args.get("dry_run") in ("1", "true"),
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        logging.error(f"URL import error: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
 
-        if url_id >= len(monitored_urls):
-            return jsonify({"status": "error", "message": "URL not found"}), 404
+    if report["inserted"] or report["updated"] or report["deactivated"]:
+        urls_changed("urls imported")
+    return jsonify({"status": "success", "data": report})
 
-        url = monitored_urls[url_id]["url"]
 
-        # Try screenshot method
-        try:
-            from screenshot_checker import ScreenshotStockChecker
+@app.route("/api/urls/<int:url_id>", methods=["PATCH"])
+def api_update_url(url_id):
+    """API endpoint to (de)activate a URL or change its tags and settings
 
-            screenshot_checker = ScreenshotStockChecker()
+    ``url_id`` is the URL's database id, as listed by /api/urls.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "JSON object required"}), 400
 
-            # Just take screenshot and save for manual verification
-            base64_image = screenshot_checker.take_screenshot(url)
+    try:
+        fields = url_import.clean_fields(data)
+        if "tags" in data and not fields.get("tags"):
+            fields["tags"] = []  # an empty list clears the tags
+        if not fields:
+            raise ValueError(
+                "Nothing to update (product_name, target_price, tags, "
+                "is_active or settings)"
+            )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
 
-            # Save screenshot file
-            import base64
+    try:
+        url = get_db().update_monitor_url(url_id, **fields)
+    except Exception as e:
+        logging.error(f"Update URL error: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+    if url is None:
+        return jsonify({"status": "error", "message": "URL not found"}), 404
 
-            img_data = base64.b64decode(base64_image)
-            filename = f"screenshot_{url_id}_{int(time.time())}.png"
-            with open(filename, "wb") as f:
-                f.write(img_data)
+    urls_changed("url updated")
+    return jsonify({"status": "success", "data": url})
 
-            logging.info(f"📸 Screenshot saved as {filename}")
 
-            # For now, simulate analysis since API quota is exceeded
-            simulated_analysis = {
-                "in_stock": True,  # Based on your visual confirmation
-                "product_name": "Chibi Maruko Chan The Time With You Series",
-                "price": "$19.99",
-                "confidence": 0.95,
-                "reasoning": "Screenshot captured successfully - manual verification needed",
-                "elements_found": ["screenshot_saved"],
-                "screenshot_file": filename,
-            }
+@app.route("/api/test_check/<int:url_id>", methods=["GET", "POST"])
+def api_test_check(url_id):
+    """API endpoint to queue a stock check for a URL, by its database id"""
+    try:
+        url_data = get_db().get_monitor_url(url_id)
+        if url_data is None:
+            return jsonify({"status": "error", "message": "URL not found"}), 404
 
-            return jsonify(
-                {
-                    "status": "success",
-                    "url": url,
-                    "method": "screenshot",
-                    "screenshot_size": len(base64_image),
-                    "screenshot_file": filename,
-                    "analysis": simulated_analysis,
-                    "timestamp": datetime.utcnow().isoformat(),
-                }
-            )
+        url = url_data["url"]
+        job, created = get_check_jobs().submit(
+            "check", url, lambda: run_test_check(url)
+        )
+        return job_response(job, created)
 
-        except ImportError:
-            return (
-                jsonify(
-                    {
-                        "status": "error",
-                        "message": "Screenshot functionality not available - selenium not installed",
-                    }
-                ),
-                500,
-            )
+    except Exception as e:
+        logging.error(f"Test check error: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
 
-        except Exception as e:
-            return (
-                jsonify(
-                    {"status": "error", "message": f"Screenshot test failed: {str(e)}"}
-                ),
-                500,
-            )
+
+@app.route("/api/test_screenshot/<int:url_id>", methods=["GET", "POST"])
+def api_test_screenshot(url_id):
+    """API endpoint to queue a screenshot-based stock check, by database id"""
+    try:
+        url_data = get_db().get_monitor_url(url_id)
+        if url_data is None:
+            return jsonify({"status": "error", "message": "URL not found"}), 404
+
+        url = url_data["url"]
+        job, created = get_check_jobs().submit(
+            "screenshot", url, lambda: run_test_screenshot(url, url_id)
+        )
+        return job_response(job, created)
 
     except Exception as e:
         logging.error(f"Screenshot test error: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route("/api/jobs/<job_id>")
+def api_job(job_id):
+    """API endpoint for the status and result of a check job"""
+    job = get_check_jobs().get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify({"status": "success", "data": job})
+
+
 @app.route("/settings")
 def settings():
     """Settings page"""
@@ -280,62 +735,56 @@ def settings():
 def history():
     """History page"""
     try:
-        # Get all events from the last 7 days
-        events = db.get_recent_events(1000)
-
-        # Filter to last 7 days
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_events = [
-            e
-            for e in events
-            if datetime.fromisoformat(e["timestamp"].replace("Z", "+00:00")) > week_ago
-        ]
-
-        return render_template("history.html", events=recent_events)
-    except Exception as e:
-        logging.error(f"History error: {e}")
-        return f"History error: {e}", 500
-
-
-def calculate_notification_success_rate(notification_stats: Dict) -> float:
-    """Calculate overall notification success rate"""
-    total_success = 0
-    total_attempts = 0
-
-    for notifier_type, stats in notification_stats.items():
-        total_success += stats.get("success", 0)
-        total_attempts += sum(stats.values())
-
-    if total_attempts == 0:
-        return 0.0
+        # Last 7 days by default; hours=0 shows everything
+        try:
+            filters = parse_event_filters(request.args, default_hours=168)
+            before = decode_cursor(request.args.get("cursor"))
+        except ValueError as e:
+            return f"History error: {e}", 400
+
+        filter_args = {
+            key: request.args[key]
+            for key in ("url", "in_stock", "hours")
+            if request.args.get(key)
+        }
 
-    return (total_success / total_attempts) * 100
+        def render():
+            events = get_db().query_events(
+                **filters, before=before, limit=HISTORY_PAGE_SIZE
+            )
+            next_cursor = (
+                encode_cursor(events[-1]) if len(events) == HISTORY_PAGE_SIZE else None
+            )
 
+            return render_template(
+                "history.html",
+                events=events,
+                rows_html=Markup(
+                    render_template("partials/history_rows.html", events=events)
+                ),
+                counts=get_db().count_events(**filters),
+                monitored_urls=get_db().get_monitor_urls(),
+                filter_args=filter_args,
+                hours=request.args.get("hours", 168, type=int),
+                next_url=(
+                    url_for("history", cursor=next_cursor, **filter_args)
+                    if next_cursor
+                    else None
+                ),
+                first_url=url_for("history", **filter_args) if before else None,
+                export_ndjson_url=url_for(
+                    "api_events_export", format="ndjson", **filter_args
+                ),
+                export_csv_url=url_for(
+                    "api_events_export", format="csv", **filter_args
+                ),
+            )
 
-@app.template_filter("timeago")
-def timeago_filter(timestamp_str):
-    """Template filter for time ago formatting"""
-    try:
-        if not timestamp_str:
-            return "Never"
-
-        # Parse timestamp
-        timestamp = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-        now = datetime.utcnow()
-
-        diff = now - timestamp
-        seconds = diff.total_seconds()
-
-        if seconds < 60:
-            return f"{int(seconds)} seconds ago"
-        elif seconds < 3600:
-            return f"{int(seconds // 60)} minutes ago"
-        elif seconds < 86400:
-            return f"{int(seconds // 3600)} hours ago"
-        else:
-            return f"{int(seconds // 86400)} days ago"
-    except:
-        return "Unknown"
+        # The whole page is cached, so repeat views skip the event queries too
+        return cached_html("history", request.args.to_dict(), render)
+    except Exception as e:
+        logging.error(f"History error: {e}")
+        return f"History error: {e}", 500
 
 
 @app.template_filter("format_currency")
@@ -0,0 +1,103 @@
+import logging
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from rate_limit import RateLimitedError, TokenBucket, parse_retry_after
+
+
+class WebhookTransport:
+    """Pooled, rate-limit-aware HTTP sender shared by webhook notifiers"""
+
+    def __init__(self):
+        self.default_rate = Config.WEBHOOK_DEFAULT_RATE
+        self.default_burst = Config.WEBHOOK_DEFAULT_BURST
+        self.max_wait = Config.WEBHOOK_MAX_WAIT
+        self.timeout = Config.WEBHOOK_TIMEOUT
+
+        self._sessions: Dict[str, requests.Session] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    @staticmethod
+    def _destination_key(url: str) -> str:
+        # Discord and Slack rate-limit per webhook, so the path matters
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+
+    def session_for(self, url: str) -> requests.Session:
+        """Get the pooled session for a destination host"""
+        key = self._host_key(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[key] = session
+            return session
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        """Get the token bucket for a webhook destination"""
+        key = self._destination_key(url)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.default_rate, self.default_burst)
+                self._buckets[key] = bucket
+            return bucket
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request once the destination's rate limit allows it"""
+        bucket = self.bucket_for(url)
+        if not bucket.acquire(timeout=self.max_wait):
+            raise RateLimitedError(
+                self._destination_key(url), bucket.seconds_until_available()
+            )
+
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session_for(url).request(method, url, **kwargs)
+
+        bucket.update_from_headers(response.headers)
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers) or 1.0
+            bucket.block_for(retry_after)
+            logging.warning(
+                f"⏳ Rate limited by {self._host_key(url)}, "
+                f"backing off {retry_after:.1f}s"
+            )
+
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """Close all pooled sessions"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_transport: Optional[WebhookTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_webhook_transport() -> WebhookTransport:
+    """Get the process-wide webhook transport"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = WebhookTransport()
+        return _transport
@@ -0,0 +1,68 @@
+"""
+WSGI entry point for running the web dashboard under a production server
+
+    gunicorn -w 4 -k gthread --threads 8 -b 0.0.0.0:8080 wsgi:app
+    waitress-serve --threads 8 --listen 0.0.0.0:8080 wsgi:app
+
+or simply ``python main.py web --workers 4``.
+"""
+
+import logging
+import os
+
+from web_dashboard import app
+
+
+def run_gunicorn(host: str, port: int, workers: int, threads: int):
+    """Serve the dashboard with gunicorn (one process per worker)"""
+    from gunicorn.app.base import BaseApplication
+
+    class DashboardApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    # Threaded workers, so a long-lived /api/stream connection only holds a
+    # thread rather than a whole worker process
+    DashboardApplication(
+        {
+            "bind": f"{host}:{port}",
+            "workers": workers,
+            "worker_class": "gthread",
+            "threads": threads,
+            "timeout": 120,
+        }
+    ).run()
+
+
+def run_waitress(host: str, port: int, workers: int, threads: int):
+    """Serve the dashboard with waitress (single process, threads only)"""
+    from waitress import serve
+
+    if workers > 1:
+        logging.warning(
+            f"waitress runs a single process; using {workers * threads} threads "
+            f"instead of {workers} workers"
+        )
+    serve(app, host=host, port=port, threads=workers * threads)
+
+
+def serve(host: str, port: int, workers: int, threads: int):
+    """Serve the dashboard with the best available production server"""
+    servers = [run_waitress] if os.name == "nt" else [run_gunicorn, run_waitress]
+    for server in servers:
+        try:
+            return server(host, port, workers, threads)
+        except ImportError:
+            continue
+
+    raise RuntimeError(
+        "No production WSGI server installed - pip install gunicorn (or waitress)"
+    )